@@ -5,6 +5,7 @@ from django.utils.html import format_html
 from django.utils.safestring import SafeText
 
 from automated_logging.models import BaseModel
+from automated_logging.settings import settings
 
 
 class MixinBase(BaseModelAdmin):
@@ -18,6 +19,13 @@ class MixinBase(BaseModelAdmin):
 
         self.readonly_fields = [f.name for f in self.model._meta.get_fields()]
 
+    def get_queryset(self, request):
+        """read from database.replica, if it has been configured"""
+        queryset = super().get_queryset(request)
+
+        replica = settings.database.replica
+        return queryset.using(replica) if replica else queryset
+
     def get_actions(self, request):
         """get_actions from ModelAdmin, but remove all write operations."""
         actions = super().get_actions(request)
@@ -13,4 +13,18 @@ class AutomatedloggingConfig(AppConfig):
             from .signals import save
             from .signals import m2m
 
+            m2m.build_m2m_relations()
+
         from .handlers import DatabaseHandler
+
+        from django.db.models.signals import post_delete
+        from .helpers.cache import identities
+        from .models import Application, ModelMirror, ModelField
+
+        for model in (Application, ModelMirror, ModelField):
+            post_delete.connect(identities.invalidate, sender=model, weak=False)
+
+        from django.contrib.auth import get_user_model
+        from .routers import cascade
+
+        post_delete.connect(cascade, sender=get_user_model(), weak=False)
@@ -0,0 +1,40 @@
+"""
+ASGI helpers for django-automated-logging.
+"""
+
+from automated_logging.writers import sinks
+
+
+class LifespanApplication:
+    """
+    ASGI application wrapper, that handles the lifespan protocol.
+    Every asyncio sink (DatabaseHandler with asyncio: True) is bound to
+    the event loop on startup and drained on shutdown, so that no
+    event is lost when the server stops.
+
+    usage (asgi.py):
+        application = LifespanApplication(get_asgi_application())
+
+    Every other connection is passed to the wrapped application.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "lifespan":
+            return await self.application(scope, receive, send)
+
+        while True:
+            message = await receive()
+
+            if message["type"] == "lifespan.startup":
+                for sink in list(sinks):
+                    sink.start()
+                await send({"type": "lifespan.startup.complete"})
+
+            elif message["type"] == "lifespan.shutdown":
+                for sink in list(sinks):
+                    await sink.aclose()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
@@ -0,0 +1,230 @@
+"""
+Local collector, that receives the records of every process on a host over
+a unix domain socket and processes them with a single DatabaseHandler,
+so that batches span every process and only the collector writes to the database.
+The collector is started via `manage.py dal_collector <path>`.
+
+Records are sent in the same format as they are spooled
+(pickled and prefixed with their length).
+"""
+
+import os
+import pickle
+import selectors
+import socket
+import stat
+import sys
+import traceback
+from logging import makeLogRecord
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Optional
+
+from automated_logging.spool import HEADER
+
+
+class CollectorClient:
+    """
+    Connection of a process to the collector. The connection is opened lazily
+    and opened again after a fork, as sockets must not be shared between processes.
+    """
+
+    def __init__(self, path: str, timeout: float = 1.0):
+        self.path = path
+        self.timeout = timeout
+        self.lock = Lock()
+        self.socket: Optional[socket.socket] = None
+        self.pid = None
+
+    def _connect(self) -> None:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(self.timeout)
+        try:
+            connection.connect(self.path)
+        except OSError:
+            connection.close()
+            raise
+
+        self.socket = connection
+        self.pid = os.getpid()
+
+    def _disconnect(self) -> None:
+        if self.socket is not None:
+            self.socket.close()
+        self.socket = None
+
+    def send(self, item: Any) -> bool:
+        """
+        Send an item to the collector, the connection is opened again once,
+        if it has been closed by the collector.
+
+        :param item: picklable item
+        :return: has the item been sent? False if the collector is unavailable
+        """
+        try:
+            payload = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return False
+
+        frame = HEADER.pack(len(payload)) + payload
+        with self.lock:
+            for _ in range(2):
+                try:
+                    if self.socket is None or self.pid != os.getpid():
+                        self._connect()
+                    self.socket.sendall(frame)
+                    return True
+                except OSError:
+                    # the collector discards incomplete items of closed connections
+                    self._disconnect()
+
+        return False
+
+    def close(self) -> None:
+        with self.lock:
+            self._disconnect()
+
+
+class Collector:
+    """
+    Unix domain socket server, that processes the received records
+    with the handler. The handler should write in the background
+    (threading: True), so that the socket is read while the handler writes,
+    its writer then writes the batches and releases aggregated events.
+    Otherwise the handler writes once its batch is full, the remaining
+    records are written latency seconds after the first of them.
+
+    A record that cannot be processed is skipped, the collector keeps serving.
+
+    The socket is only accessible by the owner (mode), as the received items are
+    unpickled, only processes that are trusted may be allowed to connect.
+    """
+
+    def __init__(self, path: str, handler, latency: float = 1.0, mode: int = 0o600):
+        self.path = os.path.abspath(path)
+        self.handler = handler
+        self.latency = latency
+        # the writer of the handler writes the batches after latency itself
+        self.background = getattr(handler, "writer", None) is not None
+
+        self.buffers: Dict[socket.socket, bytearray] = {}
+        self.pending = None
+        self.running = False
+
+        try:
+            if stat.S_ISSOCK(os.stat(self.path).st_mode):
+                # left over from a previous collector
+                os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+        self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.socket.bind(self.path)
+        os.chmod(self.path, mode)
+        self.socket.listen(128)
+        self.socket.setblocking(False)
+
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.socket, selectors.EVENT_READ)
+
+    def _accept(self) -> None:
+        connection, _ = self.socket.accept()
+        connection.setblocking(False)
+        self.buffers[connection] = bytearray()
+        self.selector.register(connection, selectors.EVENT_READ)
+
+    def _disconnect(self, connection: socket.socket) -> None:
+        self.selector.unregister(connection)
+        connection.close()
+        del self.buffers[connection]
+
+    def _receive(self, connection: socket.socket) -> None:
+        try:
+            data = connection.recv(64 * 1024)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b""
+
+        if not data:
+            return self._disconnect(connection)
+
+        buffer = self.buffers[connection]
+        buffer.extend(data)
+
+        while len(buffer) >= HEADER.size:
+            (size,) = HEADER.unpack_from(buffer)
+            if len(buffer) < HEADER.size + size:
+                break
+
+            payload = bytes(buffer[HEADER.size : HEADER.size + size])
+            del buffer[: HEADER.size + size]
+            try:
+                self.process(pickle.loads(payload))
+            except Exception:
+                # we cannot use logging here, as the records of this process
+                # might be sent to the collector itself
+                traceback.print_exc(file=sys.stderr)
+
+    def process(self, state: Dict[str, Any]) -> None:
+        """
+        Process a received record with the handler.
+
+        :param state: attributes of the record
+        :return: None
+        """
+        if self.pending is None and not self.background:
+            self.pending = monotonic()
+
+        self.handler.handle(makeLogRecord(state))
+
+    def poll(self, timeout: Optional[float] = None) -> None:
+        """
+        Accept connections and process received records once,
+        writes the remaining records if latency has been exceeded
+        and aggregated events, whose window has been closed.
+
+        :param timeout: maximum time to wait for connections or records
+        :return: None
+        """
+        for key, _ in self.selector.select(timeout):
+            if key.fileobj is self.socket:
+                self._accept()
+            else:
+                self._receive(key.fileobj)
+
+        tick = getattr(self.handler, "tick", None)
+        if tick is not None and not self.background:
+            tick()
+
+        if self.pending is not None and monotonic() - self.pending >= self.latency:
+            self.pending = None
+            self.handler.flush()
+
+    def serve_forever(self) -> None:
+        """process records until shutdown() is called"""
+        self.running = True
+        while self.running:
+            timeout = self.latency
+            if self.pending is not None:
+                timeout = max(0.0, self.latency - (monotonic() - self.pending))
+            self.poll(timeout)
+
+    def shutdown(self) -> None:
+        """stop serve_forever(), takes up to latency seconds"""
+        self.running = False
+
+    def close(self) -> None:
+        """close every connection and write the remaining records"""
+        for connection in list(self.buffers):
+            self._disconnect(connection)
+
+        self.selector.close()
+        self.socket.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+        self.pending = None
+        self.handler.flush()
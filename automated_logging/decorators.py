@@ -7,6 +7,7 @@ from automated_logging.helpers import (
     get_or_create_thread,
     function2path,
 )
+from automated_logging.helpers.cache import invalidate
 from automated_logging.helpers.enums import VerbOperationMap
 
 
@@ -146,6 +147,7 @@ def _register_model(
         fields.update(registry[path].fields)
 
     registry[path] = container(operations, fields)
+    invalidate()
 
     # this makes it so that we have a method we can call to re apply dal.
     model.__dal_register__ = lambda: _register_model(
@@ -1,14 +1,29 @@
 import re
+import uuid
 from collections import OrderedDict
 from datetime import timedelta
-from logging import Handler, LogRecord
+from functools import lru_cache, partial
+from logging import Handler, LogRecord, makeLogRecord
 from pathlib import Path
-from threading import Thread
-from typing import Dict, Any, TYPE_CHECKING, List, Optional, Union, Type, Tuple
+from threading import Lock
+from time import monotonic
+from typing import (
+    Dict,
+    Any,
+    TYPE_CHECKING,
+    List,
+    Optional,
+    Union,
+    Type,
+    Tuple,
+    Iterable,
+)
 
-from django.core.exceptions import ObjectDoesNotExist
-from django.utils import timezone
-from django.db.models import ForeignObject, Model
+from django.db import DatabaseError, connections
+from django.db.models import ForeignObject, Model, Q
+from django.utils.timezone import now
+
+from automated_logging.helpers.cache import identities
 
 
 if TYPE_CHECKING:
@@ -18,97 +33,683 @@ if TYPE_CHECKING:
         ModelEvent,
         ModelValueModification,
         ModelRelationshipModification,
+        ModelEntry,
     )
 
 
+# failure -> records and batches are spooled if the database is unavailable
+# always  -> records are spooled instead of being processed
+SPOOL = ("failure", "always")
+
+
 class DatabaseHandler(Handler):
     def __init__(
-        self, *args, batch: Optional[int] = 1, threading: bool = False, **kwargs
+        self,
+        *args,
+        batch: Optional[int] = 1,
+        threading: bool = False,
+        bulk: bool = False,
+        workers: int = 1,
+        queue: int = 1000,
+        latency: float = 1.0,
+        backpressure: str = "block",
+        asyncio: bool = False,
+        spool: Optional[Dict[str, Any]] = None,
+        collector: Optional[Dict[str, Any]] = None,
+        **kwargs,
     ):
+        from automated_logging.collector import CollectorClient
+        from automated_logging.spool import Spool
+        from automated_logging.writers import AsyncWriter, BackgroundWriter
+
+        if threading and asyncio:
+            raise ValueError("threading and asyncio cannot be used together")
+
+        self.spool = None
+        self.spool_mode = None
+        if spool:
+            spool = dict(spool)
+            self.spool_mode = spool.pop("mode", "failure")
+            if self.spool_mode not in SPOOL:
+                raise ValueError(
+                    f"spool mode must be one of {', '.join(SPOOL)}, "
+                    f"not {self.spool_mode}"
+                )
+            self.spool = Spool(**spool)
+
+        # records are sent to the collector, if it is available
+        self.collector = CollectorClient(**collector) if collector else None
+
         self.limit = batch or 1
         self.threading = threading
+        self.bulk = bulk
+        # set when replaying, rows that already exist are skipped
+        self.ignore_conflicts = False
         self.instances = OrderedDict()
+        # queued instances of the models in _upserts(), by their natural key
+        self.natural: Dict[Tuple[Type[Model], Tuple], Model] = {}
+        # unspecified events of the current aggregation window
+        self.aggregated = OrderedDict()
+        self.opened = None
+        # guards self.instances, when records are processed outside of emit()
+        self.processing = Lock()
+        # ids of the instances handed over to the writer, that are not committed yet
+        self.uncommitted = set()
+        self.committing = Lock()
+
+        self.sink = None
+        if asyncio:
+            self.sink = AsyncWriter(
+                self._process, size=queue, batch=self.limit, latency=latency
+            )
+
+        self.writer = None
+        if threading:
+            self.writer = BackgroundWriter(
+                self._write,
+                drop=self._drop,
+                tick=self.tick,
+                workers=workers,
+                size=queue,
+                batch=self.limit,
+                latency=latency,
+                backpressure=backpressure,
+            )
+
         super(DatabaseHandler, self).__init__(*args, **kwargs)
 
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def _application(pathname: str, module: str) -> Optional[str]:
+        """
+        Determine the application of a log record, which is the last part
+        of the path (closest to the file) that is an installed application.
+
+        This is semi-reliable, but I am unsure of a better way to do this.
+
+        :param pathname: pathname of the record
+        :param module: module of the record
+        :return: name of the application or None if unknown
+        """
+        from django.apps import apps
+
+        applications = apps.app_configs.keys()
+        candidates = [p for p in Path(pathname).parts if p in applications]
+        if candidates:
+            return candidates[-1]
+
+        if module in applications:
+            # if we cannot find the application, we use the module as application
+            return module
+
+        # if we cannot determine the application from the application
+        # or from the module we presume that the application is unknown
+        return None
+
+    @staticmethod
+    @lru_cache()
+    def _dependencies(models: Tuple[Type[Model], ...]) -> List[Type[Model]]:
+        """
+        Sort the models topologically, so that every model is placed after
+        all models it references via a foreign key.
+        Models that do not depend on each other keep their original order.
+
+        :param models: models present in the batch
+        :return: sorted models
+        """
+        dependencies = {
+            model: {
+                f.related_model
+                for f in model._meta.concrete_fields
+                if f.is_relation
+                and f.related_model in models
+                and f.related_model is not model
+            }
+            for model in models
+        }
+
+        ordered = []
+        while dependencies:
+            ready = [m for m, d in dependencies.items() if not d.difference(ordered)]
+            if not ready:
+                # circular dependency, this should never happen with the
+                # models from automated_logging, just append the rest.
+                ready = list(dependencies.keys())
+
+            for model in ready:
+                ordered.append(model)
+                dependencies.pop(model)
+
+        return ordered
+
+    @staticmethod
+    @lru_cache()
+    def _upserts() -> Dict[Type[Model], Tuple[Tuple[str, ...], Tuple[str, ...]]]:
+        """
+        Models that are resolved via their unique constraint when they are written,
+        instead of being looked up when they are queued.
+
+        :return: {model: (unique fields, fields that are updated on conflict)}
+        """
+        from automated_logging.models import (
+            Application,
+            ModelEntry,
+            ModelField,
+            ModelMirror,
+        )
+
+        return {
+            Application: (("name",), ()),
+            ModelMirror: (("application", "name"), ()),
+            ModelField: (("mirror", "name"), ("type",)),
+            ModelEntry: (("mirror", "digest"), ("value",)),
+        }
+
+    @staticmethod
+    @lru_cache()
+    def _relations(model: Type[Model]) -> List[ForeignObject]:
+        """foreign keys of the model"""
+        return [f for f in model._meta.concrete_fields if f.is_relation]
+
+    def _relink(self, instance: Model, resolved: Dict[Any, Any]) -> None:
+        """
+        Point the foreign keys of the instance to the rows
+        the referenced instances have been resolved to.
+
+        :param instance: instance that is going to be written
+        :param resolved: {queued primary key: primary key of the row}
+        :return: None
+        """
+        for field in self._relations(instance.__class__):
+            related = field.get_cached_value(instance, None)
+            if related is not None:
+                setattr(instance, field.attname, related.pk)
+                continue
+
+            value = getattr(instance, field.attname)
+            if value in resolved:
+                setattr(instance, field.attname, resolved[value])
+
+    @staticmethod
+    def _existing(
+        model: Type[Model], fields: List[str], keys: List[Tuple], using: str
+    ) -> Dict[Tuple, Any]:
+        """
+        Look up the rows of the keys with a query per 500 keys,
+        if there are multiple rows for a key the oldest is used.
+
+        :param model: model of the rows
+        :param fields: attnames of the unique fields
+        :param keys: values of the unique fields
+        :param using: database alias
+        :return: {key: primary key}
+        """
+        queryset = model._base_manager.using(using).order_by("created_at")
+
+        # NULL never matches IN, keys that contain NULL are looked up individually
+        conditions = [
+            Q(
+                **{
+                    (f"{f}__isnull" if v is None else f): (True if v is None else v)
+                    for f, v in zip(fields, key)
+                }
+            )
+            for key in keys
+            if None in key
+        ]
+        complete = [k for k in keys if None not in k]
+        for idx in range(0, len(complete), 500):
+            chunk = complete[idx : idx + 500]
+            conditions.append(
+                Q(**{f"{f}__in": {k[i] for k in chunk} for i, f in enumerate(fields)})
+            )
+
+        rows = {}
+        for condition in conditions:
+            for row in queryset.filter(condition).values_list("pk", *fields):
+                rows.setdefault(tuple(row[1:]), row[0])
+
+        return {k: rows[k] for k in keys if k in rows}
+
+    def _upsert(
+        self, model: Type[Model], instances: List[Model], using: str
+    ) -> Dict[Any, Any]:
+        """
+        Write the instances of a model, that has a unique constraint,
+        via INSERT ... ON CONFLICT and resolve their primary keys with
+        a single query per 500 keys afterwards. Instances, where a row already
+        existed (e.g. written by another process), take over its primary key.
+
+        Values (e.g. ModelEntry.value) are only updated on conflict,
+        if they are not empty. Keys that contain NULL, which never conflict,
+        and databases that do not support conflict handling are looked up
+        before the missing rows are inserted instead. Without support for
+        updating on conflict (Django < 4.1) the values are updated afterwards.
+
+        :param model: model of the instances
+        :param instances: instances that are going to be written
+        :param using: database alias
+        :return: {queued primary key: primary key of the row}
+        """
+        unique, update = self._upserts()[model]
+        fields = [model._meta.get_field(f) for f in unique]
+        features = connections[using].features
+        manager = model._base_manager.using(using)
+
+        # the values are compared with the ones returned by the database
+        groups = OrderedDict()
+        for instance in instances:
+            key = tuple(f.to_python(getattr(instance, f.attname)) for f in fields)
+            for field, value in zip(fields, key):
+                setattr(instance, field.attname, value)
+            groups.setdefault(key, []).append(instance)
+
+        # update_conflicts is only available since Django 4.1, values are
+        # updated after the rows have been inserted or looked up otherwise.
+        upsert = features.supports_ignore_conflicts
+        conflicts = getattr(features, "supports_update_conflicts", False)
+
+        pending = [k for k in groups.keys() if None in k or not upsert]
+        stale = []
+        if upsert:
+            first = [g[0] for k, g in groups.items() if None not in k]
+            updated = [i for i in first if any(getattr(i, f) for f in update)]
+            ignored = [i for i in first if not any(getattr(i, f) for f in update)]
+            if update and not conflicts:
+                stale = [k for k in groups.keys() if None not in k]
+                ignored, updated = first, []
+
+            if updated:
+                # MySQL does not support specifying the conflicting fields
+                target = getattr(
+                    features, "supports_update_conflicts_with_target", False
+                )
+                manager.bulk_create(
+                    updated,
+                    update_conflicts=True,
+                    unique_fields=unique if target else None,
+                    update_fields=[*update, "updated_at"],
+                )
+            if ignored:
+                manager.bulk_create(ignored, ignore_conflicts=True)
+
+        rows = self._existing(
+            model, [f.attname for f in fields], list(groups.keys()), using
+        )
+
+        missing = [groups[k][0] for k in pending if k not in rows]
+        if missing:
+            manager.bulk_create(missing)
+        for key in [*pending, *stale]:
+            values = {f: getattr(groups[key][0], f) for f in update}
+            if key in rows and any(values.values()):
+                manager.filter(pk=rows[key]).update(**values, updated_at=now())
+
+        resolved = {}
+        for key, group in groups.items():
+            pk = rows.get(key, group[0].pk)
+            for instance in group:
+                if instance.pk != pk:
+                    resolved[instance.pk] = pk
+                    instance.pk = pk
+                instance._state.adding = False
+                instance._state.db = using
+
+        return resolved
+
+    def _resolve(self, instances: Iterable[Model], using: str) -> List[Model]:
+        """
+        Write the instances of the models in _upserts() via _upsert(),
+        which replaces the lookups when they are queued.
+        Every other instance is pointed to the resolved rows.
+
+        :param instances: instances that are going to be written
+        :param using: database alias
+        :return: instances that still need to be written
+        """
+        upserts = self._upserts()
+
+        groups = OrderedDict()
+        remaining = []
+        for instance in instances:
+            if instance.__class__ in upserts and (
+                instance._state.adding or self._shared(instance)
+            ):
+                groups.setdefault(instance.__class__, []).append(instance)
+            else:
+                remaining.append(instance)
+
+        resolved = {}
+        for model in self._dependencies(tuple(groups.keys())):
+            for instance in groups[model]:
+                self._relink(instance, resolved)
+            resolved.update(self._upsert(model, groups[model], using))
+
+        for instance in remaining:
+            self._relink(instance, resolved)
+
+        return remaining
+
+    def _bulk_save(self, instances: Iterable[Model]) -> None:
+        """
+        Save the instances grouped by their model via bulk_create,
+        the groups are saved in order of their foreign key dependencies.
+
+        Instances that already exist in the database (e.g. ModelEntry,
+        where the value changed) are saved individually.
+        Shared instances might have been written by another batch already,
+        conflicts are ignored for them.
+
+        :param instances: instances to be saved
+        :return: None
+        """
+        groups = OrderedDict()
+        for instance in instances:
+            groups.setdefault(instance.__class__, []).append(instance)
+
+        for model in self._dependencies(tuple(groups.keys())):
+            shared = [i for i in groups[model] if self._shared(i)]
+            created = [
+                i for i in groups[model] if i._state.adding and not self._shared(i)
+            ]
+            modified = [
+                i for i in groups[model] if not i._state.adding and not self._shared(i)
+            ]
+
+            if shared:
+                model.objects.bulk_create(shared, ignore_conflicts=True)
+            if created:
+                model.objects.bulk_create(
+                    created, ignore_conflicts=self.ignore_conflicts
+                )
+            [i.save() for i in modified]
+
+    @staticmethod
+    def _shared(instance: Model) -> bool:
+        """has the instance been queued in multiple batches? (see _requeue)"""
+        return getattr(instance._state, "shared", False)
+
+    def _requeue(self, instance: Model) -> Model:
+        """
+        Queue an instance again, that has been handed over to the writer,
+        but has not been committed yet. Batches are written by multiple workers
+        in any order, therefore every batch contains the uncommitted rows
+        it references, including the rows these reference. The instance is
+        marked as shared, whichever batch is written last skips the existing row.
+
+        :param instance: prepared instance
+        :return: instance
+        """
+        with self.committing:
+            if id(instance) not in self.uncommitted:
+                return instance
+
+        if self.instances.get(instance.pk) is instance:
+            return instance
+
+        for field in self._relations(instance.__class__):
+            related = field.get_cached_value(instance, None)
+            if related is not None:
+                self._requeue(related)
+
+        instance._state.shared = True
+        self._queue(instance)
+        return instance
+
+    def _natural(self, model: Type[Model], values: Dict[str, Any]) -> Tuple:
+        """
+        Natural key of an instance of a model in _upserts(),
+        as used by the unique constraint of the model.
+
+        :param model: model of the instance
+        :param values: {attname: value}, related instances via their primary key
+        :return: key of self.natural
+        """
+        unique, _ = self._upserts()[model]
+        return model, tuple(values[model._meta.get_field(f).attname] for f in unique)
+
+    def _queue(self, instance: Model) -> None:
+        """queue the instance, instances of _upserts() are indexed in self.natural"""
+        self.instances[instance.pk] = instance
+        model = instance.__class__
+        if model in self._upserts():
+            self.natural[self._natural(model, instance.__dict__)] = instance
+
+    def _clear_queue(self) -> None:
+        """remove every queued instance"""
+        self.instances.clear()
+        self.natural.clear()
+
+    def _drop(self, instances: OrderedDict) -> None:
+        """called by the writer, if a batch has been dropped due to backpressure"""
+        identities.discard(instances.values())
+        with self.committing:
+            self.uncommitted.difference_update(id(i) for i in instances.values())
+
     @staticmethod
     def _clear(config):
-        from automated_logging.models import ModelEvent, RequestEvent, UnspecifiedEvent
+        from automated_logging.helpers.purge import throttled_purge
+
+        throttled_purge(config)
+
+    def _write(self, instances: OrderedDict, clear: bool = True) -> None:
+        """
+        Write the instances supplied in a single transaction.
+        This is either called directly or from the worker threads of the writer.
+
+        :param instances: instances to be written
+        :param clear: delete events that exceed max_age
+        :return: None
+        """
         from django.db import transaction
+        from automated_logging.routers import database
+        from automated_logging.settings import settings
 
-        current = timezone.now()
-        with transaction.atomic():
-            if config.model.max_age:
-                ModelEvent.objects.filter(
-                    created_at__lte=current - config.model.max_age
-                ).delete()
-            if config.unspecified.max_age:
-                UnspecifiedEvent.objects.filter(
-                    created_at__lte=current - config.unspecified.max_age
-                ).delete()
+        using = database()
+        try:
+            with transaction.atomic(using=using):
+                remaining = self._resolve(instances.values(), using)
+                if self.bulk or self.ignore_conflicts:
+                    self._bulk_save(remaining)
+                else:
+                    for instance in remaining:
+                        if self._shared(instance):
+                            instance.__class__.objects.bulk_create(
+                                [instance], ignore_conflicts=True
+                            )
+                        else:
+                            instance.save()
 
-            if config.request.max_age:
-                RequestEvent.objects.filter(
-                    created_at__lte=current - config.request.max_age
-                ).delete()
+            # the rows only exist once the outermost transaction is committed,
+            # callbacks of transactions that are rolled back are discarded.
+            cacheable = [
+                i for i in instances.values() if getattr(i._state, "identity", None)
+            ]
+            if cacheable:
+                transaction.on_commit(partial(self._cache, cacheable), using=using)
+        except Exception as exc:
+            # cached rows might be part of the failed write or might not exist
+            # anymore, we cannot know which, therefore clear everything.
+            identities.clear()
+            # resolved rows might have been rolled back, resolve them again
+            for instance in instances.values():
+                if instance.__class__ in self._upserts():
+                    instance._state.adding = True
+            if not self.spool or not isinstance(exc, DatabaseError):
+                raise
 
-    def save(self, instance=None, commit=True, clear=True):
+            self.spool.append(("instances", list(instances.values())))
+            return
+        finally:
+            with self.committing:
+                self.uncommitted.difference_update(id(i) for i in instances.values())
+
+        # done outside the transaction, so that every chunk has its own
+        if clear:
+            self._clear(settings)
+
+    @staticmethod
+    def _identify(key, instance):
+        """
+        Mark the instance as identified by the natural key,
+        it is added to the identity cache once it has been committed.
+
+        :param key: key used in the identity cache
+        :param instance: instance that is identified by the key
+        :return: instance
+        """
+        instance._state.identity = key
+        return instance
+
+    @staticmethod
+    def _cache(instances) -> None:
+        """
+        Add committed instances to the identity cache.
+
+        :param instances: instances marked by _identify()
+        :return: None
+        """
+        for instance in instances:
+            # cached instances do not need to be cached again
+            key = instance._state.__dict__.pop("identity", None)
+            if key:
+                identities.set(key, instance)
+
+    def _take(self) -> OrderedDict:
+        """
+        Take the queued instances, which are going to be written by the writer.
+        """
+        instances, self.instances = self.instances, OrderedDict()
+        self.natural = {}
+        with self.committing:
+            self.uncommitted.update(id(i) for i in instances.values())
+        return instances
+
+    def _handoff(self) -> None:
+        """
+        Hand the queued instances over to the writer, the writer then owns them.
+        """
+        if self.instances:
+            self.writer.put(self._take())
+
+    def save(self, instance=None, commit=True, clear=True, force=False):
         """
         Internal save procedure.
         Handles deletion when an event exceeds max_age
         and batch saving via atomic transactions.
 
+        :param force: save regardless of the batch size
         :return: None
         """
-        from django.db import transaction
-        from automated_logging.settings import settings
-
         if instance:
-            self.instances[instance.pk] = instance
-        if len(self.instances) < self.limit:
-            if clear:
-                self._clear(settings)
+            self._queue(instance)
+        if self.writer:
+            # batching is done by the writer, instances are handed over in emit()
+            return instance
+
+        if len(self.instances) < self.limit and not (force and self.instances):
             return instance
 
         if not commit:
             return instance
 
-        def database(instances, config):
-            """wrapper so that we can actually use threading"""
-            with transaction.atomic():
-                [i.save() for k, i in instances.items()]
+        self._write(self.instances, clear)
+        self._clear_queue()
 
-                if clear:
-                    self._clear(config)
-                instances.clear()
+        return instance
 
-        if self.threading:
-            thread = Thread(
-                group=None, target=database, args=(self.instances, settings)
-            )
-            thread.start()
-        else:
-            database(self.instances, settings)
+    def _process(self, records: List[LogRecord]) -> None:
+        """
+        Dispatch and write the records handed over by the asyncio sink,
+        called from the executor of the sink.
 
-        return instance
+        :param records: records to be processed
+        :return: None
+        """
+        with self.processing:
+            try:
+                for record in records:
+                    self.dispatch(record)
+                self.save(force=True)
+            finally:
+                # never retry a failed batch, it would fail every time
+                self._clear_queue()
+
+    def flush(self) -> None:
+        """
+        Save all queued instances, regardless of the batch size.
+        Called by logging on shutdown.
+
+        :return: None
+        """
+        if self.sink:
+            self.sink.join()
+            with self.processing:
+                self.release_aggregated(force=True)
+                self.save(force=True)
+            return
+
+        self.release_aggregated(force=True)
+
+        if self.writer:
+            self._handoff()
+            self.writer.join()
+            return
+
+        self.save(clear=False, force=True)
+
+    def close(self) -> None:
+        """
+        Stop the writer, everything that is still queued
+        or aggregated will be written.
+
+        :return: None
+        """
+        if self.writer:
+            self.release_aggregated(force=True)
+            self._handoff()
+            self.writer.stop()
+            self.writer = None
+
+        if self.sink:
+            self.sink.stop()
+            self.sink = None
+
+        if self.collector:
+            self.collector.close()
+
+        with self.processing:
+            self.release_aggregated(force=True)
+            self.save(force=True)
+
+        super(DatabaseHandler, self).close()
 
     def get_or_create(self, target: Type[Model], **kwargs) -> Tuple[Model, bool]:
         """
         proxy for "get_or_create" from django,
         instead of creating it immediately we
-        dd it to the list of objects to be created in a single swoop
+        add it to the list of objects to be created in a single swoop.
+        The database is not queried, the row is resolved via its unique constraint
+        when the batch is written (see _upsert).
 
         :type target: Model to be get_or_create
         :type kwargs: properties to be used to find and create the new object
         """
-        created = False
-        try:
-            instance = target.objects.get(**kwargs)
-        except ObjectDoesNotExist:
-            instance = target(**kwargs)
-            self.save(instance, commit=False, clear=False)
-            created = True
+        # instances that are queued, but not yet saved, are looked up first
+        # via their natural key, so we don't queue duplicates.
+        # related instances are compared via their primary key, to not fetch them.
+        values = {
+            target._meta.get_field(k).attname: v.pk if isinstance(v, Model) else v
+            for k, v in kwargs.items()
+        }
+        instance = self.natural.get(self._natural(target, values))
+        if instance is not None:
+            return instance, False
+
+        instance = target(**kwargs)
+        self.save(instance, commit=False, clear=False)
 
-        return instance, created
+        return instance, True
 
     def prepare_save(self, instance: Model):
         """
@@ -129,20 +730,51 @@ class DatabaseHandler(Handler):
             ModelEntry,
         )
 
+        # instances that have already been prepared are either saved or queued,
+        # instances queued in a previous batch are queued again until committed
+        if self.instances.get(instance.pk) is instance:
+            return instance
+        if not instance._state.adding or id(instance) in self.uncommitted:
+            return self._requeue(instance)
+
         if isinstance(instance, Application):
-            return Application.objects.get_or_create(name=instance.name)[0]
+            key = ("application", instance.name)
+            cached = identities.get(key)
+            if cached:
+                return self._requeue(cached)
+
+            application = self.get_or_create(Application, name=instance.name)[0]
+            return self._identify(key, application)
         elif isinstance(instance, ModelMirror):
-            return self.get_or_create(
+            key = ("mirror", instance.application.name, instance.name)
+            cached = identities.get(key)
+            if cached:
+                return self._requeue(cached)
+
+            mirror = self.get_or_create(
                 ModelMirror,
                 name=instance.name,
                 application=self.prepare_save(instance.application),
             )[0]
+            return self._identify(key, mirror)
         elif isinstance(instance, ModelField):
-            entry, _ = self.get_or_create(
-                ModelField,
-                name=instance.name,
-                mirror=self.prepare_save(instance.mirror),
+            key = (
+                "field",
+                instance.mirror.application.name,
+                instance.mirror.name,
+                instance.name,
             )
+            entry = identities.get(key)
+            if entry:
+                self._requeue(entry)
+            else:
+                entry, _ = self.get_or_create(
+                    ModelField,
+                    name=instance.name,
+                    mirror=self.prepare_save(instance.mirror),
+                )
+                self._identify(key, entry)
+
             if entry.type != instance.type:
                 entry.type = instance.type
                 self.save(entry, commit=False, clear=False)
@@ -153,6 +785,7 @@ class DatabaseHandler(Handler):
                 ModelEntry,
                 mirror=self.prepare_save(instance.mirror),
                 primary_key=instance.primary_key,
+                digest=ModelEntry.make_digest(instance.primary_key),
             )
             if entry.value != instance.value:
                 entry.value = instance.value
@@ -177,44 +810,113 @@ class DatabaseHandler(Handler):
         self.save(instance, commit=False, clear=False)
         return instance
 
+    def release_aggregated(self, force: bool = False) -> None:
+        """
+        Save the aggregated unspecified events once the aggregation window
+        has been closed, checked on every unspecified record, on flush
+        and periodically via tick().
+
+        :param force: save regardless of the window
+        :return: None
+        """
+        from automated_logging.settings import settings
+
+        if not self.aggregated:
+            return
+
+        window = settings.unspecified.aggregate
+        if not force and window and monotonic() - self.opened < window.total_seconds():
+            return
+
+        events = list(self.aggregated.values())
+        self.aggregated.clear()
+
+        for event in events:
+            self.prepare_save(event)
+            self.save(event)
+
+    def tick(self) -> Optional[OrderedDict]:
+        """
+        Release the aggregated events, if their window has been closed,
+        without waiting for the next record. Called every latency seconds
+        by the worker threads of the writer and by the collector.
+
+        Skipped if a record is being emitted meanwhile, the lock is never
+        waited for, as emit() might wait for the worker threads.
+
+        :return: released instances, that are written by the calling worker
+        """
+        if not self.aggregated or not self.lock.acquire(blocking=False):
+            return None
+
+        try:
+            self.release_aggregated()
+            if self.aggregated:
+                return None
+
+            if self.writer:
+                return self._take()
+            self.save(force=True)
+        finally:
+            self.lock.release()
+
+        return None
+
     def unspecified(self, record: LogRecord) -> None:
         """
         This is for messages that are not sent from django-automated-logging.
         The option to still save these log messages is there. We create
         the event in the handler and then save them.
 
+        If unspecified.aggregate is set, records with the same origin, level
+        and message template only increment the count of the event of
+        the current window, which is saved once the window has been closed.
+
         :param record:
         :return:
         """
         from automated_logging.models import UnspecifiedEvent, Application
-        from automated_logging.signals import unspecified_exclusion
-        from django.apps import apps
+        from automated_logging.settings import settings
+        from automated_logging.signals import unspecified_verdict
+
+        # our own migrations run while the tables do not match the models yet
+        if record.name.startswith("automated_logging.migrations"):
+            return
+
+        aggregate = settings.unspecified.aggregate
+        self.release_aggregated()
+
+        key = (record.pathname, record.lineno, record.levelno, str(record.msg))
+        if aggregate and key in self.aggregated:
+            event = self.aggregated[key]
+            event.count += 1
+            event.last_seen = now()
+            return
+
+        # both are cached, as there are only a few distinct paths per process
+        application = self._application(record.pathname, record.module)
+        if unspecified_verdict(application, record.pathname):
+            return
 
         event = UnspecifiedEvent()
+        if hasattr(record, "spool_id"):
+            event.id = record.spool_id
         if hasattr(record, "message"):
             event.message = record.message
         event.level = record.levelno
         event.line = record.lineno
-        event.file = Path(record.pathname)
+        event.file = record.pathname
+        event.first_seen = event.last_seen = now()
+        event.application = Application(name=application)
 
-        # this is semi-reliable, but I am unsure of a better way to do this.
-        applications = apps.app_configs.keys()
-        path = Path(record.pathname)
-        candidates = [p for p in path.parts if p in applications]
-        if candidates:
-            # use the last candidate (closest to file)
-            event.application = Application(name=candidates[-1])
-        elif record.module in applications:
-            # if we cannot find the application, we use the module as application
-            event.application = Application(name=record.module)
-        else:
-            # if we cannot determine the application from the application
-            # or from the module we presume that the application is unknown
-            event.application = Application(name=None)
+        if aggregate:
+            if not self.aggregated:
+                self.opened = monotonic()
+            self.aggregated[key] = event
+            return
 
-        if not unspecified_exclusion(event):
-            self.prepare_save(event)
-            self.save(event)
+        self.prepare_save(event)
+        self.save(event)
 
     def model(
         self,
@@ -242,6 +944,44 @@ class DatabaseHandler(Handler):
             self.prepare_save(modification)
             self.save()
 
+    def entries(self, entries: List["ModelEntry"]) -> List["ModelEntry"]:
+        """
+        Resolve multiple entries at once, the mirror is only prepared once
+        and entries that are already queued are reused. New entries are queued,
+        they are resolved when the batch is written (see _upsert).
+
+        Entries without a value (only the primary key has been recorded)
+        never overwrite the value of an existing entry.
+
+        :param entries: entries that have not been saved yet
+        :return: entries that are suitable for saving, in the same order
+        """
+        from automated_logging.models import ModelEntry
+
+        mirrors = {}
+        for entry in entries:
+            mirror = entry.mirror
+            key = (mirror.application.name, mirror.name)
+            if key not in mirrors:
+                mirrors[key] = self.prepare_save(mirror)
+            entry.mirror = mirrors[key]
+            entry.primary_key = str(entry.primary_key)
+            entry.digest = ModelEntry.make_digest(entry.primary_key)
+
+        prepared = []
+        for entry in entries:
+            existing = self.natural.get(self._natural(ModelEntry, entry.__dict__))
+            if existing is None:
+                existing = entry
+                self.save(entry, commit=False, clear=False)
+            elif entry.value and existing.value != entry.value:
+                existing.value = entry.value
+                self.save(existing, commit=False, clear=False)
+
+            prepared.append(existing)
+
+        return prepared
+
     def m2m(
         self,
         record: LogRecord,
@@ -249,13 +989,51 @@ class DatabaseHandler(Handler):
         relationships: List["ModelRelationshipModification"],
         data: Dict[str, Any],
     ) -> None:
+        """
+        This is for many-to-many changes, a single event can be split
+        into multiple records, which all reference the same event.
+
+        :param record: LogRecord
+        :param event: event of the instance, which relationship field changed
+        :param relationships: added or removed entries
+        :param data:
+        :return: None
+        """
         self.prepare_save(event)
         self.save(event)
 
-        for relationship in relationships:
+        entries = self.entries([r.entry for r in relationships])
+        for relationship, entry in zip(relationships, entries):
+            relationship.entry = entry
             relationship.event = event
             self.prepare_save(relationship)
-            self.save(relationship)
+
+        self.save()
+
+    def model_bulk(
+        self,
+        record: LogRecord,
+        events: List[Tuple["ModelEvent", List["ModelValueModification"]]],
+    ) -> None:
+        """
+        This is for bulk operations (update, bulk_create and bulk_update)
+        of a single model. The entries of all events are resolved at once
+        and every row is queued together, with bulk: True that is
+        a single bulk insert per table.
+
+        :param record: LogRecord
+        :param events: events and their modifications
+        :return: None
+        """
+        entries = self.entries([e.entry for e, _ in events])
+        for (event, modifications), entry in zip(events, entries):
+            event.entry = entry
+            self.prepare_save(event)
+            for modification in modifications:
+                modification.event = event
+                self.prepare_save(modification)
+
+        self.save()
 
     def request(self, record: LogRecord, event: "RequestEvent") -> None:
         """
@@ -270,20 +1048,103 @@ class DatabaseHandler(Handler):
         self.prepare_save(event)
         self.save(event)
 
-    def emit(self, record: LogRecord) -> None:
+    @staticmethod
+    def _spooled(record: LogRecord) -> Dict[str, Any]:
         """
-        Emit function that gets triggered for every log message in scope.
+        The attributes of the record, that are written to the spool.
+        Arguments are merged into the message and the exception is omitted,
+        as those might not be picklable.
+        """
+        state = dict(record.__dict__)
+        state["msg"] = state["message"] = record.getMessage()
+        state["args"] = None
+        state["exc_info"] = None
+        # events created from the record use it as primary key,
+        # so that replaying the record multiple times is idempotent
+        state.setdefault("spool_id", uuid.uuid4())
+        return state
+
+    def replay(self, item: Tuple[str, Any]) -> None:
+        """
+        Process an item of the spool, either a record, that is dispatched
+        or instances that are queued. Rows that already exist are skipped,
+        so that an item can be replayed multiple times.
+        flush() needs to be called to write the remaining batch.
+
+        :param item: (kind, value) as appended to the spool
+        :return: None
+        """
+        kind, value = item
+
+        self.ignore_conflicts = True
+        if kind == "record":
+            self.dispatch(makeLogRecord(value))
+        else:
+            for instance in value:
+                self._queue(instance)
 
+        self.save(clear=False)
+
+    def dispatch(self, record: LogRecord) -> None:
+        """
         The record will be processed according to the action set.
+
+        If the database is unavailable and a spool has been configured,
+        the record is appended to the spool instead.
+
         :param record:
         :return:
         """
-        if not hasattr(record, "action"):
-            return self.unspecified(record)
+        if not self.spool:
+            return self._dispatch(record)
 
-        if record.action == "model":
-            return self.model(record, record.event, record.modifications, record.data)
+        try:
+            self._dispatch(record)
+        except DatabaseError:
+            identities.clear()
+            self.spool.append(("record", self._spooled(record)))
+
+    def _dispatch(self, record: LogRecord) -> None:
+        """
+        The record will be processed according to the action set.
+
+        :param record:
+        :return:
+        """
+        if not hasattr(record, "action"):
+            self.unspecified(record)
+        elif record.action == "model":
+            self.model(record, record.event, record.modifications, record.data)
         elif record.action == "model[m2m]":
-            return self.m2m(record, record.event, record.relationships, record.data)
+            self.m2m(record, record.event, record.relationships, record.data)
+        elif record.action == "model[bulk]":
+            self.model_bulk(record, record.events)
         elif record.action == "request":
-            return self.request(record, record.event)
+            self.request(record, record.event)
+
+    def emit(self, record: LogRecord) -> None:
+        """
+        Emit function that gets triggered for every log message in scope.
+
+        With asyncio the record is handed over to the sink, which processes
+        it outside of the event loop, as processing queries the database.
+        With a collector the record is sent to the collector instead,
+        if the collector is unavailable the record is processed as usual.
+        :param record:
+        :return:
+        """
+        if self.collector and self.collector.send(self._spooled(record)):
+            return
+
+        if self.spool_mode == "always":
+            self.spool.append(("record", self._spooled(record)))
+            return
+
+        if self.sink:
+            self.sink.put(record)
+            return
+
+        self.dispatch(record)
+
+        if self.writer:
+            self._handoff()
@@ -32,7 +32,7 @@ def namedtuple2dict(root: Union[NamedTuple, Dict]) -> dict:
         return isinstance(x, tuple) or isinstance(x, dict)
 
     for k, v in root.items():
-        if isinstance(v, set) or isinstance(v, list):
+        if isinstance(v, (set, frozenset, list)):
             output[k] = [namedtuple2dict(i) if eligible(i) else i for i in v]
         else:
             output[k] = namedtuple2dict(v) if eligible(v) else v
@@ -53,8 +53,8 @@ def get_or_create_meta(instance) -> [Any, bool]:
 
 def get_or_create_thread() -> [Any, bool]:
     """
-    Get or create the local thread, will always return False as the thread
-    won't be created, but the local dal object will.
+    Get or create the context local storage, will always return False as
+    the storage won't be created, but the local dal object will.
 
     get_or_create to conform with the other functions.
 
@@ -0,0 +1,138 @@
+"""
+Process local caches that are used throughout django-automated-logging
+"""
+
+from collections import OrderedDict, namedtuple
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+CacheInfo = namedtuple("CacheInfo", ("hits", "misses", "size", "maxsize"))
+
+_invalidators: List[Callable[[], None]] = []
+
+
+def invalidator(func: Callable[[], None]) -> Callable[[], None]:
+    """
+    Decorator used to register a function that clears a cache, which is
+    derived from the settings or the exclusion decorators.
+    """
+    _invalidators.append(func)
+    return func
+
+
+def invalidate() -> None:
+    """
+    Call every registered invalidator,
+    used when the settings are reloaded or the decorators changed.
+    """
+    for func in _invalidators:
+        func()
+
+
+class IdentityCache:
+    """
+    Process local cache for rows, that are essentially never changing
+    and are identified by their natural key, like Application (name),
+    ModelMirror (application, name) and ModelField (application, model, name).
+
+    Instances are only cached once the transaction they have been written
+    in is committed. If a row disappears (deletion or failed write)
+    the cache needs to be invalidated via discard() or clear().
+    """
+
+    def __init__(self):
+        self.rows: Dict[Hashable, Any] = {}
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """get the cached instance, None if it isn't cached"""
+        return self.rows.get(key)
+
+    def set(self, key: Hashable, instance: Any) -> Any:
+        """cache the instance under the key, returns the instance"""
+        self.rows[key] = instance
+        return instance
+
+    def discard(self, instances: Iterable[Any]) -> None:
+        """remove every cached instance that has the same primary key"""
+        pks = {i.pk for i in instances}
+        if not pks:
+            return
+
+        # list() creates a snapshot, other threads might modify rows
+        for key, value in list(self.rows.items()):
+            if value.pk in pks:
+                self.rows.pop(key, None)
+
+    def invalidate(self, sender, instance, **kwargs) -> None:
+        """receiver for post_delete, removes the deleted instance"""
+        self.discard([instance])
+
+    def clear(self) -> None:
+        """remove all cached instances"""
+        self.rows.clear()
+
+
+identities = IdentityCache()
+
+
+class ExclusionCache:
+    """
+    Bounded process local cache of exclusion verdicts, the least recently
+    used verdict is evicted once maxsize is reached.
+
+    Keys are tuples of stable identifiers, the first item is the kind of
+    the decision, e.g. ("model", <module>.<name>, app_label, operation).
+    Verdicts depend on the settings and decorators, the cache is cleared
+    when either of them changes.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.verdicts: OrderedDict = OrderedDict()
+        self.lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+        # incremented on clear(), verdicts computed before are not stored
+        self.generation = 0
+
+    def get(self, key: Hashable, compute: Callable[[], bool]) -> bool:
+        """
+        get the cached verdict, compute and cache it if it isn't cached
+
+        :param key: identifiers of the decision
+        :param compute: function that computes the verdict
+        :return: verdict
+        """
+        with self.lock:
+            if key in self.verdicts:
+                self.hits += 1
+                self.verdicts.move_to_end(key)
+                return self.verdicts[key]
+
+            self.misses += 1
+            generation = self.generation
+
+        verdict = compute()
+
+        with self.lock:
+            if generation == self.generation:
+                self.verdicts[key] = verdict
+                while len(self.verdicts) > self.maxsize:
+                    self.verdicts.popitem(last=False)
+
+        return verdict
+
+    def info(self) -> CacheInfo:
+        """hit and miss counters, modelled after lru_cache.cache_info()"""
+        return CacheInfo(self.hits, self.misses, len(self.verdicts), self.maxsize)
+
+    def clear(self) -> None:
+        """remove all cached verdicts"""
+        with self.lock:
+            self.generation += 1
+            self.verdicts.clear()
+
+
+verdicts = ExclusionCache()
+invalidator(verdicts.clear)
@@ -0,0 +1,146 @@
+"""
+Removal of events that exceed their max_age
+"""
+
+from threading import Lock
+from time import monotonic
+from typing import Dict, List, Optional, Tuple, Type
+
+from django.db import transaction
+from django.db.models import Model
+from django.utils import timezone
+
+_lock = Lock()
+_last: Optional[float] = None
+
+
+def _purge(
+    model: Type[Model],
+    threshold,
+    chunk: int,
+    dependents: List[Tuple[Type[Model], str]] = (),
+    owned: List[Tuple[Type[Model], str]] = (),
+) -> int:
+    """
+    Delete every instance of the model that was created before the threshold
+    in chunks of primary keys, every chunk is deleted in its own transaction.
+
+    Deletions are done via raw DELETE statements, therefore cascades
+    are done manually.
+
+    :param model: model of the events to be deleted
+    :param threshold: datetime, everything created before will be deleted
+    :param chunk: number of events deleted per transaction
+    :param dependents: (model, field) that reference the model and are deleted
+    :param owned: (model, field) that are referenced by the model and only used
+                  by the model and are therefore deleted
+    :return: number of events deleted
+    """
+    from automated_logging.routers import database
+
+    total = 0
+    while True:
+        with transaction.atomic(using=database()):
+            queryset = model.objects.filter(created_at__lte=threshold)
+            rows = list(
+                queryset.values_list("pk", *[f"{f}_id" for _, f in owned])[:chunk]
+            )
+            if not rows:
+                break
+
+            pks = [row[0] for row in rows]
+            for dependent, field in dependents:
+                dependent.objects.filter(**{f"{field}__in": pks})._raw_delete(
+                    dependent.objects.db
+                )
+
+            model.objects.filter(pk__in=pks)._raw_delete(model.objects.db)
+
+            for idx, (dependency, _) in enumerate(owned, start=1):
+                references = {row[idx] for row in rows if row[idx] is not None}
+                dependency.objects.filter(pk__in=references)._raw_delete(
+                    dependency.objects.db
+                )
+
+        total += len(rows)
+
+    return total
+
+
+def purge(config, chunk: Optional[int] = None) -> Dict[str, int]:
+    """
+    Delete every event that exceeds the max_age of its module.
+
+    :param config: settings to be used
+    :param chunk: number of events deleted per transaction, defaults to settings
+    :return: number of events deleted per module
+    """
+    from automated_logging.models import (
+        ModelEvent,
+        ModelValueModification,
+        ModelRelationshipModification,
+        RequestEvent,
+        RequestContext,
+        UnspecifiedEvent,
+    )
+
+    current = timezone.now()
+    chunk = chunk or config.purge.chunk
+    deleted = {}
+
+    if config.model.max_age:
+        deleted["model"] = _purge(
+            ModelEvent,
+            current - config.model.max_age,
+            chunk,
+            dependents=[
+                (ModelValueModification, "event"),
+                (ModelRelationshipModification, "event"),
+            ],
+        )
+
+    if config.unspecified.max_age:
+        deleted["unspecified"] = _purge(
+            UnspecifiedEvent, current - config.unspecified.max_age, chunk
+        )
+
+    if config.request.max_age:
+        deleted["request"] = _purge(
+            RequestEvent,
+            current - config.request.max_age,
+            chunk,
+            owned=[(RequestContext, "request"), (RequestContext, "response")],
+        )
+
+    return deleted
+
+
+def throttled_purge(config) -> Optional[Dict[str, int]]:
+    """
+    Only purge if the last purge in this process was
+    longer ago than the interval specified in the settings.
+    If the interval is None, nothing is purged, as it's done via dal_purge.
+
+    :param config: settings to be used
+    :return: number of events deleted per module, None if not purged
+    """
+    global _last
+
+    interval = config.purge.interval
+    if interval is None:
+        return None
+
+    # another thread is already purging
+    if not _lock.acquire(blocking=False):
+        return None
+
+    try:
+        current = monotonic()
+        if _last is not None and current - _last < interval.total_seconds():
+            return None
+
+        _last = current
+    finally:
+        _lock.release()
+
+    return purge(config)
@@ -0,0 +1,152 @@
+"""
+Sampling of requests, decides if a request is going to be recorded
+before any event is built.
+"""
+
+import random
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Callable, Hashable, Optional
+
+from automated_logging.helpers import function2path
+from automated_logging.helpers.cache import invalidator
+
+
+class TokenBucket:
+    """
+    Token bucket, that holds up to burst tokens and
+    is refilled with rate tokens per second.
+    """
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class RateLimiter:
+    """
+    Token buckets per key (e.g. path), the least recently used buckets
+    are discarded once there are more than maxsize buckets.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self.buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+        self.lock = Lock()
+
+    def acquire(self, key: Hashable, rate: float, burst: int) -> bool:
+        """
+        Take a token from the bucket of the key.
+
+        :param key: key of the bucket
+        :param rate: tokens per second
+        :param burst: size of the bucket
+        :return: was a token available?
+        """
+        with self.lock:
+            now = monotonic()
+
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(burst, now)
+                if len(self.buckets) > self.maxsize:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(key)
+                elapsed = now - bucket.updated
+                bucket.tokens = min(burst, bucket.tokens + elapsed * rate)
+                bucket.updated = now
+
+            if bucket.tokens < 1:
+                return False
+
+            bucket.tokens -= 1
+            return True
+
+    def clear(self) -> None:
+        """remove every bucket"""
+        with self.lock:
+            self.buckets.clear()
+
+
+limiter = RateLimiter()
+invalidator(limiter.clear)
+
+
+def view_path(function: Callable) -> str:
+    """path of a view, class-based views use the path of their class"""
+    return function2path(getattr(function, "view_class", function))
+
+
+def sample_rate(
+    function: Optional[Callable], application: Optional[str], status: Optional[int]
+) -> float:
+    """
+    Determine the sample rate of a request, the first rate found is used:
+    the status code (e.g. 404), the status class (e.g. 4xx), the view,
+    the application and at last the global rate.
+    The status comes first, so that e.g. errors of a sampled application
+    can still be recorded entirely.
+
+    :param function: view function or None
+    :param application: application of the view or None
+    :param status: status code or None
+    :return: rate between 0 and 1
+    """
+    from automated_logging.settings import settings
+
+    sample = settings.request.sample
+
+    if status is not None and sample.status:
+        rate = sample.status.get(str(status))
+        if rate is None:
+            rate = sample.status.get(f"{str(status)[0]}xx")
+        if rate is not None:
+            return rate
+
+    if function and sample.views:
+        rate = sample.views.get(view_path(function))
+        if rate is not None:
+            return rate
+
+    if application and application in sample.applications:
+        return sample.applications[application]
+
+    return sample.rate
+
+
+def sampled(
+    function: Optional[Callable], application: Optional[str], status: Optional[int]
+) -> bool:
+    """
+    Decide if a request is going to be recorded via the sample rate.
+
+    :param function: view function or None
+    :param application: application of the view or None
+    :param status: status code or None
+    :return: record the request?
+    """
+    rate = sample_rate(function, application, status)
+    return rate >= 1 or random.random() < rate
+
+
+def limited(path: str) -> bool:
+    """
+    Decide if a request is not going to be recorded via the token bucket
+    of the path, if limit is set. Only called for requests,
+    that are going to be recorded otherwise, as it takes a token.
+
+    :param path: path of the request
+    :return: drop the request?
+    """
+    from automated_logging.settings import settings
+
+    sample = settings.request.sample
+
+    if sample.limit is None:
+        return False
+
+    return not limiter.acquire(path, sample.limit, sample.burst)
@@ -2,6 +2,8 @@ import re
 import typing
 from collections import namedtuple
 from datetime import timedelta
+from fnmatch import translate
+from functools import cached_property
 from typing import NamedTuple
 
 from marshmallow import Schema, EXCLUDE, post_load
@@ -150,6 +152,87 @@ class SearchString(String):
         return Search("glob", output)
 
 
+def _combine(patterns: typing.List[str], flags: int = 0) -> typing.List[re.Pattern]:
+    """
+    compile the patterns into as few regular expressions as possible,
+    patterns with groups are compiled individually, as numbered
+    backreferences would no longer point to the right group.
+    """
+    compiled = [re.compile(p, flags) for p in patterns]
+    single = [c for c in compiled if c.groups]
+    combinable = [c.pattern for c in compiled if not c.groups]
+    if not combinable:
+        return single
+
+    try:
+        combined = re.compile("|".join(f"(?:{p})" for p in combinable), flags)
+    except re.error:
+        # e.g. global flags, which are only valid at the start of the pattern
+        return compiled
+
+    return [combined, *single]
+
+
+class Scope(frozenset):
+    """
+    Immutable set of Search, that is compiled into a single matcher on first use.
+    plain values are looked up in a hash set, glob values (translated via
+    fnmatch.translate) and regex values are combined into an alternation each.
+    """
+
+    def __or__(self, other):
+        return Scope(frozenset.__or__(self, other))
+
+    @cached_property
+    def matcher(
+        self,
+    ) -> typing.Tuple[
+        typing.Set[str], typing.List[re.Pattern], typing.List[re.Pattern]
+    ]:
+        """compiled matcher, (plain values, glob patterns, regex patterns)"""
+        plain = {s.value.lower() for s in self if s.type == "plain"}
+        # named groups created by translate() are unique, these can always be combined
+        globs = [translate(s.value.lower()) for s in self if s.type == "glob"]
+        globs = [re.compile("|".join(f"(?:{p})" for p in globs))] if globs else []
+        regex = _combine([s.value for s in self if s.type == "regex"], re.IGNORECASE)
+
+        return plain, globs, regex
+
+    def match(self, candidate: str) -> bool:
+        """
+        Check if the candidate matches any of the Search in the scope,
+        plain and glob ignore the case of the candidate, regex uses re.IGNORECASE.
+
+        :param candidate: string to be checked
+        :return: matches?
+        """
+        plain, globs, regex = self.matcher
+        lower = candidate.lower()
+
+        return (
+            lower in plain
+            or any(p.match(lower) for p in globs)
+            or any(p.match(candidate) for p in regex)
+        )
+
+
+class SearchSet(Set):
+    """
+    Set of SearchString, that is deserialized into a Scope,
+    the Scope is compiled when loading, to surface invalid regular expressions.
+    """
+
+    def _deserialize(self, value, attr, data, **kwargs) -> Scope:
+        output = Scope(super()._deserialize(value, attr, data, **kwargs))
+
+        try:
+            output.matcher
+        except re.error as error:
+            raise self.make_error("invalid") from error
+
+        return output
+
+
 class MissingNested(Nested):
     """
     Modified marshmallow Nested, that is defaulting missing to loading an empty
@@ -192,7 +275,7 @@ class BaseSchema(Schema):
             if not hasattr(right, name):
                 continue
 
-            if isinstance(field, tuple) or isinstance(field, set):
+            if isinstance(field, (tuple, set, frozenset)):
                 values[name] = field | getattr(right, name)
 
         return left._replace(**values)
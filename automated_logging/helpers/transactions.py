@@ -0,0 +1,73 @@
+"""
+Deferral of model events until the transaction of the user has been committed
+"""
+
+from typing import Callable, Optional
+
+from django.db import transaction
+
+# attribute on the connection that points to the most recently registered buffer
+ATTRIBUTE = "_dal_on_commit"
+
+
+class Deferred(list):
+    """
+    Functions that are deferred until the transaction commits,
+    is registered as the on_commit callback itself.
+
+    Every buffer belongs to a specific set of savepoints, if one of those
+    is rolled back, Django discards the callback and with it every function.
+    """
+
+    def __init__(self, savepoints: set):
+        super().__init__()
+        self.savepoints = savepoints
+        self.flushed = False
+
+    def __call__(self) -> None:
+        self.flushed = True
+        for func in self:
+            func()
+
+
+def _current(connection) -> Optional[Deferred]:
+    """
+    the most recently registered buffer of the connection, if it is still
+    registered and belongs to the current savepoints, None otherwise.
+    """
+    buffer = getattr(connection, ATTRIBUTE, None)
+    if buffer is None or buffer.flushed:
+        return None
+
+    if buffer.savepoints != set(connection.savepoint_ids):
+        return None
+
+    # the callback is discarded by Django on rollback
+    for entry in reversed(connection.run_on_commit):
+        if entry[1] is buffer:
+            return buffer
+
+    return None
+
+
+def on_commit(func: Callable[[], None], using: Optional[str] = None) -> None:
+    """
+    Call func once the current transaction has been committed, functions of the
+    same transaction (and savepoint) are batched into a single on_commit callback
+    and are discarded on rollback. Outside of a transaction func is called immediately.
+
+    :param func: function to be called
+    :param using: database alias of the transaction
+    :return: None
+    """
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        return func()
+
+    buffer = _current(connection)
+    if buffer is None:
+        buffer = Deferred(set(connection.savepoint_ids))
+        setattr(connection, ATTRIBUTE, buffer)
+        transaction.on_commit(buffer, using=using)
+
+    buffer.append(func)
@@ -0,0 +1,68 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from automated_logging.collector import Collector
+from automated_logging.handlers import DatabaseHandler
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the collector, that receives the records of every process "
+        "configured with the collector option and writes them to the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="path of the unix domain socket")
+        parser.add_argument(
+            "--batch",
+            type=int,
+            default=1000,
+            help="number of rows written per transaction",
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=1.0,
+            help="maximum number of seconds a record waits before it is written",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="number of threads, that write to the database",
+        )
+        parser.add_argument(
+            "--spool",
+            default=None,
+            help=(
+                "path of the spool, records are spooled if the database is "
+                "unavailable and replayed via dal_replay (default: <path>.spool)"
+            ),
+        )
+
+    def handle(self, *args, **options):
+        # the records of every process are only held by the collector,
+        # they must not be lost if the database is unavailable
+        spool = options["spool"] or f"{options['path']}.spool"
+        handler = DatabaseHandler(
+            batch=options["batch"],
+            bulk=True,
+            threading=True,
+            workers=options["workers"],
+            latency=options["latency"],
+            spool={"path": spool},
+        )
+        collector = Collector(options["path"], handler, latency=options["latency"])
+
+        previous = signal.signal(signal.SIGTERM, lambda *_: collector.shutdown())
+        self.stdout.write(f"collecting records on {collector.path}")
+
+        try:
+            collector.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            signal.signal(signal.SIGTERM, previous)
+            collector.close()
+            handler.close()
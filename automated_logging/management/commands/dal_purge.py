@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from automated_logging.helpers.purge import purge
+from automated_logging.settings import settings
+
+
+class Command(BaseCommand):
+    help = "Delete all events that exceed the max_age configured in AUTOMATED_LOGGING."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk",
+            type=int,
+            default=None,
+            help="number of events deleted per transaction",
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge(settings, chunk=options["chunk"])
+
+        for module, count in deleted.items():
+            self.stdout.write(f"{module}: deleted {count} events")
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from automated_logging.handlers import DatabaseHandler
+from automated_logging.spool import Spool
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay the records and events of a spool, "
+        "that have been written while the database was unavailable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="path of the spool configured for the handler")
+        parser.add_argument(
+            "--batch",
+            type=int,
+            default=1000,
+            help="number of rows written per transaction",
+        )
+
+    def handle(self, *args, **options):
+        handler = DatabaseHandler(batch=options["batch"], bulk=True)
+
+        try:
+            spool = Spool(options["path"])
+            replayed = spool.replay(handler.replay, done=handler.flush)
+        finally:
+            handler.close()
+
+        self.stdout.write(f"replayed {replayed} items")
@@ -0,0 +1,260 @@
+"""
+Managers and QuerySets that record bulk operations (update, bulk_create
+and bulk_update), which do not send pre_save and post_save signals.
+"""
+
+import logging
+from functools import partial
+from typing import Any, Dict, Iterator, List, Tuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, transaction
+from django.db.models import Manager, Model, QuerySet
+
+from automated_logging.helpers.enums import Operation, PastOperationMap
+
+logger = logging.getLogger(__name__)
+
+# maximum number of rows, that are fetched and recorded at once
+CHUNK = 1000
+
+
+class LoggingQuerySetMixin:
+    """
+    Mixin for QuerySets, that records update(), bulk_create() and bulk_update()
+    as model events. The previous values are fetched with a single query per batch,
+    every operation is sent to the handler as a single log record
+    (update() sends a record per chunk of CHUNK rows).
+
+    bulk_create() with ignore_conflicts or update_conflicts records every object
+    as created, as the database does not report which rows conflicted.
+    Objects without a primary key (the database cannot return the inserted rows)
+    are not recorded.
+
+    usage:
+        class Example(Model):
+            objects = LoggingManager()
+
+        class ExampleQuerySet(LoggingQuerySetMixin, QuerySet):
+            pass
+    """
+
+    # set on the querysets that are used internally by bulk_update(),
+    # which calls update() on a filtered queryset
+    _dal_muted = False
+
+    def _clone(self):
+        clone = super()._clone()
+        clone._dal_muted = self._dal_muted
+        return clone
+
+    def _dal_enabled(self, operation: Operation) -> bool:
+        """is the model module enabled and the model not excluded?"""
+        from automated_logging.settings import settings
+        from automated_logging.signals import lazy_model_exclusion
+
+        if self._dal_muted:
+            return False
+
+        return "model" in settings.modules and not lazy_model_exclusion(
+            self.model, operation, self.model
+        )
+
+    def _dal_chunks(self, pks: List[Any]) -> Iterator[List[Any]]:
+        """
+        Split the primary keys into chunks, that are supported by the database
+        and contain at most CHUNK primary keys.
+        """
+        size = connections[self.db].ops.bulk_batch_size(["pk"], pks) or len(pks)
+        size = min(size, CHUNK)
+
+        for idx in range(0, len(pks), size):
+            yield pks[idx : idx + size]
+
+    def _dal_values(self, pks: List[Any], attnames: List[str]) -> Dict[Any, Dict]:
+        """
+        Fetch the current values of the rows in batches,
+        that are supported by the database.
+
+        :param pks: primary keys of the rows
+        :param attnames: attnames of the fields to be fetched
+        :return: {pk: {attname: value}}
+        """
+        queryset = self.model._base_manager.using(self.db)
+
+        values = {}
+        for chunk in self._dal_chunks(pks):
+            rows = queryset.filter(pk__in=chunk)
+            for row in rows.values_list("pk", *attnames):
+                values[row[0]] = dict(zip(attnames, row[1:]))
+
+        return values
+
+    def _dal_log(
+        self, operation: Operation, changes: List[Tuple[Model, Dict, Dict]]
+    ) -> None:
+        """
+        Create the events of the changed instances and send them
+        as a single log record to the handler.
+
+        :param operation: operation of the bulk operation
+        :param changes: [(instance, previous values, current values)]
+        :return: None
+        """
+        from automated_logging.helpers import get_or_create_model_event
+        from automated_logging.helpers.transactions import on_commit
+        from automated_logging.settings import settings
+        from automated_logging.signals import value_modifications
+
+        events = []
+        for instance, previous, current in changes:
+            modifications = value_modifications(instance, previous, current)
+            if not modifications and operation == Operation.MODIFY:
+                continue
+
+            event, _ = get_or_create_model_event(
+                instance, operation, force=True, extra=True
+            )
+            events.append((event, modifications))
+
+        if not events:
+            return
+
+        past = {v: k for k, v in PastOperationMap.items()}
+        user = events[0][0].user
+        log = partial(
+            logger.log,
+            settings.model.loglevel,
+            f'{user or "Anonymous"} {past[operation]} {len(events)} '
+            f"{self.model._meta.app_label}.{self.model.__name__} | Bulk",
+            extra={
+                "action": "model[bulk]",
+                "data": {"status": operation, "model": self.model},
+                "events": events,
+            },
+        )
+
+        if settings.model.on_commit:
+            on_commit(log, self.db)
+        else:
+            log()
+
+    def update(self, **kwargs) -> int:
+        if not self._dal_enabled(Operation.MODIFY):
+            return super().update(**kwargs)
+
+        try:
+            fields = [self.model._meta.get_field(name) for name in kwargs.keys()]
+        except FieldDoesNotExist:
+            # let django raise the appropriate error
+            return super().update(**kwargs)
+
+        if self.query.is_sliced:
+            # let django raise the appropriate error
+            return super().update(**kwargs)
+
+        attnames = [f.attname for f in fields]
+        computed = any(hasattr(v, "resolve_expression") for v in kwargs.values())
+        features = connections[self.db].features
+        queryset = self.model._base_manager.using(self.db)
+
+        # FOR UPDATE is not allowed together with DISTINCT or GROUP BY
+        aggregated = self.query.group_by is not None or any(
+            a.contains_aggregate for a in self.query.annotations.values()
+        )
+        lockable = not self.query.distinct and not aggregated
+
+        rows = 0
+        with transaction.atomic(using=self.db, savepoint=False):
+            # the matching rows are locked, so that exactly the recorded rows
+            # are updated, even if the filter matches other rows meanwhile
+            locked = self
+            if features.has_select_for_update and lockable:
+                of = ("self",) if features.has_select_for_update_of else ()
+                locked = self.select_for_update(of=of)
+            pks = list(locked.order_by().values_list("pk", flat=True))
+
+            for chunk in self._dal_chunks(pks):
+                instances = list(queryset.filter(pk__in=chunk))
+                previous = [{a: i.__dict__.get(a) for a in attnames} for i in instances]
+
+                rows += queryset.filter(pk__in=chunk).update(**kwargs)
+
+                if computed:
+                    # the values are computed by the database, fetch them
+                    values = self._dal_values(chunk, attnames)
+                    for instance in instances:
+                        instance.__dict__.update(values.get(instance.pk, {}))
+                else:
+                    for instance in instances:
+                        for field, value in zip(fields, kwargs.values()):
+                            setattr(instance, field.name, value)
+
+                self._dal_log(
+                    Operation.MODIFY,
+                    [
+                        (i, p, {a: i.__dict__.get(a) for a in attnames})
+                        for i, p in zip(instances, previous)
+                    ],
+                )
+
+        return rows
+
+    update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs) -> List[Model]:
+        objs = list(objs)
+        created = super().bulk_create(objs, *args, **kwargs)
+
+        if self._dal_enabled(Operation.CREATE):
+            # databases, that cannot return the inserted rows, do not set
+            # the primary keys, those objects cannot be referenced by an entry
+            missing = [o for o in created if o.pk is None]
+            if missing:
+                logger.warning(
+                    f"[DAL] bulk_create could not record {len(missing)} "
+                    f"{self.model._meta.app_label}.{self.model.__name__} "
+                    f"without a primary key"
+                )
+
+            self._dal_log(
+                Operation.CREATE,
+                [(o, {}, o.__dict__) for o in created if o.pk is not None],
+            )
+
+        return created
+
+    bulk_create.alters_data = True
+
+    def bulk_update(self, objs, fields, *args, **kwargs) -> int:
+        if not self._dal_enabled(Operation.MODIFY):
+            return super().bulk_update(objs, fields, *args, **kwargs)
+
+        objs = list(objs)
+        attnames = [self.model._meta.get_field(name).attname for name in fields]
+        previous = self._dal_values([o.pk for o in objs], attnames)
+
+        muted = self._chain()
+        muted._dal_muted = True
+        rows = super(LoggingQuerySetMixin, muted).bulk_update(
+            objs, fields, *args, **kwargs
+        )
+
+        self._dal_log(
+            Operation.MODIFY,
+            [
+                (o, previous.get(o.pk, {}), {a: o.__dict__.get(a) for a in attnames})
+                for o in objs
+            ],
+        )
+        return rows
+
+    bulk_update.alters_data = True
+
+
+class LoggingQuerySet(LoggingQuerySetMixin, QuerySet):
+    """QuerySet that records bulk operations, see LoggingQuerySetMixin"""
+
+
+class LoggingManager(Manager.from_queryset(LoggingQuerySet)):
+    """Manager that records bulk operations, see LoggingQuerySetMixin"""
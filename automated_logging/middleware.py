@@ -1,9 +1,21 @@
 import logging
-import threading
+from contextvars import ContextVar
 from typing import NamedTuple, Optional, TYPE_CHECKING
 
+from asgiref.local import Local
 from django.http import HttpRequest, HttpResponse
 
+try:
+    from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+except ImportError:
+    # asgiref < 3.6, these are used by Django itself in the same manner
+    from asyncio import coroutines, iscoroutinefunction
+
+    def markcoroutinefunction(func):
+        func._is_coroutine = coroutines._is_coroutine
+        return func
+
+
 if TYPE_CHECKING:
     from django.contrib.auth.models import AbstractUser
 
@@ -17,19 +29,31 @@ RequestInformation = NamedTuple(
 )
 
 
+# context variable instead of threading.local, so that concurrent requests
+# served by the same thread (ASGI) do not share their request information.
+_environ: ContextVar[Optional[RequestInformation]] = ContextVar(
+    "automated_logging_environ", default=None
+)
+
+
 class AutomatedLoggingMiddleware:
     """
     Middleware used by django-automated-logging
     to provide request specific data to the request signals via
-    the local thread.
+    context variables, supports both WSGI and ASGI.
     """
 
-    thread = threading.local()
+    sync_capable = True
+    async_capable = True
+
+    # context local storage, used by the view decorators
+    thread = Local()
 
     def __init__(self, get_response):
         self.get_response = get_response
 
-        AutomatedLoggingMiddleware.thread.__dal__ = None
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     @staticmethod
     def save(request, response=None, exception=None):
@@ -38,7 +62,7 @@ class AutomatedLoggingMiddleware:
         the request_finished and request_started signals only
         expose the class, not the actual request and response.
 
-        We save the request and response specific data in the thread.
+        We save the request and response specific data in the current context.
 
         :param request: Django Request
         :param response: Optional Django Response
@@ -46,9 +70,7 @@ class AutomatedLoggingMiddleware:
         :return:
         """
 
-        AutomatedLoggingMiddleware.thread.__dal__ = RequestInformation(
-            request, response, exception
-        )
+        _environ.set(RequestInformation(request, response, exception))
 
     def __call__(self, request):
         """
@@ -62,6 +84,9 @@ class AutomatedLoggingMiddleware:
         :param request:
         :return:
         """
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
         self.save(request)
 
         response = self.get_response(request)
@@ -70,10 +95,25 @@ class AutomatedLoggingMiddleware:
 
         return response
 
+    async def __acall__(self, request):
+        """
+        Async version of __call__, that is used when served via ASGI.
+
+        :param request:
+        :return:
+        """
+        self.save(request)
+
+        response = await self.get_response(request)
+
+        self.save(request, response)
+
+        return response
+
     def process_exception(self, request, exception):
         """
         Exception proceeds the same as __call__ and therefore should
-        also save things in the local thread.
+        also save things in the current context.
 
         :param request: Django Request
         :param exception: Thrown Exception
@@ -90,21 +130,18 @@ class AutomatedLoggingMiddleware:
 
         :return: -
         """
-        AutomatedLoggingMiddleware.thread.__dal__ = None
+        _environ.set(None)
 
     @staticmethod
     def get_current_environ() -> Optional[RequestInformation]:
         """
-        Helper staticmethod that looks if the __dal__ custom attribute
-        is present and returns either the attribute or None
+        Helper staticmethod that returns the request information
+        of the current context or None
 
         :return: Optional[RequestInformation]
         """
 
-        if getattr(AutomatedLoggingMiddleware.thread, "__dal__", None):
-            return RequestInformation(*AutomatedLoggingMiddleware.thread.__dal__)
-
-        return None
+        return _environ.get()
 
     @staticmethod
     def get_current_user(
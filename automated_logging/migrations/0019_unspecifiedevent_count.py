@@ -0,0 +1,30 @@
+# Generated by Django 5.0.14 on 2026-10-17 16:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "automated_logging",
+            "0018_decoratoroverrideexclusiontest_foreignkeytest_fullclassbasedexclusiontest_fulldecoratorbasedexclusio",
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="unspecifiedevent",
+            name="count",
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name="unspecifiedevent",
+            name="first_seen",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="unspecifiedevent",
+            name="last_seen",
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.0.14 on 2026-10-17 21:59
+
+import hashlib
+
+from django.db import migrations, models
+from django.db.models import Count
+
+# (model, fields) of the unique constraints, in the order they need to be
+# deduplicated, as merging applications can duplicate mirrors and merging
+# mirrors can duplicate fields and entries.
+UNIQUE = (
+    ("Application", ("name",)),
+    ("ModelMirror", ("application", "name")),
+    ("ModelField", ("mirror", "name")),
+    ("ModelEntry", ("mirror", "primary_key")),
+)
+
+
+def deduplicate(apps, schema_editor):
+    """
+    Merge the rows, that would violate the unique constraints,
+    into the oldest one. References to the merged rows are updated.
+    """
+    alias = schema_editor.connection.alias
+
+    for name, fields in UNIQUE:
+        model = apps.get_model("automated_logging", name)
+        manager = model._base_manager.using(alias)
+        relations = [r for r in model._meta.related_objects if r.field.many_to_one]
+
+        duplicates = (
+            manager.order_by()
+            .values(*fields)
+            .annotate(count=Count("id"))
+            .filter(count__gt=1)
+        )
+        for duplicate in list(duplicates):
+            del duplicate["count"]
+            pks = list(
+                manager.filter(**duplicate)
+                .order_by("created_at", "id")
+                .values_list("pk", flat=True)
+            )
+            kept, merged = pks[0], pks[1:]
+
+            for relation in relations:
+                related = relation.related_model._base_manager.using(alias)
+                related.filter(**{f"{relation.field.attname}__in": merged}).update(
+                    **{relation.field.attname: kept}
+                )
+            manager.filter(pk__in=merged).delete()
+
+
+def digest(apps, schema_editor):
+    """fill ModelEntry.digest, the sha256 of the primary key, in chunks"""
+    model = apps.get_model("automated_logging", "ModelEntry")
+    manager = model._base_manager.using(schema_editor.connection.alias)
+
+    last = None
+    while True:
+        entries = manager.order_by("pk").only("pk", "primary_key")
+        if last is not None:
+            entries = entries.filter(pk__gt=last)
+        entries = list(entries[:1000])
+        if not entries:
+            break
+
+        for entry in entries:
+            entry.digest = hashlib.sha256(entry.primary_key.encode()).hexdigest()
+        manager.bulk_update(entries, ["digest"])
+        last = entries[-1].pk
+
+
+# the unique constraints are added by 0022 in its own migration (and transaction),
+# as PostgreSQL does not allow altering a table with pending trigger events.
+class Migration(migrations.Migration):
+    dependencies = [
+        ("automated_logging", "0020_user_db_constraint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="modelentry",
+            name="digest",
+            field=models.CharField(default="", editable=False, max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(deduplicate, migrations.RunPython.noop),
+        migrations.RunPython(digest, migrations.RunPython.noop),
+    ]
@@ -2,6 +2,7 @@
 Model definitions for django-automated-logging.
 """
 
+import hashlib
 import uuid
 
 from django.conf import settings
@@ -9,7 +10,9 @@ from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.db.models import (
     CASCADE,
+    DO_NOTHING,
     CharField,
+    DateTimeField,
     DurationField,
     ForeignKey,
     GenericIPAddressField,
@@ -17,6 +20,7 @@ from django.db.models import (
     PositiveSmallIntegerField,
     SmallIntegerField,
     TextField,
+    UniqueConstraint,
 )
 from picklefield.fields import PickledObjectField
 
@@ -34,8 +38,9 @@ class BaseModel(models.Model):
 
     id = models.UUIDField(default=uuid.uuid4, primary_key=True, db_index=True)
 
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    # created_at is used by the purge, updated_at by the admin
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         abstract = True
@@ -55,6 +60,9 @@ class Application(BaseModel):
     class Meta:
         verbose_name = "Application"
         verbose_name_plural = "Applications"
+        constraints = [
+            UniqueConstraint(fields=("name",), name="automated_logging_application")
+        ]
 
     class LoggingIgnore:
         complete = True
@@ -76,6 +84,11 @@ class ModelMirror(BaseModel):
     class Meta:
         verbose_name = "Model Mirror"
         verbose_name_plural = "Model Mirrors"
+        constraints = [
+            UniqueConstraint(
+                fields=("application", "name"), name="automated_logging_modelmirror"
+            )
+        ]
 
     class LoggingIgnore:
         complete = True
@@ -99,6 +112,11 @@ class ModelField(BaseModel):
     class Meta:
         verbose_name = "Model Field"
         verbose_name_plural = "Model Fields"
+        constraints = [
+            UniqueConstraint(
+                fields=("mirror", "name"), name="automated_logging_modelfield"
+            )
+        ]
 
     class LoggingIgnore:
         complete = True
@@ -114,14 +132,31 @@ class ModelEntry(BaseModel):
 
     value = TextField()  # (repr)
     primary_key = TextField()
+    # sha256 of the primary key, used by the unique constraint, as a TextField
+    # cannot be part of it everywhere and primary keys have no maximum length
+    digest = CharField(max_length=64, editable=False)
 
     class Meta:
         verbose_name = "Model Entry"
         verbose_name_plural = "Model Entries"
+        constraints = [
+            UniqueConstraint(
+                fields=("mirror", "digest"), name="automated_logging_modelentry"
+            )
+        ]
 
     class LoggingIgnore:
         complete = True
 
+    @staticmethod
+    def make_digest(primary_key) -> str:
+        """digest of the primary key, as it is stored in digest"""
+        return hashlib.sha256(str(primary_key).encode()).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.digest = self.make_digest(self.primary_key)
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return f"{self.mirror.name}" f'(pk="{self.primary_key}", value="{self.value}")'
 
@@ -151,9 +186,11 @@ class ModelEvent(BaseModel):
         choices=DjangoOperations,
     )
 
+    # without a constraint, as events might be stored in their own database
+    # deleted via routers.cascade(), users might be stored in another database
     user = ForeignKey(
-        settings.AUTH_USER_MODEL, on_delete=CASCADE, null=True
-    )  # maybe don't cascade?
+        settings.AUTH_USER_MODEL, on_delete=DO_NOTHING, null=True, db_constraint=False
+    )
     entry = ForeignKey(ModelEntry, on_delete=CASCADE)
 
     # modifications = None  # One2Many -> ModelModification
@@ -301,7 +338,11 @@ class RequestEvent(BaseModel):
     status and method are their respective HTTP equivalents.
     """
 
-    user = ForeignKey(settings.AUTH_USER_MODEL, on_delete=CASCADE, null=True)
+    # without a constraint, as events might be stored in their own database
+    # deleted via routers.cascade(), users might be stored in another database
+    user = ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=DO_NOTHING, null=True, db_constraint=False
+    )
 
     # to mitigate "max_length"
     uri = TextField()
@@ -342,6 +383,11 @@ class UnspecifiedEvent(BaseModel):
 
     application = ForeignKey(Application, on_delete=CASCADE)
 
+    # number of records this event represents, see unspecified.aggregate
+    count = PositiveIntegerField(default=1)
+    first_seen = DateTimeField(null=True)
+    last_seen = DateTimeField(null=True)
+
     class Meta:
         verbose_name = "Unspecified Event"
         verbose_name_plural = "Unspecified Events"
@@ -0,0 +1,94 @@
+"""
+Database router, that moves the events of django-automated-logging
+to their own database (database.alias in AUTOMATED_LOGGING).
+
+usage (settings.py):
+    DATABASE_ROUTERS = ["automated_logging.routers.DatabaseRouter"]
+"""
+
+from typing import Optional, Type
+
+from django.db import router
+from django.db.models import Model
+
+APP_LABEL = "automated_logging"
+
+
+def is_event_model(model: Type[Model]) -> bool:
+    """is the model one of the models used to store events?"""
+    from automated_logging.models import BaseModel
+
+    return issubclass(model, BaseModel)
+
+
+def database() -> str:
+    """
+    The database alias events are written to, as decided by the routers.
+    Used for transactions, as transaction.atomic() does not consult the routers.
+    """
+    from automated_logging.models import ModelEvent
+
+    return router.db_for_write(ModelEvent)
+
+
+def cascade(sender, instance: Model, **kwargs) -> None:
+    """
+    Receiver for post_delete of the user model, deletes the events of the user.
+    The foreign keys to users do not cascade, as the collector of the deletion
+    would query the events on the database of the user instead of the alias.
+    """
+    from automated_logging.models import ModelEvent, RequestEvent
+
+    for model in (ModelEvent, RequestEvent):
+        model.objects.filter(user_id=instance.pk).delete()
+
+
+class DatabaseRouter:
+    """
+    Routes every read and write of the models of django-automated-logging
+    to database.alias and only migrates them on that database.
+    Reads of the admin are routed to database.replica by the admin itself.
+    """
+
+    @staticmethod
+    def _alias() -> str:
+        from automated_logging.settings import settings
+
+        return settings.database.alias
+
+    def db_for_read(self, model: Type[Model], **hints) -> Optional[str]:
+        if is_event_model(model):
+            return self._alias()
+        return None
+
+    def db_for_write(self, model: Type[Model], **hints) -> Optional[str]:
+        if is_event_model(model):
+            return self._alias()
+        return None
+
+    def allow_relation(self, obj1: Model, obj2: Model, **hints) -> Optional[bool]:
+        # events only relate to each other and to users,
+        # the foreign keys to users have no constraint
+        if is_event_model(obj1.__class__) or is_event_model(obj2.__class__):
+            return True
+        return None
+
+    def allow_migrate(
+        self, db: str, app_label: str, model_name: Optional[str] = None, **hints
+    ) -> Optional[bool]:
+        from django.apps import apps
+
+        if app_label != APP_LABEL:
+            return None
+
+        if model_name is not None:
+            try:
+                model = apps.get_model(app_label, model_name)
+            except LookupError:
+                # the model has been removed since, it was one of ours
+                model = None
+
+            if model is not None and not is_event_model(model):
+                return None
+
+        return db == self._alias()
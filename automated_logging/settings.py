@@ -3,13 +3,17 @@ Serialization of AUTOMATED_LOGGING_SETTINGS
 """
 
 from collections import namedtuple
+from datetime import timedelta
 from functools import lru_cache
 from logging import INFO, NOTSET, CRITICAL
 from pprint import pprint
 
-from marshmallow.fields import Boolean, Integer
-from marshmallow.validate import OneOf, Range
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from marshmallow.fields import Boolean, Dict, Float, Integer, String
+from marshmallow.validate import OneOf, Range, Regexp
 
+from automated_logging.helpers.cache import invalidate
 from automated_logging.helpers.schemas import (
     Set,
     LowerCaseString,
@@ -17,6 +21,8 @@ from automated_logging.helpers.schemas import (
     MissingNested,
     BaseSchema,
     Search,
+    SearchSet,
+    Scope,
     Duration,
 )
 
@@ -28,7 +34,7 @@ class RequestExcludeSchema(BaseSchema):
     """
 
     unknown = Boolean(missing=False)
-    applications = Set(SearchString(), missing=set())
+    applications = SearchSet(SearchString(), missing=Scope())
 
     methods = Set(LowerCaseString(), missing={"GET"})
     status = Set(Integer(validate=Range(min=0)), missing={200})
@@ -39,6 +45,9 @@ class RequestDataSchema(BaseSchema):
     Configuration schema for request data that is only used in RequestSchema
     and is used to enable data collection, ignore keys that are going to be omitted
     mask keys (their value is going to be replaced with <REDACTED>)
+
+    max_size is the maximum size of a body in bytes that is going to be recorded,
+    bodies that are larger, streamed or not of content_types are omitted.
     """
 
     enabled = Set(
@@ -56,6 +65,34 @@ class RequestDataSchema(BaseSchema):
         missing={"application/json"},
     )
 
+    max_size = Integer(missing=64 * 1024, validate=Range(min=0), allow_none=True)
+
+
+class RequestSampleSchema(BaseSchema):
+    """
+    Configuration schema for request sampling, that is only used in RequestSchema.
+
+    rate is the fraction of requests that are recorded, which can be overwritten
+    per view (<module>.<view>), application or status (e.g. 404 or 5xx), the most
+    specific rate is used. limit is the number of requests per second
+    (with bursts of up to burst requests) that are recorded per path.
+    """
+
+    rate = Float(missing=1.0, validate=Range(min=0, max=1))
+
+    views = Dict(keys=String(), values=Float(validate=Range(min=0, max=1)), missing={})
+    applications = Dict(
+        keys=String(), values=Float(validate=Range(min=0, max=1)), missing={}
+    )
+    status = Dict(
+        keys=String(validate=Regexp(r"^[1-5](\d\d|xx)$")),
+        values=Float(validate=Range(min=0, max=1)),
+        missing={},
+    )
+
+    limit = Float(missing=None, validate=Range(min=0, min_inclusive=False))
+    burst = Integer(missing=1, validate=Range(min=1))
+
 
 class RequestSchema(BaseSchema):
     """
@@ -66,6 +103,7 @@ class RequestSchema(BaseSchema):
     exclude = MissingNested(RequestExcludeSchema)
 
     data = MissingNested(RequestDataSchema)
+    sample = MissingNested(RequestSampleSchema)
 
     ip = Boolean(missing=True)
     # TODO: performance setting?
@@ -87,9 +125,22 @@ class ModelExcludeSchema(BaseSchema):
     """
 
     unknown = Boolean(missing=False)
-    fields = Set(SearchString(), missing=set())
-    models = Set(SearchString(), missing=set())
-    applications = Set(SearchString(), missing=set())
+    fields = SearchSet(SearchString(), missing=Scope())
+    models = SearchSet(SearchString(), missing=Scope())
+    applications = SearchSet(SearchString(), missing=Scope())
+
+
+class ModelM2MSchema(BaseSchema):
+    """
+    Configuration schema for many-to-many changes, that is only used in ModelSchema.
+
+    values indicates if the value (repr) of every target should be recorded,
+    which requires the targets to be loaded, otherwise only the primary keys are used.
+    chunk is the number of targets loaded per query and recorded per log record.
+    """
+
+    values = Boolean(missing=True)
+    chunk = Integer(missing=500, validate=Range(min=1))
 
 
 class ModelSchema(BaseSchema):
@@ -110,6 +161,15 @@ class ModelSchema(BaseSchema):
     performance = Boolean(missing=False)
     snapshot = Boolean(missing=False)
 
+    # if the previous values should be captured when an instance is loaded,
+    # instead of fetching them from the database before saving
+    tracking = Boolean(missing=False)
+
+    # if events should only be written after the transaction has been committed
+    on_commit = Boolean(missing=False)
+
+    m2m = MissingNested(ModelM2MSchema)
+
     max_age = Duration(missing=None)
 
 
@@ -121,8 +181,8 @@ class UnspecifiedExcludeSchema(BaseSchema):
     """
 
     unknown = Boolean(missing=False)
-    files = Set(SearchString(), missing=set())
-    applications = Set(SearchString(), missing=set())
+    files = SearchSet(SearchString(), missing=Scope())
+    applications = SearchSet(SearchString(), missing=Scope())
 
 
 class UnspecifiedSchema(BaseSchema):
@@ -133,6 +193,10 @@ class UnspecifiedSchema(BaseSchema):
     loglevel = Integer(missing=INFO, validate=Range(min=NOTSET, max=CRITICAL))
     exclude = MissingNested(UnspecifiedExcludeSchema)
 
+    # window in which records of the same origin and message
+    # are aggregated into a single event
+    aggregate = Duration(missing=None)
+
     max_age = Duration(missing=None)
 
 
@@ -145,15 +209,17 @@ class GlobalsExcludeSchema(BaseSchema):
     Things specified in globals will get appended to the other configurations.
     """
 
-    applications = Set(
+    applications = SearchSet(
         SearchString(),
-        missing={
-            Search("glob", "session*"),
-            Search("plain", "admin"),
-            Search("plain", "basehttp"),
-            Search("plain", "migrations"),
-            Search("plain", "contenttypes"),
-        },
+        missing=Scope(
+            {
+                Search("glob", "session*"),
+                Search("plain", "admin"),
+                Search("plain", "basehttp"),
+                Search("plain", "migrations"),
+                Search("plain", "contenttypes"),
+            }
+        ),
     )
 
 
@@ -165,6 +231,32 @@ class GlobalsSchema(BaseSchema):
     exclude = MissingNested(GlobalsExcludeSchema)
 
 
+class PurgeSchema(BaseSchema):
+    """
+    Configuration schema for the removal of events that exceed their max_age.
+
+    interval is the minimum time between two removals per process,
+    if None events are only removed via `manage.py dal_purge`.
+    chunk is the number of events removed per transaction.
+    """
+
+    interval = Duration(missing=timedelta(minutes=1), allow_none=True)
+    chunk = Integer(missing=1000, validate=Range(min=1))
+
+
+class DatabaseSchema(BaseSchema):
+    """
+    Configuration schema for the database of the events,
+    which is applied by automated_logging.routers.DatabaseRouter.
+
+    alias is the database every event is read from and written to,
+    replica is an optional database the admin reads the events from.
+    """
+
+    alias = String(missing="default")
+    replica = String(missing=None, allow_none=True)
+
+
 class ConfigSchema(BaseSchema):
     """
     Skeleton configuration schema, that is used to enable/disable modules
@@ -180,6 +272,8 @@ class ConfigSchema(BaseSchema):
     model = MissingNested(ModelSchema)
     unspecified = MissingNested(UnspecifiedSchema)
 
+    purge = MissingNested(PurgeSchema)
+    database = MissingNested(DatabaseSchema)
     globals = MissingNested(GlobalsSchema)
 
 
@@ -188,20 +282,20 @@ default: namedtuple = ConfigSchema().load({})
 
 class Settings:
     """
-    Settings wrapper,
-    with the wrapper we can force lru_cache to be
-    cleared on the specific instance
+    Settings wrapper, the loaded settings are published as
+    attributes of the instance, so that reading them is a plain
+    attribute lookup. Changes to AUTOMATED_LOGGING need to be
+    applied via load(), this is done automatically on setting_changed.
     """
 
     def __init__(self):
         self.loaded = None
         self.load()
 
-    @lru_cache()
     def load(self):
         """
-        loads settings from the schemes provided,
-        done via function to utilize LRU cache
+        loads settings from the schemes provided, merges the globals
+        and publishes the result as a new snapshot.
         """
 
         from django.conf import settings as st
@@ -212,29 +306,28 @@ class Settings:
             loaded = ConfigSchema().load(st.AUTOMATED_LOGGING)
 
         # be sure `loaded` has globals as we're working with those,
-        # if that is not the case early return.
-        if not hasattr(loaded, "globals"):
-            return loaded
-
-        # use the binary **or** operator to apply globals to Set() attributes
-        values = {}
-        for name in loaded._fields:
-            field = getattr(loaded, name)
-            values[name] = field
+        # if that is not the case don't apply them.
+        if hasattr(loaded, "globals"):
+            # use the binary **or** operator to apply globals to Set() attributes
+            values = {}
+            for name in loaded._fields:
+                field = getattr(loaded, name)
+                values[name] = field
 
-            if not isinstance(field, tuple) or name == "globals":
-                continue
+                if not isinstance(field, tuple) or name == "globals":
+                    continue
 
-            values[name] = field | loaded.globals
+                values[name] = field | loaded.globals
 
-        self.loaded = loaded._replace(**values)
-        return self
+            loaded = loaded._replace(**values)
 
-    def __getattr__(self, item):
-        # self.load() should only trigger when the cache is invalid
-        self.load()
+        # replacing __dict__ publishes all attributes at once,
+        # readers either see the previous or the new snapshot.
+        self.__dict__ = {**loaded._asdict(), "loaded": loaded}
 
-        return getattr(self.loaded, item)
+        # everything derived from the previous settings is stale now
+        invalidate()
+        return self
 
 
 @lru_cache()
@@ -257,3 +350,10 @@ if __name__ == "__main__":
 
 settings = Settings()
 dev = load_dev()
+
+
+@receiver(setting_changed, weak=False)
+def reload_settings(sender, setting, **kwargs) -> None:
+    """reload the settings if AUTOMATED_LOGGING has been changed"""
+    if setting == "AUTOMATED_LOGGING":
+        settings.load()
@@ -2,11 +2,14 @@
 Helper functions that are specifically used in the signals only.
 """
 
-import re
+from collections import namedtuple
 from fnmatch import fnmatch
-from functools import lru_cache
+from functools import wraps
 from pathlib import Path
-from typing import List, Optional, Callable, Any
+from typing import Iterable, Optional, Callable, Any, Dict, List, Type
+
+from django.db import transaction
+from django.db.models import Model
 
 from automated_logging.helpers import (
     get_or_create_meta,
@@ -14,17 +17,48 @@ from automated_logging.helpers import (
     function2path,
     Operation,
 )
-from automated_logging.models import RequestEvent, UnspecifiedEvent
+from automated_logging.models import (
+    Application,
+    ModelField,
+    ModelMirror,
+    ModelValueModification,
+    RequestEvent,
+    UnspecifiedEvent,
+)
 import automated_logging.decorators
+from automated_logging.routers import database
 from automated_logging.settings import settings
-from automated_logging.helpers.schemas import Search
+from automated_logging.helpers.cache import invalidator, verdicts
+from automated_logging.helpers.schemas import Search, Scope
+
+ModelDescriptor = namedtuple("ModelDescriptor", ("fields",))
+
+_descriptors: Dict[Type[Model], ModelDescriptor] = {}
 
 
-# suboptimal meta is also cached -> look into how to solve
-@lru_cache()
-def cached_model_exclusion(sender, meta, operation) -> bool:
-    """cached so that we don't need to abuse ._meta and can invalidate the cache"""
-    return model_exclusion(sender, meta, operation)
+@invalidator
+def clear_model_descriptors() -> None:
+    """clear all descriptors, they depend on the settings and decorators"""
+    _descriptors.clear()
+
+
+def atomic(func: Callable) -> Callable:
+    """
+    transaction.atomic for model signals, that is skipped if model events are
+    deferred until the transaction commits (model.on_commit),
+    as nothing is written to the database in the signal itself.
+    The transaction is opened on the database of the events.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if settings.model.on_commit:
+            return func(*args, **kwargs)
+
+        with transaction.atomic(using=database()):
+            return func(*args, **kwargs)
+
+    return wrapper
 
 
 def lazy_model_exclusion(instance, operation, sender) -> bool:
@@ -32,36 +66,32 @@ def lazy_model_exclusion(instance, operation, sender) -> bool:
     First look if the model has been excluded already
     -> only then look if excluded.
 
-    Replaced by LRU-Cache.
+    The verdict is cached in the exclusion cache.
     """
-
-    return cached_model_exclusion(sender, instance._meta, operation)
+    meta = instance._meta
+    return verdicts.get(
+        ("model", function2path(sender), meta.app_label, operation),
+        lambda: model_exclusion(sender, meta, operation),
+    )
 
 
-def candidate_in_scope(candidate: str, scope: List[Search]) -> bool:
+def candidate_in_scope(candidate: str, scope: Iterable[Search]) -> bool:
     """
     Check if the candidate string is valid with the scope supplied,
     the scope should be list of search strings - that can be either
     glob, plain or regex
 
+    Scopes loaded from the settings are already compiled,
+    any other iterable is compiled on every call.
+
     :param candidate: search string
-    :param scope: List of Search
+    :param scope: Scope or iterable of Search
     :return: valid?
     """
+    if not isinstance(scope, Scope):
+        scope = Scope(scope)
 
-    for search in scope:
-        match = False
-        if search.type == "glob":
-            match = fnmatch(candidate.lower(), search.value.lower())
-        if search.type == "plain":
-            match = candidate.lower() == search.value.lower()
-        if search.type == "regex":
-            match = bool(re.match(search.value, candidate, re.IGNORECASE))
-
-        if match:
-            return True
-
-    return False
+    return scope.match(candidate)
 
 
 def request_exclusion(event: RequestEvent, view: Optional[Callable] = None) -> bool:
@@ -94,21 +124,37 @@ def request_exclusion(event: RequestEvent, view: Optional[Callable] = None) -> b
         ):
             return True
 
+    # view decorators are thread local and registered when the view is called,
+    # therefore only the verdict from the settings is cached.
+    method, application, status = event.method, event.application.name, event.status
+    return verdicts.get(
+        ("request", method, application, status),
+        lambda: _request_exclusion(method, application, status),
+    )
+
+
+def _request_exclusion(method: str, application: Optional[str], status: int) -> bool:
+    """
+    Determine if a request should be excluded by the settings.
+
+    :param method: request method
+    :param application: name of the application, None if unknown
+    :param status: response status code
+    :return: should be excluded?
+    """
     exclusions = settings.request.exclude
-    if event.method.lower() in exclusions.methods:
+    if method.lower() in exclusions.methods:
         return True
 
-    if event.application.name and candidate_in_scope(
-        event.application.name, exclusions.applications
-    ):
+    if application and candidate_in_scope(application, exclusions.applications):
         return True
 
-    if event.status in exclusions.status:
+    if status in exclusions.status:
         return True
 
     # if the application.name = None, then the application is unknown.
     # exclusions.unknown specifies if unknown should be excluded!
-    if not event.application.name and exclusions.unknown:
+    if not application and exclusions.unknown:
         return True
 
     return False
@@ -194,8 +240,21 @@ def model_exclusion(sender, meta, operation: Operation) -> bool:
 def field_exclusion(field: str, instance, sender=None) -> bool:
     """
     Determine if the field of an instance should be excluded.
+    The verdict is cached in the exclusion cache.
     """
-
+    return verdicts.get(
+        (
+            "field",
+            function2path(instance.__class__),
+            instance._meta.app_label,
+            function2path(sender) if sender else None,
+            field,
+        ),
+        lambda: _field_exclusion(field, instance, sender),
+    )
+
+
+def _field_exclusion(field: str, instance, sender=None) -> bool:
     decorators = _function_model_exclusion(sender, "fields", field)
     if decorators is not None:
         return decorators
@@ -220,21 +279,126 @@ def field_exclusion(field: str, instance, sender=None) -> bool:
     return False
 
 
+def model_descriptor(instance) -> ModelDescriptor:
+    """
+    Get the field metadata of the model used to compute the changes,
+    this is built once per model and cached until the settings or
+    decorators change.
+
+    fields is a tuple of (attname, field type) of every concrete field
+    that is not excluded, foreign keys are represented by their attname
+    (e.g. user_id), as that is the key used in __dict__.
+
+    :param instance: model instance
+    :return: ModelDescriptor
+    """
+    sender = instance.__class__
+    descriptor = _descriptors.get(sender)
+    if descriptor is not None:
+        return descriptor
+
+    descriptor = ModelDescriptor(
+        fields=tuple(
+            (f.attname, f.__class__.__name__)
+            for f in instance._meta.concrete_fields
+            if not field_exclusion(f.attname, instance, sender)
+        )
+    )
+    _descriptors[sender] = descriptor
+    return descriptor
+
+
+def normalize_save_value(value: Any):
+    """normalize the values given to the function to make stuff more readable"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        return value
+
+    return repr(value)
+
+
+def value_modifications(
+    instance, old: Dict[str, Any], new: Dict[str, Any]
+) -> List[ModelValueModification]:
+    """
+    Compare the previous and current values (keyed by attname)
+    of the instance and create a modification for every change.
+    Fields that are not present in new (e.g. deferred) are skipped.
+
+    :param instance: model instance
+    :param old: previous values
+    :param new: current values
+    :return: modifications
+    """
+    model = ModelMirror()
+    model.name = instance.__class__.__name__
+    model.application = Application(name=instance._meta.app_label)
+
+    modifications = []
+    for attname, kind in model_descriptor(instance).fields:
+        if attname not in new:
+            continue
+
+        previous, current = old.get(attname), new[attname]
+        if previous is None and current is None:
+            continue
+        elif previous is None:
+            change = Operation.CREATE
+        elif current is None:
+            change = Operation.DELETE
+        elif previous != current:
+            change = Operation.MODIFY
+        else:
+            continue
+
+        field = ModelField()
+        field.name = attname
+        field.mirror = model
+        field.type = kind
+
+        modification = ModelValueModification()
+        modification.operation = change
+        modification.field = field
+
+        modification.previous = normalize_save_value(previous)
+        modification.current = normalize_save_value(current)
+
+        modifications.append(modification)
+
+    return modifications
+
+
 def unspecified_exclusion(event: UnspecifiedEvent) -> bool:
     """
     Determine if an unspecified event needs to be excluded.
+    The verdict is cached in the exclusion cache.
+    """
+    return unspecified_verdict(event.application.name, str(event.file))
+
+
+def unspecified_verdict(application: Optional[str], file: str) -> bool:
+    """
+    Determine if unspecified events of the application and file need to be
+    excluded, which can be done before the event is built.
+    The verdict is cached in the exclusion cache.
     """
+    return verdicts.get(
+        ("unspecified", application, file),
+        lambda: _unspecified_exclusion(application, file),
+    )
+
+
+def _unspecified_exclusion(application: Optional[str], file: str) -> bool:
     exclusions = settings.unspecified.exclude
 
-    if event.application.name and candidate_in_scope(
-        event.application.name, exclusions.applications
-    ):
+    if application and candidate_in_scope(application, exclusions.applications):
         return True
 
-    if candidate_in_scope(str(event.file), exclusions.files):
+    if candidate_in_scope(file, exclusions.files):
         return True
 
-    path = Path(event.file)
+    path = Path(file)
     # match greedily by first trying the complete path, if that doesn't match try
     # full relative and then complete relative.
     if [
@@ -252,7 +416,7 @@ def unspecified_exclusion(event: UnspecifiedEvent) -> bool:
         return True
 
     # application.name = None and exclusion.unknown = True
-    if not event.application.name and exclusions.unknown:
+    if not application and exclusions.unknown:
         return True
 
     return False
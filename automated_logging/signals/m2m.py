@@ -8,9 +8,12 @@ without doing any changes to the database.
 """
 
 import logging
-from typing import Optional
+from functools import partial
+from itertools import islice
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Type
 
-from django.db.models import Manager
+from django.apps import apps
+from django.db.models import Manager, Model
 from django.db.models.fields.related import ManyToManyField
 from django.db.models.signals import m2m_changed
 from django.dispatch import receiver
@@ -27,36 +30,105 @@ from automated_logging.models import (
     Application,
     ModelField,
 )
+from automated_logging.helpers.transactions import on_commit
 from automated_logging.settings import settings
 from automated_logging.signals import lazy_model_exclusion
 
 logger = logging.getLogger(__name__)
 
 
+# (through model, owning model) -> ManyToManyField, built in AppConfig.ready()
+relations: Dict[Tuple[Type[Model], Type[Model]], ManyToManyField] = {}
+
+
+def build_m2m_relations() -> None:
+    """
+    Build the registry of every "many to many" relationship of every
+    installed model, this includes auto created through models and
+    fields that have been inherited.
+    """
+    relations.clear()
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(field, ManyToManyField):
+                relations[(field.remote_field.through, model)] = field
+
+
 def find_m2m_rel(sender, model) -> Optional[ManyToManyField]:
     """
     This finds the "many to many" relationship that is used by the sender.
+
+    The relationship is looked up in the registry, models that are not
+    part of it (e.g. created after the registry was built) are searched
+    and added to the registry.
     """
+    field = relations.get((sender, model))
+    if field is not None:
+        return field
+
     for field in model._meta.get_fields():
         if isinstance(field, ManyToManyField) and field.remote_field.through == sender:
+            relations[(sender, model)] = field
             return field
 
     return None
 
 
-def post_processor(sender, instance, model, operation, targets):
+def target_entries(model, targets: Iterable, using=None) -> Iterator[ModelEntry]:
+    """
+    Stream the entries of the targets of a relationship change.
+    If values are recorded the targets, that have not been loaded yet,
+    are loaded in chunks, otherwise only the primary keys are used.
+
+    :param model: model of the targets
+    :param targets: loaded targets or primary keys of the targets
+    :param using: database alias used for the change
+    :return: entries that have not been saved yet
+    """
+    mirror = ModelMirror(
+        name=model.__name__, application=Application(name=model._meta.app_label)
+    )
+    values = settings.model.m2m.values
+
+    pks = []
+    for target in targets:
+        if not isinstance(target, Model):
+            pks.append(target)
+            continue
+
+        value = repr(target) if values else ""
+        yield ModelEntry(mirror=mirror, value=value, primary_key=target.pk)
+
+    if not values:
+        for pk in pks:
+            yield ModelEntry(mirror=mirror, value="", primary_key=pk)
+        return
+
+    chunk = settings.model.m2m.chunk
+    queryset = model.objects.using(using)
+    for idx in range(0, len(pks), chunk):
+        loaded = queryset.filter(pk__in=pks[idx : idx + chunk])
+        for target in loaded.iterator(chunk_size=chunk):
+            yield ModelEntry(mirror=mirror, value=repr(target), primary_key=target.pk)
+
+
+def post_processor(sender, instance, model, operation, target, targets, using=None):
     """
     if the change is in reverse or not, the processing of the changes is still
     the same, so we have this method to take care of constructing the changes
+
+    The changes are sent in log records of `model.m2m.chunk` relationships,
+    which all reference the same event.
+
     :param sender:
     :param instance:
     :param model:
     :param operation:
-    :param targets:
+    :param target: model of the targets
+    :param targets: loaded targets or primary keys of the targets
+    :param using: database alias used for the change
     :return:
     """
-    relationships = []
-
     m2m_rel = find_m2m_rel(sender, model)
     if not m2m_rel:
         logger.warning(f"[DAL] save[m2m] could not find ManyToManyField for {instance}")
@@ -70,50 +142,55 @@ def post_processor(sender, instance, model, operation, targets):
     field.type = m2m_rel.__class__.__name__
 
     # there is the possibility that a pre_clear occurred, if that is the case
-    # extend the targets and pop the list of affected instances from the attached
-    # field
+    # extend the targets and pop the list of affected primary keys
+    # from the attached field
     get_or_create_meta(instance)
     if (
         hasattr(instance._meta.dal, "m2m_pre_clear")
         and field.name in instance._meta.dal.m2m_pre_clear
         and operation == Operation.DELETE
     ):
-        cleared = instance._meta.dal.m2m_pre_clear[field.name]
-        targets.extend(cleared)
-        instance._meta.dal.m2m_pre_clear.pop(field.name)
+        cleared = instance._meta.dal.m2m_pre_clear.pop(field.name)
+        targets = [*targets, *cleared]
+
+    entries = target_entries(target, targets, using)
+    event = None
+    while True:
+        relationships = []
+        for entry in islice(entries, settings.model.m2m.chunk):
+            relationship = ModelRelationshipModification()
+            relationship.operation = operation
+            relationship.field = field
+            relationship.entry = entry
+            relationships.append(relationship)
+
+        if len(relationships) == 0:
+            # there are no changes (left), so we're not propagating the event
+            return
 
-    for target in targets:
-        relationship = ModelRelationshipModification()
-        relationship.operation = operation
-        relationship.field = field
-        mirror = ModelMirror()
-        mirror.name = target.__class__.__name__
-        mirror.application = Application(name=target._meta.app_label)
-        relationship.entry = ModelEntry(
-            mirror=mirror, value=repr(target), primary_key=target.pk
+        if event is None:
+            event, _ = get_or_create_model_event(instance, operation)
+
+        user = None
+        log = partial(
+            logger.log,
+            settings.model.loglevel,
+            f'{user or "Anonymous"} modified field '
+            f"{field.name} | Model: "
+            f"{field.mirror.application}.{field.mirror} "
+            f'| Modifications: {", ".join([r.short() for r in relationships])}',
+            extra={
+                "action": "model[m2m]",
+                "data": {"instance": instance, "sender": sender},
+                "relationships": relationships,
+                "event": event,
+            },
         )
-        relationships.append(relationship)
 
-    if len(relationships) == 0:
-        # there was no actual change, so we're not propagating the event
-        return
-
-    event, _ = get_or_create_model_event(instance, operation)
-
-    user = None
-    logger.log(
-        settings.model.loglevel,
-        f'{user or "Anonymous"} modified field '
-        f"{field.name} | Model: "
-        f"{field.mirror.application}.{field.mirror} "
-        f'| Modifications: {", ".join([r.short() for r in relationships])}',
-        extra={
-            "action": "model[m2m]",
-            "data": {"instance": instance, "sender": sender},
-            "relationships": relationships,
-            "event": event,
-        },
-    )
+        if settings.model.on_commit:
+            on_commit(log, using)
+        else:
+            log()
 
 
 def pre_clear_processor(sender, instance, pks, model, reverse, operation) -> None:
@@ -124,6 +201,9 @@ def pre_clear_processor(sender, instance, pks, model, reverse, operation) -> Non
     if reverse = False then every element gets removed from the relationship field,
     but if reverse = True then instance should be removed from every target.
 
+    Only the primary keys of the cleared targets are fetched, the targets
+    are loaded in chunks once the clear has been recorded.
+
     Note: it seems that pre_clear is not getting fired for reverse.
 
     :return: None
@@ -139,7 +219,10 @@ def pre_clear_processor(sender, instance, pks, model, reverse, operation) -> Non
 
     cleared = getattr(instance, rel.name, [])
     if isinstance(cleared, Manager):
-        cleared = list(cleared.all())
+        cleared = cleared.values_list("pk", flat=True)
+        cleared = list(cleared.iterator(chunk_size=settings.model.m2m.chunk))
+    else:
+        cleared = [c.pk for c in cleared]
     instance._meta.dal.m2m_pre_clear = {rel.name: cleared}
 
 
@@ -181,14 +264,32 @@ def m2m_changed_signal(
     else:
         operation = Operation.DELETE
 
-    targets = model.objects.filter(pk__in=list(pk_set)) if pk_set else []
+    pks = list(pk_set) if pk_set else []
     if reverse:
-        for target in [
-            t for t in targets if not lazy_model_exclusion(t, operation, t.__class__)
-        ]:
-            post_processor(sender, target, target.__class__, operation, [instance])
+        # the changes are applied to every target, which need to be loaded
+        # as an event is created for each of them, the instance is the
+        # only relationship of every event and has already been loaded.
+        if not pks or lazy_model_exclusion(model, operation, model):
+            return
+
+        chunk = settings.model.m2m.chunk
+        queryset = model.objects.using(using)
+        for idx in range(0, len(pks), chunk):
+            targets = queryset.filter(pk__in=pks[idx : idx + chunk])
+            for target in targets.iterator(chunk_size=chunk):
+                post_processor(
+                    sender,
+                    target,
+                    model,
+                    operation,
+                    instance.__class__,
+                    [instance],
+                    using,
+                )
     else:
         if lazy_model_exclusion(instance, operation, instance.__class__):
             return
 
-        post_processor(sender, instance, instance.__class__, operation, targets)
+        post_processor(
+            sender, instance, instance.__class__, operation, model, pks, using
+        )
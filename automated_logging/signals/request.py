@@ -3,15 +3,18 @@ File handles the processing and redirection of all request related
 signals
 """
 
+import json
 import logging
 import urllib.parse
+from functools import lru_cache
+from typing import Any, Optional
 
 from django.core.handlers.wsgi import WSGIRequest
 from django.dispatch import receiver
 from django.core.signals import got_request_exception, request_finished
-from django.http import Http404, JsonResponse
-from django.urls import resolve
+from django.http import HttpRequest, HttpResponse, RawPostDataException
 
+from automated_logging.helpers.sampling import limited, sampled
 from automated_logging.middleware import AutomatedLoggingMiddleware
 from automated_logging.models import RequestEvent, Application, RequestContext
 from automated_logging.settings import settings
@@ -26,6 +29,103 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+REDACTED = "<REDACTED>"
+
+
+@lru_cache(maxsize=1024)
+def view_application(module: str) -> str:
+    """the application of a view is the top level package of its module"""
+    return module.split(".", 1)[0]
+
+
+def scrub(data: Any) -> Any:
+    """
+    Recursively omit the keys of ignore and replace
+    the values of the keys of mask with <REDACTED>.
+
+    :param data: parsed content
+    :return: scrubbed content
+    """
+    ignore = settings.request.data.ignore
+    mask = settings.request.data.mask
+
+    if isinstance(data, dict):
+        return {
+            key: REDACTED if str(key).lower() in mask else scrub(value)
+            for key, value in data.items()
+            if str(key).lower() not in ignore
+        }
+    if isinstance(data, list):
+        return [scrub(value) for value in data]
+
+    return data
+
+
+def parse_content(content: Optional[bytes], content_type: str) -> Any:
+    """
+    Parse the content of a request or response, contents of types
+    that are not part of content_types or exceed max_size are omitted.
+
+    :param content: raw content
+    :param content_type: media type of the content
+    :return: parsed and scrubbed content or None
+    """
+    max_size = settings.request.data.max_size
+    if content is None or content_type not in settings.request.data.content_types:
+        return None
+
+    if max_size is not None and len(content) > max_size:
+        return None
+
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return None
+
+    return scrub(data)
+
+
+def media_type(content_type: Optional[str]) -> str:
+    """strip the parameters (e.g. charset) from a content type"""
+    return (content_type or "").split(";", 1)[0].strip().lower()
+
+
+def request_content(request: HttpRequest) -> Any:
+    """
+    Content of the request, the size is checked via CONTENT_LENGTH
+    before the body is read.
+    """
+    max_size = settings.request.data.max_size
+    if media_type(request.content_type) not in settings.request.data.content_types:
+        return None
+
+    try:
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        length = 0
+
+    if max_size is not None and length > max_size:
+        return None
+
+    try:
+        body = request.body
+    except RawPostDataException:
+        # the stream has already been consumed by the view
+        return None
+
+    return parse_content(body, media_type(request.content_type))
+
+
+def response_content(response: HttpResponse) -> Any:
+    """
+    Content of the response, streamed responses (StreamingHttpResponse,
+    FileResponse) are never consumed.
+    """
+    if response.streaming:
+        return None
+
+    return parse_content(response.content, media_type(response.get("Content-Type")))
+
 
 @receiver(request_finished, weak=False)
 def request_finished_signal(sender, **kwargs) -> None:
@@ -49,6 +149,16 @@ def request_finished_signal(sender, **kwargs) -> None:
             )
         return
 
+    # the url has already been resolved by django, resolver_match is None
+    # if the url could not be resolved or the view has never been reached
+    match = getattr(environ.request, "resolver_match", None)
+    function = match.func if match else None
+    application = view_application(function.__module__) if function else None
+    status = environ.response.status_code if environ.response else None
+
+    if not sampled(function, application, status):
+        return
+
     request = RequestEvent()
 
     request.user = AutomatedLoggingMiddleware.get_current_user(environ)
@@ -57,41 +167,35 @@ def request_finished_signal(sender, **kwargs) -> None:
     if not settings.request.data.query:
         request.uri = urllib.parse.urlparse(request.uri).path
 
+    request.status = status
+    request.method = environ.request.method.upper()
+    request.context_type = environ.request.content_type
+    request.application = Application(name=application)
+
+    if request_exclusion(request, function):
+        return
+
+    # excluded requests do not take a token
+    if limited(environ.request.path):
+        return
+
     if "request" in settings.request.data.enabled:
         request_context = RequestContext()
-        request_context.content = environ.request.body
-        request_context.type = environ.request.content_type
+        request_context.content = request_content(environ.request)
+        request_context.type = environ.request.content_type or ""
 
         request.request = request_context
 
-    if "response" in settings.request.data.enabled:
+    if "response" in settings.request.data.enabled and environ.response:
         response_context = RequestContext()
-        response_context.content = environ.response.content
-        response_context.type = environ.response["Content-Type"]
+        response_context.content = response_content(environ.response)
+        response_context.type = environ.response.get("Content-Type", "")
 
         request.response = response_context
 
-    # TODO: context parsing, masking and removal
     if get_client_ip and settings.request.ip:
         request.ip, _ = get_client_ip(environ.request)
 
-    request.status = environ.response.status_code if environ.response else None
-    request.method = environ.request.method.upper()
-    request.context_type = environ.request.content_type
-
-    try:
-        function = resolve(environ.request.path).func
-    except Http404:
-        function = None
-
-    request.application = Application(name=None)
-    if function:
-        application = function.__module__.split(".")[0]
-        request.application = Application(name=application)
-
-    if request_exclusion(request, function):
-        return
-
     logger_ip = f" from {request.ip}" if get_client_ip and settings.request.ip else ""
     logger.log(
         level,
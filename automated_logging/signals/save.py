@@ -4,26 +4,25 @@ File handles every signal related to the saving/deletion of django models.
 
 import logging
 from collections import namedtuple
+from copy import deepcopy
 from datetime import datetime
+from functools import partial
 from pprint import pprint
-from typing import Any
+from typing import Any, Dict, Optional
 
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import transaction
-from django.db.models.signals import pre_save, post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete, post_init
 from django.dispatch import receiver
 
-from automated_logging.models import (
-    ModelValueModification,
-    ModelField,
-    ModelMirror,
-    Application,
-)
 from automated_logging.settings import settings
 from automated_logging.signals import (
+    atomic,
     model_exclusion,
     lazy_model_exclusion,
     field_exclusion,
+    model_descriptor,
+    normalize_save_value,
+    value_modifications,
 )
 from automated_logging.helpers import (
     get_or_create_meta,
@@ -31,26 +30,82 @@ from automated_logging.helpers import (
     get_or_create_model_event,
 )
 from automated_logging.helpers.enums import PastOperationMap
+from automated_logging.helpers.transactions import on_commit
 
 ChangeSet = namedtuple("ChangeSet", ("deleted", "added", "changed"))
 logger = logging.getLogger(__name__)
 
 
-def normalize_save_value(value: Any):
-    """normalize the values given to the function to make stuff more readable"""
-    if value is None or value == "":
+def capture_values(instance, fields=None) -> None:
+    """
+    Capture the current values of the instance, these are used
+    by pre_save_signal instead of fetching the previous values, if
+    model.tracking is enabled.
+
+    Instances with deferred fields are not captured, as not all values are known.
+
+    :param instance: model instance
+    :param fields: only update these fields of an existing capture
+    :return: None
+    """
+    values = {
+        k: deepcopy(v) if isinstance(v, (dict, list, set)) else v
+        for k, v in instance.__dict__.items()
+        if not k.startswith("_") and (fields is None or k in fields)
+    }
+
+    captured = getattr(instance, "_dal_values", None)
+    if fields is not None and captured is not None:
+        captured.update(values)
+    elif fields is None and not instance.get_deferred_fields():
+        instance._dal_values = values
+    else:
+        instance.__dict__.pop("_dal_values", None)
+
+
+def captured_values(instance) -> Optional[Dict[str, Any]]:
+    """
+    Get the values captured when the instance was loaded,
+    None if there are none or they cannot be used.
+    """
+    if instance._state.adding:
+        return None
+
+    values = getattr(instance, "_dal_values", None)
+    if values is None or values.get(instance._meta.pk.attname) != instance.pk:
         return None
-    if isinstance(value, str):
-        return value
 
-    return repr(value)
+    return values
+
+
+@receiver(post_init, weak=False)
+def post_init_signal(sender, instance, **kwargs) -> None:
+    """
+    Signal is getting called after an instance has been initialized,
+    this includes instances that are loaded from the database.
+    Only used if model.tracking is enabled.
+
+    :param sender: model class
+    :param instance: model instance
+    :param kwargs: django needs kwargs to be there
+    :return: None
+    """
+    # every instance is initialized via this signal, check the cheapest first
+    if not settings.model.tracking:
+        return
+
+    if lazy_model_exclusion(instance, Operation.MODIFY, instance.__class__):
+        return
+
+    capture_values(instance)
 
 
 @receiver(pre_save, weak=False)
-@transaction.atomic
+@atomic
 def pre_save_signal(sender, instance, **kwargs) -> None:
     """
-    Compares the current instance and old instance (fetched via the pk)
+    Compares the current instance and old instance (fetched via the pk,
+    or captured on load if model.tracking is enabled)
     and generates a dictionary of changes
 
     :param sender:
@@ -63,105 +118,19 @@ def pre_save_signal(sender, instance, **kwargs) -> None:
     instance._meta.dal.event = None
 
     operation = Operation.MODIFY
-    try:
-        pre = sender.objects.get(pk=instance.pk)
-    except ObjectDoesNotExist:
-        # __dict__ is used on pre, therefore we need to create a function
-        # that uses __dict__ too, but returns nothing.
-
-        pre = lambda _: None
-        operation = Operation.CREATE
+    old = captured_values(instance) if settings.model.tracking else None
+    if old is None:
+        try:
+            old = sender.objects.get(pk=instance.pk).__dict__
+        except ObjectDoesNotExist:
+            old = {}
+            operation = Operation.CREATE
 
     excluded = lazy_model_exclusion(instance, operation, instance.__class__)
     if excluded:
         return
 
-    old, new = pre.__dict__, instance.__dict__
-
-    previously = set(
-        k for k in old.keys() if not k.startswith("_") and old[k] is not None
-    )
-    currently = set(
-        k for k in new.keys() if not k.startswith("_") and new[k] is not None
-    )
-
-    added = currently.difference(previously)
-    deleted = previously.difference(currently)
-    changed = {
-        k
-        for k in
-        # take all keys from old and new, and only use those that are in both
-        set(old.keys()) & set(new.keys())
-        # remove values that have been added or deleted (optimization)
-        .difference(added).difference(deleted)
-        # check if the value is equal, if not they are not changed
-        if old[k] != new[k]
-    }
-
-    summary = [
-        *(
-            {
-                "operation": Operation.CREATE,
-                "previous": None,
-                "current": new[k],
-                "key": k,
-            }
-            for k in added
-        ),
-        *(
-            {
-                "operation": Operation.DELETE,
-                "previous": old[k],
-                "current": None,
-                "key": k,
-            }
-            for k in deleted
-        ),
-        *(
-            {
-                "operation": Operation.MODIFY,
-                "previous": old[k],
-                "current": new[k],
-                "key": k,
-            }
-            for k in changed
-        ),
-    ]
-
-    # exclude fields not present in _meta.get_fields
-    fields = {f.name: f for f in instance._meta.get_fields()}
-    extra = {f.attname: f for f in instance._meta.get_fields() if hasattr(f, "attname")}
-    fields = {**extra, **fields}
-
-    summary = [s for s in summary if s["key"] in fields.keys()]
-
-    # field exclusion
-    summary = [
-        s
-        for s in summary
-        if not field_exclusion(s["key"], instance, instance.__class__)
-    ]
-
-    model = ModelMirror()
-    model.name = sender.__name__
-    model.application = Application(name=instance._meta.app_label)
-
-    modifications = []
-    for entry in summary:
-        field = ModelField()
-        field.name = entry["key"]
-        field.mirror = model
-
-        field.type = fields[entry["key"]].__class__.__name__
-
-        modification = ModelValueModification()
-        modification.operation = entry["operation"]
-        modification.field = field
-
-        modification.previous = normalize_save_value(entry["previous"])
-        modification.current = normalize_save_value(entry["current"])
-
-        modifications.append(modification)
+    modifications = value_modifications(instance, old, instance.__dict__)
 
     instance._meta.dal.modifications = modifications
 
@@ -169,7 +138,9 @@ def pre_save_signal(sender, instance, **kwargs) -> None:
         instance._meta.dal.performance = datetime.now()
 
 
-def post_processor(status, sender, instance, updated=None, suffix="") -> None:
+def post_processor(
+    status, sender, instance, updated=None, suffix="", using=None
+) -> None:
     """
     Due to the fact that both post_delete and post_save have
     the same logic for propagating changes, we have this helper class
@@ -183,6 +154,7 @@ def post_processor(status, sender, instance, updated=None, suffix="") -> None:
     :param instance: model instance
     :param updated: updated fields
     :param suffix: suffix to be added to the message
+    :param using: database alias used for the change
     :return: None
     """
     past = {v: k for k, v in PastOperationMap.items()}
@@ -199,7 +171,8 @@ def post_processor(status, sender, instance, updated=None, suffix="") -> None:
         # if the event is modify, but nothing changed, don't actually propagate
         return
 
-    logger.log(
+    log = partial(
+        logger.log,
         settings.model.loglevel,
         f'{event.user or "Anonymous"} {past[status]} '
         f"{event.entry.mirror.application}.{sender.__name__} | "
@@ -212,9 +185,14 @@ def post_processor(status, sender, instance, updated=None, suffix="") -> None:
         },
     )
 
+    if settings.model.on_commit:
+        on_commit(log, using)
+    else:
+        log()
+
 
 @receiver(post_save, weak=False)
-@transaction.atomic
+@atomic
 def post_save_signal(
     sender, instance, created, update_fields: frozenset, **kwargs
 ) -> None:
@@ -255,11 +233,21 @@ def post_save_signal(
             m for m in instance._meta.dal.modifications if m.field.name in update_fields
         ]
 
-    post_processor(status, sender, instance, update_fields, suffix)
+    if settings.model.tracking:
+        capture_values(
+            instance,
+            (
+                {instance._meta.get_field(f).attname for f in update_fields}
+                if update_fields is not None
+                else None
+            ),
+        )
+
+    post_processor(status, sender, instance, update_fields, suffix, kwargs.get("using"))
 
 
 @receiver(post_delete, weak=False)
-@transaction.atomic
+@atomic
 def post_delete_signal(sender, instance, **kwargs) -> None:
     """
     Signal is getting called after instance deletion. We just redirect the
@@ -279,4 +267,4 @@ def post_delete_signal(sender, instance, **kwargs) -> None:
     if lazy_model_exclusion(instance, Operation.DELETE, instance.__class__):
         return
 
-    post_processor(Operation.DELETE, sender, instance)
+    post_processor(Operation.DELETE, sender, instance, using=kwargs.get("using"))
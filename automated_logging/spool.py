@@ -0,0 +1,173 @@
+"""
+Write-ahead spool, used by the DatabaseHandler to persist records and batches
+in a local append-only file, when the database is unavailable (or always).
+Spooled items are replayed in order via `manage.py dal_replay <path>`.
+
+Every item is pickled and prefixed with its length (4 bytes, big endian).
+Once the spool exceeds max_bytes it is rotated to <path>.<sequence>,
+rotated segments are never discarded, only removed after they have been replayed.
+"""
+
+import os
+import pickle
+import re
+import struct
+from threading import Lock
+from typing import Any, Callable, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # not available on windows, the spool is then only safe within a single process
+    fcntl = None
+
+HEADER = struct.Struct(">I")
+FSYNC = ("always", "rotate", "never")
+
+
+class Spool:
+    """
+    Append-only spool file, that is safe to be used by multiple threads
+    and (if fcntl is available) multiple processes.
+
+    fsync decides when the data is forced to disk:
+    always -> after every item
+    rotate -> when the spool is rotated
+    never  -> leave it to the operating system
+    """
+
+    def __init__(
+        self, path: str, max_bytes: int = 16 * 1024 * 1024, fsync: str = "always"
+    ):
+        if fsync not in FSYNC:
+            raise ValueError(f"fsync must be one of {', '.join(FSYNC)}, not {fsync}")
+
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.fsync = fsync
+        self.lock = Lock()
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+    def _open(self, mode: str = "ab"):
+        """
+        Open and lock the current spool file, if the file has been rotated
+        by another process while waiting for the lock, the new file is opened.
+        """
+        while True:
+            file = open(self.path, mode)
+            if fcntl is None:
+                return file
+
+            fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                if os.fstat(file.fileno()).st_ino == os.stat(self.path).st_ino:
+                    return file
+            except FileNotFoundError:
+                pass
+
+            file.close()
+
+    def segments(self) -> List[str]:
+        """rotated segments of the spool, oldest first"""
+        directory, name = os.path.split(self.path)
+        pattern = re.compile(rf"^{re.escape(name)}\.(\d+)$")
+
+        matches = [pattern.match(f) for f in os.listdir(directory)]
+        return [
+            os.path.join(directory, m.group(0))
+            for m in sorted((m for m in matches if m), key=lambda m: int(m.group(1)))
+        ]
+
+    def _rotate(self, file) -> None:
+        """move the locked spool file to the next segment"""
+        if self.fsync == "rotate":
+            os.fsync(file.fileno())
+
+        segments = self.segments()
+        sequence = int(segments[-1].rsplit(".", 1)[1]) + 1 if segments else 1
+        os.rename(self.path, f"{self.path}.{sequence}")
+
+    def append(self, item: Any) -> None:
+        """
+        Append an item to the spool.
+
+        :param item: picklable item
+        :return: None
+        """
+        payload = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self.lock:
+            with self._open() as file:
+                file.write(HEADER.pack(len(payload)) + payload)
+                file.flush()
+
+                if self.fsync == "always":
+                    os.fsync(file.fileno())
+
+                if file.tell() >= self.max_bytes:
+                    self._rotate(file)
+
+    def rotate(self) -> None:
+        """rotate the current spool file, if it is not empty"""
+        if not os.path.exists(self.path):
+            return
+
+        with self.lock:
+            with self._open() as file:
+                if file.seek(0, os.SEEK_END):
+                    self._rotate(file)
+
+    @staticmethod
+    def read(segment: str) -> Iterator[Any]:
+        """
+        Read the items of a segment in order. A truncated item at the end
+        (e.g. the process crashed while writing) is skipped.
+
+        :param segment: path of the segment
+        :return: items
+        """
+        with open(segment, "rb") as file:
+            while True:
+                header = file.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    return
+
+                (size,) = HEADER.unpack(header)
+                payload = file.read(size)
+                if len(payload) < size:
+                    return
+
+                yield pickle.loads(payload)
+
+    def replay(
+        self, process: Callable[[Any], None], done: Optional[Callable[[], None]] = None
+    ) -> int:
+        """
+        Rotate the current spool file and process every item of every segment
+        in order. Segments are removed once all of their items have been processed
+        and done has been called, if either raises the segment is kept
+        and replayed again the next time.
+
+        :param process: function that is called with every item
+        :param done: function that is called after every segment (e.g. flush)
+        :return: number of processed items
+        """
+        with open(f"{self.path}.lock", "ab") as lock:
+            if fcntl is not None:
+                # only a single replay at a time
+                fcntl.flock(lock, fcntl.LOCK_EX)
+
+            self.rotate()
+
+            processed = 0
+            for segment in self.segments():
+                for item in self.read(segment):
+                    process(item)
+                    processed += 1
+
+                if done:
+                    done()
+                os.remove(segment)
+
+        return processed
@@ -11,9 +11,9 @@ from django.test import TestCase, RequestFactory
 from django.urls import path
 
 from automated_logging.helpers import namedtuple2dict
+from automated_logging.helpers.cache import identities, invalidate
 from automated_logging.middleware import AutomatedLoggingMiddleware
 from automated_logging.models import ModelEvent, RequestEvent, UnspecifiedEvent
-from automated_logging.signals import cached_model_exclusion
 
 User: AbstractUser = get_user_model()
 USER_CREDENTIALS = {"username": "example", "password": "example"}
@@ -31,7 +31,8 @@ def clear_cache():
     # noinspection PyProtectedMember
     automated_logging.decorators._include_models.clear()
 
-    cached_model_exclusion.cache_clear()
+    identities.clear()
+    invalidate()
 
 
 class BaseTestCase(TestCase):
@@ -42,7 +43,7 @@ class BaseTestCase(TestCase):
 
         super().__init__(method_name)
 
-    def request(self, method, view, data=None):
+    def request(self, method, view, data=None, **kwargs):
         """
         request a specific view and return the response.
 
@@ -57,7 +58,7 @@ class BaseTestCase(TestCase):
         urlconf.urlpatterns.clear()
         urlconf.urlpatterns.append(path("", view))
 
-        response = self.client.generic(method, "/", data=data)
+        response = self.client.generic(method, "/", data=data, **kwargs)
 
         urlconf.urlpatterns.clear()
         urlconf.urlpatterns.extend(backup)
@@ -80,7 +81,7 @@ class BaseTestCase(TestCase):
         for key, value in base.items():
             settings.AUTOMATED_LOGGING[key] = deepcopy(value)
 
-        conf.load.cache_clear()
+        conf.load()
 
         self.setUpLogging()
         super().setUp()
@@ -98,7 +99,7 @@ class BaseTestCase(TestCase):
         for key, value in self.original_config.items():
             settings.AUTOMATED_LOGGING[key] = deepcopy(value)
 
-        conf.load.cache_clear()
+        conf.load()
 
         clear_cache()
 
@@ -177,6 +178,6 @@ class BaseTestCase(TestCase):
 
         settings.AUTOMATED_LOGGING["request"]["exclude"]["status"] = []
         settings.AUTOMATED_LOGGING["request"]["exclude"]["methods"] = []
-        conf.load.cache_clear()
+        conf.load()
 
         self.clear()
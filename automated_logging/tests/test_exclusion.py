@@ -12,6 +12,7 @@ from automated_logging.decorators import (
     exclude_model,
 )
 from automated_logging.helpers import Operation
+from automated_logging.helpers.cache import verdicts
 from automated_logging.middleware import AutomatedLoggingMiddleware
 from automated_logging.models import (
     ModelEvent,
@@ -20,7 +21,6 @@ from automated_logging.models import (
     Application,
 )
 from automated_logging.signals import (
-    cached_model_exclusion,
     model_exclusion,
     request_exclusion,
 )
@@ -61,7 +61,7 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
             "automated*"
         ]
 
-        conf.load.cache_clear()
+        conf.load()
 
         OrdinaryTest(random=random_string()).save()
         self.assertEqual(ModelEvent.objects.count(), 0)
@@ -80,7 +80,7 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
         self.clear()
 
         settings.AUTOMATED_LOGGING["globals"]["exclude"]["applications"] = []
-        conf.load.cache_clear()
+        conf.load()
 
         logger = logging.getLogger(__name__)
         logger.info("[TEST]")
@@ -90,14 +90,14 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["unspecified"]["exclude"]["applications"] = [
             "automated*"
         ]
-        conf.load.cache_clear()
+        conf.load()
 
         logger = logging.getLogger(__name__)
         logger.info("[TEST]")
         self.assertEqual(UnspecifiedEvent.objects.count(), 0)
 
         settings.AUTOMATED_LOGGING["model"]["exclude"]["applications"] = ["automated*"]
-        conf.load.cache_clear()
+        conf.load()
 
         OrdinaryTest(random=random_string()).save()
         self.assertEqual(ModelEvent.objects.count(), 0)
@@ -105,7 +105,7 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["request"]["exclude"]["applications"] = [
             "automated*"
         ]
-        conf.load.cache_clear()
+        conf.load()
 
         self.request("GET", self.view)
         self.assertEqual(RequestEvent.objects.count(), 0)
@@ -121,7 +121,7 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["model"]["exclude"]["fields"] = [
             "automated_logging.OrdinaryTest.random"
         ]
-        conf.load.cache_clear()
+        conf.load()
 
         subject.random = random_string()
         subject.save()
@@ -130,14 +130,14 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["model"]["exclude"]["fields"] = [
             "OrdinaryTest.random"
         ]
-        conf.load.cache_clear()
+        conf.load()
 
         subject.random = random_string()
         subject.save()
         self.assertEqual(ModelEvent.objects.count(), 0)
 
         settings.AUTOMATED_LOGGING["model"]["exclude"]["fields"] = ["random"]
-        conf.load.cache_clear()
+        conf.load()
         subject.random = random_string()
         subject.save()
         self.assertEqual(ModelEvent.objects.count(), 0)
@@ -157,7 +157,7 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["model"]["exclude"]["models"] = [
             "automated_logging.tests.models.OrdinaryTest"
         ]
-        conf.load.cache_clear()
+        conf.load()
 
         OrdinaryTest(random=random_string()).save()
         self.assertEqual(ModelEvent.objects.count(), 0)
@@ -165,13 +165,13 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["model"]["exclude"]["models"] = [
             "automated_logging.OrdinaryTest"
         ]
-        conf.load.cache_clear()
+        conf.load()
 
         OrdinaryTest(random=random_string()).save()
         self.assertEqual(ModelEvent.objects.count(), 0)
 
         settings.AUTOMATED_LOGGING["model"]["exclude"]["models"] = ["OrdinaryTest"]
-        conf.load.cache_clear()
+        conf.load()
 
         OrdinaryTest(random=random_string()).save()
         self.assertEqual(ModelEvent.objects.count(), 0)
@@ -190,7 +190,7 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
 
         settings.AUTOMATED_LOGGING["request"]["exclude"]["methods"] = []
         settings.AUTOMATED_LOGGING["request"]["exclude"]["status"] = [200]
-        conf.load.cache_clear()
+        conf.load()
 
         self.clear()
 
@@ -206,7 +206,7 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
 
         settings.AUTOMATED_LOGGING["request"]["exclude"]["methods"] = ["GET"]
         settings.AUTOMATED_LOGGING["request"]["exclude"]["status"] = []
-        conf.load.cache_clear()
+        conf.load()
 
         self.clear()
 
@@ -231,7 +231,7 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["unspecified"]["exclude"]["files"] = [
             path.as_posix()
         ]
-        conf.load.cache_clear()
+        conf.load()
 
         logger.info(random_string())
         self.assertEqual(UnspecifiedEvent.objects.count(), 0)
@@ -240,14 +240,14 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["unspecified"]["exclude"]["files"] = [
             relative.as_posix()
         ]
-        conf.load.cache_clear()
+        conf.load()
 
         logger.info(random_string())
         self.assertEqual(UnspecifiedEvent.objects.count(), 0)
 
         # file name
         settings.AUTOMATED_LOGGING["unspecified"]["exclude"]["files"] = [relative.name]
-        conf.load.cache_clear()
+        conf.load()
 
         logger.info(random_string())
         self.assertEqual(UnspecifiedEvent.objects.count(), 0)
@@ -256,7 +256,7 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["unspecified"]["exclude"]["files"] = [
             "automated_logging"
         ]
-        conf.load.cache_clear()
+        conf.load()
 
         logger.info(random_string())
         self.assertEqual(UnspecifiedEvent.objects.count(), 0)
@@ -265,14 +265,14 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["unspecified"]["exclude"]["files"] = [
             path.parent.as_posix()
         ]
-        conf.load.cache_clear()
+        conf.load()
 
         logger.info(random_string())
         self.assertEqual(UnspecifiedEvent.objects.count(), 0)
 
         # file not excluded
         settings.AUTOMATED_LOGGING["unspecified"]["exclude"]["files"] = ["dal"]
-        conf.load.cache_clear()
+        conf.load()
 
         logger.info(random_string())
         self.assertEqual(UnspecifiedEvent.objects.count(), 1)
@@ -301,13 +301,13 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
         logging.setLogRecordFactory(factory=factory)
 
         settings.AUTOMATED_LOGGING["unspecified"]["exclude"]["unknown"] = True
-        conf.load.cache_clear()
+        conf.load()
 
         logger.info(random_string())
         self.assertEqual(UnspecifiedEvent.objects.count(), 0)
 
         settings.AUTOMATED_LOGGING["unspecified"]["exclude"]["unknown"] = False
-        conf.load.cache_clear()
+        conf.load()
 
         logger.info(random_string())
         self.assertEqual(UnspecifiedEvent.objects.count(), 1)
@@ -322,8 +322,8 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["model"]["exclude"]["applications"] = [
             "pl:automated_logging"
         ]
-        conf.load.cache_clear()
-        cached_model_exclusion.cache_clear()
+        conf.load()
+        verdicts.clear()
 
         self.clear()
         OrdinaryTest().save()
@@ -332,8 +332,8 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["model"]["exclude"]["applications"] = [
             "gl:automated_*"
         ]
-        conf.load.cache_clear()
-        cached_model_exclusion.cache_clear()
+        conf.load()
+        verdicts.clear()
 
         OrdinaryTest().save()
         self.assertEqual(ModelEvent.objects.count(), 0)
@@ -342,8 +342,8 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
             "re:automated.*"
         ]
         self.bypass_request_restrictions()
-        conf.load.cache_clear()
-        cached_model_exclusion.cache_clear()
+        conf.load()
+        verdicts.clear()
 
         self.request("GET", self.view)
         self.assertEqual(RequestEvent.objects.count(), 0)
@@ -356,8 +356,8 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["model"]["exclude"]["models"] = [
             "automated_logging.tests.models"
         ]
-        conf.load.cache_clear()
-        cached_model_exclusion.cache_clear()
+        conf.load()
+        verdicts.clear()
         self.clear()
 
         OrdinaryTest().save()
@@ -375,12 +375,12 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
             app_label = None
 
         settings.AUTOMATED_LOGGING["model"]["exclude"]["unknown"] = True
-        conf.load.cache_clear()
+        conf.load()
 
         self.assertTrue(model_exclusion(MockModel, MockMeta, Operation.CREATE))
 
         settings.AUTOMATED_LOGGING["request"]["exclude"]["unknown"] = True
-        conf.load.cache_clear()
+        conf.load()
 
         self.assertTrue(
             request_exclusion(RequestEvent(application=Application(name=None)))
@@ -393,8 +393,8 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["model"]["exclude"]["applications"] = [
             "gl:automated*"
         ]
-        conf.load.cache_clear()
-        cached_model_exclusion.cache_clear()
+        conf.load()
+        verdicts.clear()
 
         instance = M2MTest()
         instance.save()
@@ -409,6 +409,35 @@ class ConfigurationBasedExclusionsTestCase(BaseTestCase):
 
         self.assertEqual(ModelEvent.objects.count(), 0)
 
+    def test_verdict_cache(self):
+        from django.conf import settings
+        from automated_logging.helpers.cache import ExclusionCache
+        from automated_logging.settings import settings as conf
+
+        cache = ExclusionCache(maxsize=2)
+        self.assertTrue(cache.get("a", lambda: True))
+        self.assertTrue(cache.get("a", lambda: False))
+        cache.get("b", lambda: False)
+        cache.get("c", lambda: False)
+
+        self.assertEqual(cache.info(), (1, 3, 2, 2))
+        # "a" has been evicted
+        self.assertFalse(cache.get("a", lambda: False))
+
+        # verdicts are invalidated when the settings are reloaded
+        self.clear()
+        OrdinaryTest().save()
+        self.assertEqual(ModelEvent.objects.count(), 1)
+        self.assertTrue(verdicts.info().size)
+
+        settings.AUTOMATED_LOGGING["model"]["exclude"]["models"] = ["OrdinaryTest"]
+        conf.load()
+        conf.load()
+        self.assertFalse(verdicts.info().size)
+
+        OrdinaryTest().save()
+        self.assertEqual(ModelEvent.objects.count(), 1)
+
 
 class ClassBasedExclusionsTestCase(BaseTestCase):
     def test_complete(self):
@@ -506,7 +535,7 @@ class DecoratorBasedExclusionsTestCase(BaseTestCase):
 
         settings.AUTOMATED_LOGGING["request"]["exclude"]["methods"] = []
         settings.AUTOMATED_LOGGING["request"]["exclude"]["status"] = []
-        conf.load.cache_clear()
+        conf.load()
         self.clear()
 
         self.request("GET", self.complete_exclusion)
@@ -540,7 +569,7 @@ class DecoratorBasedExclusionsTestCase(BaseTestCase):
 
         settings.AUTOMATED_LOGGING["request"]["exclude"]["status"] = []
         settings.AUTOMATED_LOGGING["request"]["exclude"]["methods"] = ["GET", "POST"]
-        conf.load.cache_clear()
+        conf.load()
 
         self.request("GET", self.partial_inclusion)
         self.assertEqual(RequestEvent.objects.count(), 0)
@@ -549,7 +578,7 @@ class DecoratorBasedExclusionsTestCase(BaseTestCase):
         self.clear()
 
         settings.AUTOMATED_LOGGING["request"]["exclude"]["methods"] = []
-        conf.load.cache_clear()
+        conf.load()
 
         # test if include_view has higher priority than exclude_view
         view = include_view(self.complete_exclusion, methods=["GET"])
@@ -616,6 +645,15 @@ class DecoratorBasedExclusionsTestCase(BaseTestCase):
 
         self.assertEqual(ModelEvent.objects.count(), 1)
 
+    def test_register_invalidates(self):
+        self.clear()
+        OrdinaryTest().save()
+        self.assertEqual(ModelEvent.objects.count(), 1)
+
+        exclude_model(OrdinaryTest)
+        OrdinaryTest().save()
+        self.assertEqual(ModelEvent.objects.count(), 1)
+
     def test_model_admin(self):
         FullDecoratorBasedExclusionTest.__dal_register__()
 
@@ -1,18 +1,39 @@
 # test max_age (rework?)
 # test save
 # test module removal
+import asyncio
 import logging
 import logging.config
+import os
+from collections import OrderedDict
 from datetime import timedelta
+from io import StringIO
+from tempfile import TemporaryDirectory
+from threading import Event, Thread
 import time
+from time import monotonic
 
 from django.http import JsonResponse
+from django.test import SimpleTestCase
 from marshmallow import ValidationError
 
+from automated_logging.collector import Collector, CollectorClient
+from automated_logging.handlers import DatabaseHandler
 from automated_logging.helpers.exceptions import CouldNotConvertError
-from automated_logging.models import ModelEvent, RequestEvent, UnspecifiedEvent
+from automated_logging.models import (
+    Application,
+    ModelEntry,
+    ModelEvent,
+    ModelMirror,
+    ModelValueModification,
+    RequestContext,
+    RequestEvent,
+    UnspecifiedEvent,
+)
 from automated_logging.tests.models import OrdinaryTest
 from automated_logging.tests.base import BaseTestCase
+from automated_logging.spool import Spool
+from automated_logging.writers import AsyncWriter, BackgroundWriter
 
 
 class TestDatabaseHandlerTestCase(BaseTestCase):
@@ -30,8 +51,9 @@ class TestDatabaseHandlerTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["model"]["max_age"] = duration
         settings.AUTOMATED_LOGGING["request"]["max_age"] = duration
         settings.AUTOMATED_LOGGING["unspecified"]["max_age"] = duration
+        settings.AUTOMATED_LOGGING["purge"]["interval"] = 0
 
-        conf.load.cache_clear()
+        conf.load()
 
         self.clear()
         self.bypass_request_restrictions()
@@ -58,8 +80,9 @@ class TestDatabaseHandlerTestCase(BaseTestCase):
 
         logger = logging.getLogger(__name__)
 
+        settings.AUTOMATED_LOGGING["purge"]["interval"] = 0
         settings.AUTOMATED_LOGGING["unspecified"]["max_age"] = timedelta(seconds=1)
-        conf.load.cache_clear()
+        conf.load()
         self.clear()
 
         logger.info("I will do what I must.")
@@ -68,7 +91,7 @@ class TestDatabaseHandlerTestCase(BaseTestCase):
         self.assertEqual(UnspecifiedEvent.objects.count(), 1)
 
         settings.AUTOMATED_LOGGING["unspecified"]["max_age"] = 1
-        conf.load.cache_clear()
+        conf.load()
         self.clear()
 
         logger.info("A yes, the negotiator.")
@@ -77,7 +100,7 @@ class TestDatabaseHandlerTestCase(BaseTestCase):
         self.assertEqual(UnspecifiedEvent.objects.count(), 1)
 
         settings.AUTOMATED_LOGGING["unspecified"]["max_age"] = "PT1S"
-        conf.load.cache_clear()
+        conf.load()
         self.clear()
 
         logger.info("Don't make me kill you.")
@@ -96,12 +119,844 @@ class TestDatabaseHandlerTestCase(BaseTestCase):
         logging.config.dictConfig(config)
 
         self.clear()
-        for _ in range(9):
+        # the application is queued together with the first event
+        for _ in range(8):
             logger.info("It's a trick. Send no reply")
 
         self.assertEqual(UnspecifiedEvent.objects.count(), 0)
         logger.info("I can't see a thing. My cockpit's fogging")
-        self.assertEqual(UnspecifiedEvent.objects.count(), 10)
+        self.assertEqual(UnspecifiedEvent.objects.count(), 9)
 
         config["handlers"]["db"]["batch"] = 1
         logging.config.dictConfig(config)
+
+    def test_bulk(self):
+        from django.conf import settings
+
+        logger = logging.getLogger(__name__)
+
+        config = settings.LOGGING
+
+        config["handlers"]["db"]["batch"] = 10
+        config["handlers"]["db"]["bulk"] = True
+        logging.config.dictConfig(config)
+
+        self.clear()
+        for _ in range(4):
+            OrdinaryTest(random="Hello There").save()
+
+        # modify an entry that already exists in the database
+        instance = OrdinaryTest(random="General Kenobi")
+        instance.save()
+        logging.getLogger("automated_logging").handlers[-1].flush()
+
+        instance.random = "You are a bold one"
+        instance.save()
+        logging.getLogger("automated_logging").handlers[-1].flush()
+
+        self.assertEqual(ModelEvent.objects.count(), 6)
+        for event in ModelEvent.objects.all():
+            self.assertGreater(event.modifications.count(), 0)
+
+        modifications = ModelEvent.objects.get(
+            entry__primary_key=str(instance.pk), operation=0
+        ).modifications.all()
+        self.assertEqual(modifications.count(), 1)
+        self.assertEqual(modifications[0].current, "You are a bold one")
+
+        config["handlers"]["db"]["batch"] = 1
+        config["handlers"]["db"]["bulk"] = False
+        logging.config.dictConfig(config)
+
+    def test_asyncio(self):
+        from django.conf import settings
+
+        logger = logging.getLogger(__name__)
+
+        config = settings.LOGGING
+
+        config["handlers"]["db"]["asyncio"] = True
+        logging.config.dictConfig(config)
+
+        # without a running event loop records are processed immediately
+        self.clear()
+        logger.info("I have a bad feeling about this")
+        self.assertEqual(UnspecifiedEvent.objects.count(), 1)
+
+        del config["handlers"]["db"]["asyncio"]
+        logging.config.dictConfig(config)
+
+    def test_aggregate(self):
+        from django.conf import settings
+        from automated_logging.settings import settings as conf
+
+        logger = logging.getLogger(__name__)
+        handler = logging.getLogger("automated_logging").handlers[-1]
+
+        settings.AUTOMATED_LOGGING["unspecified"]["aggregate"] = 60
+        conf.load()
+
+        self.clear()
+        for idx in range(5):
+            logger.warning("Hello there %s", idx)
+        logger.warning("General Kenobi")
+
+        self.assertEqual(UnspecifiedEvent.objects.count(), 0)
+        handler.flush()
+
+        self.assertEqual(UnspecifiedEvent.objects.count(), 2)
+        event = UnspecifiedEvent.objects.get(count=5)
+        self.assertEqual(event.message, "Hello there 0")
+        self.assertLess(event.first_seen, event.last_seen)
+        event = UnspecifiedEvent.objects.get(count=1)
+        self.assertEqual(event.message, "General Kenobi")
+
+        # records after the window has been closed release the aggregated events
+        settings.AUTOMATED_LOGGING["unspecified"]["aggregate"] = 0.05
+        conf.load()
+
+        self.clear()
+        for _ in range(2):
+            logger.warning("You are a bold one")
+        time.sleep(0.1)
+        logger.warning("Back away, I will deal with this Jedi slime myself")
+
+        event = UnspecifiedEvent.objects.get()
+        self.assertEqual(event.count, 2)
+
+        handler.flush()
+        self.assertEqual(UnspecifiedEvent.objects.count(), 2)
+
+    def test_tick(self):
+        from django.conf import settings
+        from automated_logging.settings import settings as conf
+
+        settings.AUTOMATED_LOGGING["unspecified"]["aggregate"] = 0.05
+        conf.load()
+
+        handler = DatabaseHandler(threading=True)
+        handler.writer.stop()
+        logger = logging.getLogger(f"{__name__}.tick")
+        logger.propagate = False
+        logger.addHandler(handler)
+
+        def warn():
+            logger.warning("You are a bold one")
+
+        self.clear()
+        warn()
+        # the lock of the handler is released after every record
+        thread = Thread(target=warn)
+        thread.start()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        self.assertIsNone(handler.tick())
+
+        # the workers of the writer release closed windows without a record
+        time.sleep(0.1)
+        instances = handler.tick()
+        [event] = [i for i in instances.values() if isinstance(i, UnspecifiedEvent)]
+        self.assertEqual(event.count, 2)
+        handler._write(instances)
+        self.assertEqual(UnspecifiedEvent.objects.get().count, 2)
+
+        logger.removeHandler(handler)
+        handler.writer = None
+        handler.close()
+
+    def test_application_cache(self):
+        from automated_logging.handlers import DatabaseHandler
+
+        logger = logging.getLogger(__name__)
+        DatabaseHandler._application.cache_clear()
+
+        self.clear()
+        for _ in range(3):
+            logger.info("Roger, roger")
+
+        events = UnspecifiedEvent.objects.all()
+        self.assertEqual(events.count(), 3)
+        self.assertEqual({e.application.name for e in events}, {"automated_logging"})
+        self.assertEqual({e.file for e in events}, {__file__})
+
+        info = DatabaseHandler._application.cache_info()
+        self.assertEqual((info.hits, info.misses), (2, 1))
+
+        self.assertIsNone(DatabaseHandler._application("/srv/unknown/file.py", "file"))
+        self.assertEqual(
+            DatabaseHandler._application("/srv/unknown/file.py", "automated_logging"),
+            "automated_logging",
+        )
+
+    def test_upsert(self):
+        from django.db import connection
+        from unittest.mock import patch
+        from django.test.utils import CaptureQueriesContext
+        from automated_logging.helpers.cache import identities
+
+        def entry(value, primary_key=66):
+            application = Application(name="galaxy")
+            mirror = ModelMirror(name="Clone", application=application)
+            return ModelEntry(mirror=mirror, primary_key=primary_key, value=value)
+
+        # two processes, that do not know of each other, queue the same entry
+        first, second = DatabaseHandler(batch=100), DatabaseHandler(batch=100)
+        with CaptureQueriesContext(connection) as queued:
+            [cody] = first.entries([entry("Cody")])
+            identities.clear()
+            [unknown] = second.entries([entry("")])
+        self.assertEqual(len(queued.captured_queries), 0)
+
+        first.flush()
+        second.flush()
+        identities.clear()
+
+        self.assertEqual(Application.objects.filter(name="galaxy").count(), 1)
+        self.assertEqual(ModelMirror.objects.filter(name="Clone").count(), 1)
+        self.assertEqual(cody.pk, unknown.pk)
+        # entries without a value do not overwrite the value
+        self.assertEqual(ModelEntry.objects.get(pk=cody.pk).value, "Cody")
+
+        third = DatabaseHandler(batch=100)
+        [rex] = third.entries([entry("Rex")])
+        third.flush()
+
+        self.assertEqual(rex.pk, cody.pk)
+        self.assertEqual(ModelEntry.objects.get(pk=cody.pk).value, "Rex")
+
+        # databases without conflict handling look the rows up beforehand
+        identities.clear()
+        with patch.object(connection.features, "supports_ignore_conflicts", False):
+            fourth = DatabaseHandler(batch=100)
+            [wolffe] = fourth.entries([entry("Wolffe")])
+            fourth.flush()
+
+        self.assertEqual(wolffe.pk, cody.pk)
+        self.assertEqual(ModelEntry.objects.get(pk=cody.pk).value, "Wolffe")
+        self.assertEqual(ModelMirror.objects.filter(name="Clone").count(), 1)
+
+        # long primary keys are resolved via their digest
+        identities.clear()
+        fifth, sixth = DatabaseHandler(batch=100), DatabaseHandler(batch=100)
+        [echo] = fifth.entries([entry("Echo", "9" * 1000)])
+        fifth.flush()
+        [fives] = sixth.entries([entry("Fives", "9" * 1000)])
+        sixth.flush()
+
+        self.assertEqual(echo.pk, fives.pk)
+        self.assertEqual(ModelEntry.objects.get(pk=echo.pk).value, "Fives")
+
+    def test_natural(self):
+        """test if queued instances are looked up via their natural key"""
+        handler = DatabaseHandler(batch=100)
+
+        application, created = handler.get_or_create(Application, name="galaxy")
+        self.assertTrue(created)
+        self.assertEqual(
+            handler.get_or_create(Application, name="galaxy"), (application, False)
+        )
+
+        mirror, _ = handler.get_or_create(
+            ModelMirror, name="Clone", application=application
+        )
+        self.assertEqual(
+            handler.get_or_create(ModelMirror, name="Clone", application=application),
+            (mirror, False),
+        )
+        self.assertEqual(
+            set(handler.natural.keys()),
+            {(Application, ("galaxy",)), (ModelMirror, (application.pk, "Clone"))},
+        )
+
+        # the index is cleared together with the queued instances
+        handler.flush()
+        self.assertEqual(handler.natural, {})
+        self.assertTrue(handler.get_or_create(Application, name="galaxy")[1])
+        handler.close()
+
+    def test_writer_order(self):
+        from django.conf import settings
+        from automated_logging.settings import settings as conf
+        from automated_logging.helpers.cache import identities
+        from automated_logging.tests.models import M2MTest
+
+        settings.AUTOMATED_LOGGING["model"]["m2m"] = {"chunk": 1}
+        conf.load()
+
+        children = [OrdinaryTest(random=str(i)) for i in range(3)]
+        [c.save() for c in children]
+        m2m = M2MTest()
+        m2m.save()
+
+        self.clear()
+        identities.clear()
+        with self.assertLogs("automated_logging.signals.m2m") as logs:
+            m2m.relationship.add(*children)
+
+        class Writer:
+            def __init__(self):
+                self.batches = []
+
+            def put(self, instances):
+                self.batches.append(instances)
+
+        handler = DatabaseHandler(threading=True, workers=2)
+        handler.writer.stop()
+        handler.writer = Writer()
+        for record in logs.records:
+            handler.handle(record)
+
+        # every chunk is a batch, the workers might write them in any order
+        batches, handler.writer = handler.writer.batches, None
+        self.assertEqual(len(batches), 3)
+        for batch in reversed(batches):
+            handler._write(batch)
+        handler.close()
+
+        self.assertEqual(ModelMirror.objects.filter(name="M2MTest").count(), 1)
+        event = ModelEvent.objects.get(entry__mirror__name="M2MTest")
+        self.assertEqual(event.relationships.count(), 3)
+        self.assertEqual(handler.uncommitted, set())
+
+    def test_rollback(self):
+        """test if rows of rolled back transactions are not cached"""
+        from django.db import transaction
+        from automated_logging.helpers.cache import identities
+
+        ModelMirror.objects.filter(name="OrdinaryTest").delete()
+        identities.clear()
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            OrdinaryTest(random="Execute order 66").save()
+            raise RuntimeError
+
+        OrdinaryTest(random="It will be done, my lord").save()
+
+        mirror = ModelMirror.objects.get(name="OrdinaryTest")
+        self.assertEqual(ModelEvent.objects.filter(entry__mirror=mirror).count(), 1)
+
+    def test_identity_cache(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.clear()
+        # rows are only cached once they have been committed
+        with self.captureOnCommitCallbacks(execute=True):
+            OrdinaryTest(random="Hello There").save()
+
+        instance = OrdinaryTest(random="General Kenobi")
+        with CaptureQueriesContext(connection) as warm:
+            instance.save()
+
+        # no lookups for application, mirror and fields
+        for query in warm.captured_queries:
+            self.assertNotIn('"automated_logging_application"."name"', query["sql"])
+            self.assertNotIn('"automated_logging_modelfield"."name"', query["sql"])
+
+        # deleted rows are no longer cached
+        ModelMirror.objects.filter(name="OrdinaryTest").delete()
+        self.clear()
+        OrdinaryTest(random="You are a bold one").save()
+
+        self.assertEqual(ModelEvent.objects.count(), 1)
+        self.assertEqual(ModelMirror.objects.filter(name="OrdinaryTest").count(), 1)
+
+    def test_purge_interval(self):
+        from django.conf import settings
+        from automated_logging.settings import settings as conf
+        from automated_logging.helpers import purge
+
+        logger = logging.getLogger(__name__)
+
+        settings.AUTOMATED_LOGGING["purge"]["interval"] = 60
+        settings.AUTOMATED_LOGGING["unspecified"]["max_age"] = timedelta(seconds=1)
+        conf.load()
+        self.clear()
+
+        purge._last = None
+        logger.info("Hello There.")
+        time.sleep(1)
+        logger.info("General Kenobi.")
+
+        # the purge after the first message was the only one in the interval
+        self.assertEqual(UnspecifiedEvent.objects.count(), 2)
+
+        settings.AUTOMATED_LOGGING["purge"]["interval"] = None
+        conf.load()
+
+        purge._last = None
+        logger.info("You are a bold one.")
+        self.assertEqual(UnspecifiedEvent.objects.count(), 3)
+
+    def test_purge_command(self):
+        from django.conf import settings
+        from django.core.management import call_command
+        from automated_logging.settings import settings as conf
+
+        duration = timedelta(seconds=1)
+        logger = logging.getLogger(__name__)
+
+        settings.AUTOMATED_LOGGING["purge"]["interval"] = None
+        settings.AUTOMATED_LOGGING["model"]["max_age"] = duration
+        settings.AUTOMATED_LOGGING["request"]["max_age"] = duration
+        settings.AUTOMATED_LOGGING["request"]["data"]["enabled"] = ["request"]
+        settings.AUTOMATED_LOGGING["unspecified"]["max_age"] = duration
+        conf.load()
+
+        self.clear()
+        self.bypass_request_restrictions()
+
+        instance = OrdinaryTest(random="Hello There")
+        instance.save()
+        instance.random = "General Kenobi"
+        instance.save()
+        self.request("GET", self.view)
+        for _ in range(3):
+            logger.info("I have the high ground Anakin!")
+
+        self.assertEqual(ModelEvent.objects.count(), 2)
+        self.assertEqual(RequestEvent.objects.count(), 1)
+        self.assertGreater(UnspecifiedEvent.objects.count(), 2)
+
+        time.sleep(2)
+        out = StringIO()
+        call_command("dal_purge", chunk=2, stdout=out)
+
+        self.assertEqual(ModelEvent.objects.count(), 0)
+        self.assertEqual(ModelValueModification.objects.count(), 0)
+        self.assertEqual(RequestEvent.objects.count(), 0)
+        self.assertEqual(RequestContext.objects.count(), 0)
+        self.assertEqual(UnspecifiedEvent.objects.count(), 0)
+        self.assertIn("model: deleted 2 events", out.getvalue())
+
+    def test_spool(self):
+        from django.conf import settings
+        from django.core.management import call_command
+
+        logger = logging.getLogger(__name__)
+        config = settings.LOGGING
+
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "spool")
+            config["handlers"]["db"]["spool"] = {"path": path, "mode": "always"}
+            logging.config.dictConfig(config)
+
+            self.clear()
+            logger.info("Execute order %s", 66)
+            OrdinaryTest(random="It will be done, my lord").save()
+
+            self.assertEqual(UnspecifiedEvent.objects.count(), 0)
+            self.assertEqual(ModelEvent.objects.count(), 0)
+
+            out = StringIO()
+            call_command("dal_replay", path, stdout=out)
+            self.assertIn("replayed 2 items", out.getvalue())
+
+            event = UnspecifiedEvent.objects.get()
+            self.assertEqual(event.message, "Execute order 66")
+            modification = ModelEvent.objects.get().modifications.get(
+                field__name="random"
+            )
+            self.assertEqual(modification.current, "It will be done, my lord")
+            self.assertEqual(Spool(path).segments(), [])
+
+            del config["handlers"]["db"]["spool"]
+            logging.config.dictConfig(config)
+
+    def test_spool_failure(self):
+        from django.db import connection
+        from django.db.utils import OperationalError
+
+        def unavailable(execute, sql, params, many, context):
+            raise OperationalError("the database is unavailable")
+
+        with TemporaryDirectory() as directory:
+            spool = {"path": os.path.join(directory, "spool"), "fsync": "never"}
+            handler = DatabaseHandler(spool=spool)
+
+            record = logging.getLogger(__name__).makeRecord(
+                __name__, logging.INFO, __file__, 1, "Hello there", None, None
+            )
+
+            # records are dispatched without querying the database,
+            # the write of the batch fails
+            self.clear()
+            with connection.execute_wrapper(unavailable):
+                handler.handle(record)
+
+            handler.limit = 10
+            OrdinaryTest(random="General Kenobi").save()
+            handler.handle(
+                logging.getLogger(__name__).makeRecord(
+                    __name__, logging.INFO, __file__, 2, "General Kenobi", None, None
+                )
+            )
+            with connection.execute_wrapper(unavailable):
+                handler.flush()
+
+            self.assertEqual(UnspecifiedEvent.objects.count(), 0)
+            kinds = [kind for kind, _ in Spool.read(handler.spool.path)]
+            self.assertEqual(kinds, ["instances", "instances"])
+
+            # replaying an item twice does not create duplicates
+            handler.spool.rotate()
+            segment = handler.spool.segments()[0]
+
+            replay = DatabaseHandler(batch=10)
+            for _ in range(2):
+                for item in Spool.read(segment):
+                    replay.replay(item)
+                replay.flush()
+
+            lines = UnspecifiedEvent.objects.values_list("line", flat=True)
+            self.assertEqual(sorted(lines), [1, 2])
+
+    def test_collector(self):
+        from django.conf import settings
+
+        logger = logging.getLogger(__name__)
+        config = settings.LOGGING
+
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "collector.sock")
+            collector = Collector(path, DatabaseHandler(batch=10, bulk=True))
+
+            config["handlers"]["db"]["collector"] = {"path": path}
+            logging.config.dictConfig(config)
+
+            self.clear()
+            logger.info("Execute order %s", 66)
+            OrdinaryTest(random="It will be done, my lord").save()
+
+            self.assertEqual(UnspecifiedEvent.objects.count(), 0)
+            self.assertEqual(ModelEvent.objects.count(), 0)
+
+            for _ in range(5):
+                collector.poll(0.05)
+            collector.close()
+
+            event = UnspecifiedEvent.objects.get()
+            self.assertEqual(event.message, "Execute order 66")
+            modification = ModelEvent.objects.get().modifications.get(
+                field__name="random"
+            )
+            self.assertEqual(modification.current, "It will be done, my lord")
+
+            # records are processed by the process itself,
+            # if the collector is unavailable
+            self.clear()
+            logger.info("Execute order %s", 66)
+            self.assertEqual(UnspecifiedEvent.objects.count(), 1)
+
+            del config["handlers"]["db"]["collector"]
+            logging.config.dictConfig(config)
+
+    def test_collector_command(self):
+        from unittest.mock import patch
+        from django.core.management import call_command
+
+        served = []
+
+        def serve_forever(collector):
+            served.append(collector)
+            raise KeyboardInterrupt
+
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "collector.sock")
+            stdout = StringIO()
+            with patch.object(Collector, "serve_forever", serve_forever):
+                call_command("dal_collector", path, "--workers", "2", stdout=stdout)
+
+            [collector] = served
+            self.assertIn(f"collecting records on {path}", stdout.getvalue())
+            # the handler writes in the background and spools by default
+            self.assertTrue(collector.background)
+            self.assertEqual(collector.handler.spool.path, f"{path}.spool")
+            # the socket is removed and the writer is stopped on exit
+            self.assertFalse(os.path.exists(path))
+            self.assertIsNone(collector.handler.writer)
+
+
+class SpoolTestCase(SimpleTestCase):
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "spool")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_rotate(self):
+        spool = Spool(self.path, max_bytes=64, fsync="rotate")
+        for idx in range(10):
+            spool.append(("item", idx, "x" * 16))
+
+        segments = spool.segments()
+        self.assertGreater(len(segments), 1)
+        self.assertEqual(segments, sorted(segments, key=lambda s: int(s[-1])))
+
+        processed = []
+        self.assertEqual(spool.replay(processed.append), 10)
+        self.assertEqual([i[1] for i in processed], list(range(10)))
+        self.assertEqual(spool.segments(), [])
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_failure(self):
+        spool = Spool(self.path)
+        spool.append(1)
+        spool.append(2)
+
+        # truncated item at the end
+        with open(self.path, "ab") as file:
+            file.write(b"\x00\x00\x01\x00")
+
+        def fail(item):
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            spool.replay(fail)
+
+        # the segment is kept, if processing failed
+        processed = []
+        self.assertEqual(spool.replay(processed.append), 2)
+        self.assertEqual(processed, [1, 2])
+
+        with self.assertRaises(ValueError):
+            Spool(self.path, fsync="sometimes")
+
+
+class CollectorTestCase(SimpleTestCase):
+    class Handler(logging.Handler):
+        def __init__(self):
+            super().__init__()
+            self.records = []
+            self.flushed = 0
+            self.ticked = 0
+
+        def emit(self, record):
+            if record.msg == "It's a trap":
+                raise RuntimeError(record.msg)
+            self.records.append(record)
+
+        def flush(self):
+            self.flushed += 1
+
+        def tick(self):
+            self.ticked += 1
+
+    def setUp(self):
+        self.directory = TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "collector.sock")
+        self.handler = self.Handler()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_send(self):
+        client = CollectorClient(self.path, timeout=0.1)
+        self.assertFalse(client.send({"msg": "Hello there"}))
+
+        collector = Collector(self.path, self.handler, latency=0)
+        self.assertTrue(client.send({"msg": "Hello there"}))
+        # unpicklable items are not sent
+        self.assertFalse(client.send({"msg": lambda: None}))
+
+        for _ in range(3):
+            collector.poll(0.05)
+        self.assertEqual([r.msg for r in self.handler.records], ["Hello there"])
+        self.assertGreater(self.handler.flushed, 0)
+        self.assertEqual(self.handler.ticked, 3)
+
+        # the connection is opened again, if the collector closed it
+        for connection in list(collector.buffers):
+            collector._disconnect(connection)
+        self.assertTrue(client.send({"msg": "General Kenobi"}))
+        for _ in range(3):
+            collector.poll(0.05)
+        self.assertEqual(self.handler.records[-1].msg, "General Kenobi")
+
+        client.close()
+        collector.close()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_failure(self):
+        import socket
+        from contextlib import redirect_stderr
+        from automated_logging.spool import HEADER
+
+        collector = Collector(self.path, self.handler, latency=0)
+        client = CollectorClient(self.path, timeout=0.1)
+
+        # frames that cannot be unpickled or processed are skipped
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(self.path)
+        connection.sendall(HEADER.pack(3) + b"bad")
+        self.assertTrue(client.send({"msg": "It's a trap"}))
+        self.assertTrue(client.send({"msg": "Hello there"}))
+
+        stderr = StringIO()
+        with redirect_stderr(stderr):
+            for _ in range(3):
+                collector.poll(0.05)
+
+        self.assertEqual([r.msg for r in self.handler.records], ["Hello there"])
+        self.assertIn("UnpicklingError", stderr.getvalue())
+        self.assertIn("It's a trap", stderr.getvalue())
+
+        connection.close()
+        client.close()
+        collector.close()
+
+
+class BackgroundWriterTestCase(SimpleTestCase):
+    def setUp(self):
+        self.written = []
+        self.gate = Event()
+        self.gate.set()
+
+    def write(self, instances):
+        self.gate.wait()
+        self.written.append(list(instances.keys()))
+
+    def test_batch(self):
+        writer = BackgroundWriter(self.write, batch=3, latency=60)
+
+        for idx in range(6):
+            writer.put(OrderedDict({idx: idx}))
+        writer.join()
+
+        self.assertEqual(self.written, [[0, 1, 2], [3, 4, 5]])
+        writer.stop()
+
+    def test_latency(self):
+        writer = BackgroundWriter(self.write, batch=100, latency=0.1)
+
+        writer.put(OrderedDict({0: 0}))
+        writer.join()
+
+        self.assertEqual(self.written, [[0]])
+        writer.stop()
+
+    def test_tick(self):
+        ticks = []
+
+        def tick():
+            ticks.append(monotonic())
+            return OrderedDict({len(ticks): None}) if len(ticks) == 2 else None
+
+        writer = BackgroundWriter(self.write, batch=100, latency=0.05, tick=tick)
+        time.sleep(0.3)
+        writer.stop()
+
+        # idle workers tick every latency seconds, released instances are written
+        self.assertGreaterEqual(len(ticks), 3)
+        self.assertEqual(self.written, [[2]])
+
+    def test_stop(self):
+        writer = BackgroundWriter(self.write, batch=100, latency=60)
+
+        writer.put(OrderedDict({0: 0}))
+        writer.stop()
+
+        self.assertEqual(self.written, [[0]])
+        self.assertFalse(any(t.is_alive() for t in writer.threads))
+
+    def test_backpressure(self):
+        self.assertRaises(ValueError, BackgroundWriter, self.write, backpressure="")
+
+        spilled = []
+        writer = BackgroundWriter(
+            self.write, size=1, batch=1, backpressure="spill", spill=spilled.append
+        )
+        self.gate.clear()
+        # the first item is taken by the worker, the second one fills the queue
+        writer.put(OrderedDict({0: 0}))
+        time.sleep(0.1)
+        writer.put(OrderedDict({1: 1}))
+        writer.put(OrderedDict({2: 2}))
+        self.assertEqual(spilled, [OrderedDict({2: 2})])
+        self.gate.set()
+        writer.stop()
+
+        for policy, expected in (
+            ("drop-newest", [[0], [1]]),
+            ("drop-oldest", [[0], [2]]),
+        ):
+            self.written.clear()
+            writer = BackgroundWriter(self.write, size=1, backpressure=policy)
+            self.gate.clear()
+            writer.put(OrderedDict({0: 0}))
+            time.sleep(0.1)
+            writer.put(OrderedDict({1: 1}))
+            writer.put(OrderedDict({2: 2}))
+            self.assertEqual(writer.dropped, 1)
+            self.gate.set()
+            writer.stop()
+
+            self.assertEqual(self.written, expected)
+
+
+class AsyncWriterTestCase(SimpleTestCase):
+    def setUp(self):
+        self.processed = []
+
+    def process(self, items):
+        self.processed.append(list(items))
+
+    def test_batch(self):
+        writer = AsyncWriter(self.process, batch=3, latency=60)
+
+        async def main():
+            for idx in range(6):
+                writer.put(idx)
+            await writer.drain()
+
+        asyncio.run(main())
+        self.assertEqual(self.processed, [[0, 1, 2], [3, 4, 5]])
+        writer.stop()
+
+    def test_latency(self):
+        writer = AsyncWriter(self.process, batch=100, latency=0.1)
+
+        async def main():
+            # put from another thread, e.g. via sync_to_async
+            await asyncio.get_running_loop().run_in_executor(None, writer.put, 0)
+            await asyncio.sleep(0.01)
+            await writer.drain()
+
+        asyncio.run(main())
+        self.assertEqual(self.processed, [[0]])
+        writer.stop()
+
+    def test_no_loop(self):
+        writer = AsyncWriter(self.process)
+
+        writer.put(0)
+        self.assertEqual(self.processed, [[0]])
+        writer.stop()
+
+    def test_lifespan(self):
+        from automated_logging.asgi import LifespanApplication
+
+        writer = AsyncWriter(self.process, batch=100, latency=60)
+        application = LifespanApplication(None)
+        sent = []
+
+        async def main():
+            messages = asyncio.Queue()
+            await messages.put({"type": "lifespan.startup"})
+
+            async def send(message):
+                sent.append(message["type"])
+                if message["type"] == "lifespan.startup.complete":
+                    writer.put(0)
+                    writer.put(1)
+                    await messages.put({"type": "lifespan.shutdown"})
+
+            await application({"type": "lifespan"}, messages.get, send)
+
+        asyncio.run(main())
+        self.assertEqual(
+            sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        )
+        self.assertEqual(self.processed, [[0, 1]])
+        writer.stop()
@@ -3,14 +3,18 @@
 import random
 
 from automated_logging.helpers import Operation
-from automated_logging.models import ModelEvent
+from automated_logging.models import ModelEntry, ModelEvent
 from automated_logging.tests.models import (
     M2MTest,
     OrdinaryTest,
     OneToOneTest,
     ForeignKeyTest,
 )
-from automated_logging.signals.m2m import find_m2m_rel
+from automated_logging.signals.m2m import (
+    build_m2m_relations,
+    find_m2m_rel,
+    relations,
+)
 from automated_logging.tests.base import BaseTestCase
 from automated_logging.tests.helpers import random_string
 
@@ -200,6 +204,23 @@ class LoggedOutM2MRelationshipsTestCase(BaseTestCase):
         self.assertIsNotNone(find_m2m_rel(m2m.relationship.through, M2MTest))
         self.assertIsNone(find_m2m_rel(m2m.relationship.through, OrdinaryTest))
 
+    def test_relations(self):
+        """test if the registry includes auto created through models"""
+        through = M2MTest.relationship.through
+        self.assertTrue(through._meta.auto_created)
+
+        field = relations[(through, M2MTest)]
+        self.assertEqual(field, M2MTest._meta.get_field("relationship"))
+        self.assertNotIn((through, OrdinaryTest), relations)
+
+        # models missing from the registry are searched and added
+        relations.clear()
+        self.assertEqual(find_m2m_rel(through, M2MTest), field)
+        self.assertEqual(relations, {(through, M2MTest): field})
+
+        build_m2m_relations()
+        self.assertIn((through, M2MTest), relations)
+
     def test_reverse(self):
         m2m = M2MTest()
         m2m.save()
@@ -226,5 +247,107 @@ class LoggedOutM2MRelationshipsTestCase(BaseTestCase):
         self.assertEqual(relationship.field.name, "relationship")
         self.assertEqual(relationship.entry.primary_key, str(subject.id))
 
+    def test_reverse_targets(self):
+        """test if the instance of a reverse change is not loaded again"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        targets = [M2MTest() for _ in range(3)]
+        [t.save() for t in targets]
+
+        subject = OrdinaryTest(random=random_string())
+        subject.save()
+
+        ModelEvent.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as queries, self.assertLogs(
+            "automated_logging.signals.m2m"
+        ) as logs:
+            subject.m2mtest_set.add(*targets)
+
+        for query in queries.captured_queries:
+            self.assertNotIn('FROM "automated_logging_ordinarytest"', query["sql"])
+
+        self.assertEqual(len(logs.records), len(targets))
+        for record in logs.records:
+            entry = record.relationships[0].entry
+            self.assertEqual(entry.primary_key, subject.pk)
+            self.assertEqual(entry.value, repr(subject))
+
+    def test_chunk(self):
+        """test if changes are split into multiple records of a single event"""
+        from django.conf import settings
+        from automated_logging.settings import settings as conf
+
+        settings.AUTOMATED_LOGGING["model"]["m2m"] = {"chunk": 3}
+        conf.load()
+
+        samples = 10
+        children = self.generate_children(samples)
+
+        m2m = M2MTest()
+        m2m.save()
+        ModelEvent.objects.all().delete()
+
+        with self.assertLogs("automated_logging.signals.m2m") as logs:
+            m2m.relationship.add(*children)
+
+        self.assertEqual([len(r.relationships) for r in logs.records], [3, 3, 3, 1])
+        self.assertEqual(len({id(r.event) for r in logs.records}), 1)
+
+        entries = [e.entry for r in logs.records for e in r.relationships]
+        self.assertEqual(
+            {(e.primary_key, e.value) for e in entries},
+            {(c.pk, repr(c)) for c in children},
+        )
+
+        # clearing only fetches the primary keys beforehand,
+        # every record is written to the same event
+        m2m.save()
+        ModelEvent.objects.all().delete()
+        m2m.relationship.clear()
+
+        event = ModelEvent.objects.get()
+        self.assertEqual(event.relationships.count(), samples)
+        self.assertEqual(
+            {r.entry.primary_key for r in event.relationships.all()},
+            {str(c.pk) for c in children},
+        )
+
+    def test_values(self):
+        """test if only primary keys are recorded and existing values are kept"""
+        from django.conf import settings
+        from automated_logging.settings import settings as conf
+
+        children = self.generate_children(2)
+
+        settings.AUTOMATED_LOGGING["model"]["m2m"] = {"values": False}
+        conf.load()
+
+        m2m = M2MTest()
+        m2m.save()
+        ModelEvent.objects.all().delete()
+
+        m2m.relationship.add(*children)
+
+        event = ModelEvent.objects.get()
+        entries = {r.entry.primary_key: r.entry for r in event.relationships.all()}
+
+        # the children have been saved before, their values are not overwritten
+        for child in children:
+            self.assertEqual(entries[str(child.pk)].value, repr(child))
+
+        child = OrdinaryTest(random=random_string())
+        child.save()
+        m2m.save()
+        ModelEvent.objects.all().delete()
+        ModelEntry.objects.filter(primary_key=str(child.pk)).delete()
+
+        m2m.relationship.add(child)
+
+        relationship = ModelEvent.objects.get().relationships.get()
+        self.assertEqual(relationship.entry.primary_key, str(child.pk))
+        self.assertEqual(relationship.entry.value, "")
+
 
 # TODO: test lazy_model_exclusion
@@ -2,11 +2,14 @@ from datetime import timedelta
 
 from marshmallow import ValidationError
 
-from automated_logging.signals import _function_model_exclusion
+from automated_logging.helpers.schemas import Search, Scope
+from automated_logging.signals import _function_model_exclusion, candidate_in_scope
 from automated_logging.tests.base import BaseTestCase
 
 
 class MiscellaneousTestCase(BaseTestCase):
+    databases = {"default", "audit"}
+
     def test_no_sender(self):
         self.assertIsNone(_function_model_exclusion(None, "", ""))
 
@@ -15,7 +18,6 @@ class MiscellaneousTestCase(BaseTestCase):
         from automated_logging.settings import settings as conf
 
         settings.AUTOMATED_LOGGING["unspecified"]["max_age"] = complex(1, 1)
-        conf.load.cache_clear()
         self.clear()
 
         self.assertRaises(ValidationError, conf.load)
@@ -23,13 +25,11 @@ class MiscellaneousTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["unspecified"]["max_age"] = (
             timedelta.max.total_seconds() + 1
         )
-        conf.load.cache_clear()
         self.clear()
 
         self.assertRaises(ValidationError, conf.load)
 
         settings.AUTOMATED_LOGGING["unspecified"]["max_age"] = "Haha, error go brrr"
-        conf.load.cache_clear()
         self.clear()
 
         self.assertRaises(ValidationError, conf.load)
@@ -41,13 +41,11 @@ class MiscellaneousTestCase(BaseTestCase):
         settings.AUTOMATED_LOGGING["unspecified"]["exclude"]["applications"] = [
             "te:abc"
         ]
-        conf.load.cache_clear()
         self.clear()
 
         self.assertRaises(ValidationError, conf.load)
 
         # settings.AUTOMATED_LOGGING['unspecified']['exclude']['applications'] = []
-        conf.load.cache_clear()
         self.clear()
 
     def test_duration_none(self):
@@ -55,7 +53,143 @@ class MiscellaneousTestCase(BaseTestCase):
         from automated_logging.settings import settings as conf
 
         settings.AUTOMATED_LOGGING["unspecified"]["max_age"] = None
-        conf.load.cache_clear()
+        conf.load()
         self.clear()
 
         self.assertIsNone(conf.unspecified.max_age)
+
+    def test_scope(self):
+        scope = Scope(
+            {
+                Search("plain", "admin"),
+                Search("glob", "session*"),
+                Search("glob", "*auth*log*"),
+                Search("regex", r"^te(st)\1$"),
+                Search("regex", r"^mig.*s$"),
+                Search("regex", r"(?i)^contenttypes$"),
+            }
+        )
+
+        for candidate in ["Admin", "sessions", "contrib.auth.logging", "testst"]:
+            self.assertTrue(candidate_in_scope(candidate, scope), candidate)
+        for candidate in ["MIGRATIONS", "ContentTypes"]:
+            self.assertTrue(candidate_in_scope(candidate, scope), candidate)
+        for candidate in ["administration", "usessions", "test", "migration"]:
+            self.assertFalse(candidate_in_scope(candidate, scope), candidate)
+
+        # plain iterables are compiled on the fly
+        self.assertTrue(candidate_in_scope("admin", [Search("plain", "admin")]))
+        self.assertFalse(candidate_in_scope("admin", []))
+
+        # union with the globals keeps the scope
+        self.assertIsInstance(scope | Scope({Search("plain", "other")}), Scope)
+
+    def test_invalid_regex(self):
+        from django.conf import settings
+        from automated_logging.settings import settings as conf
+
+        settings.AUTOMATED_LOGGING["model"]["exclude"]["models"] = ["re:("]
+
+        self.assertRaises(ValidationError, conf.load)
+
+    def test_setting_changed(self):
+        from copy import deepcopy
+        from logging import DEBUG
+        from django.conf import settings
+        from django.test import override_settings
+        from automated_logging.settings import settings as conf
+
+        config = deepcopy(settings.AUTOMATED_LOGGING)
+        config["model"]["loglevel"] = DEBUG
+
+        with override_settings(AUTOMATED_LOGGING=config):
+            self.assertEqual(conf.model.loglevel, DEBUG)
+            self.assertIs(conf.model, conf.loaded.model)
+
+        self.assertNotEqual(conf.model.loglevel, DEBUG)
+
+    def test_router(self):
+        from copy import deepcopy
+        from django.conf import settings
+        from django.contrib.admin import site
+        from django.test import RequestFactory, override_settings
+        from automated_logging.admin.model_event import ModelEventAdmin
+        from automated_logging.models import ModelEvent
+        from automated_logging.routers import DatabaseRouter, database
+        from automated_logging.tests.models import OrdinaryTest
+
+        config = deepcopy(settings.AUTOMATED_LOGGING)
+        config["database"] = {"alias": "audit", "replica": "replica"}
+
+        with override_settings(AUTOMATED_LOGGING=config):
+            router = DatabaseRouter()
+            self.assertEqual(router.db_for_write(ModelEvent), "audit")
+            self.assertEqual(router.db_for_read(ModelEvent), "audit")
+            self.assertIsNone(router.db_for_write(OrdinaryTest))
+
+            self.assertTrue(
+                router.allow_migrate("audit", "automated_logging", "modelevent")
+            )
+            self.assertFalse(
+                router.allow_migrate("default", "automated_logging", "modelevent")
+            )
+            self.assertIsNone(
+                router.allow_migrate("default", "automated_logging", "ordinarytest")
+            )
+            self.assertIsNone(router.allow_migrate("default", "auth", "user"))
+
+            # transactions are only opened on the alias if the router is used
+            self.assertEqual(database(), "default")
+            with override_settings(
+                DATABASE_ROUTERS=["automated_logging.routers.DatabaseRouter"]
+            ):
+                self.assertEqual(database(), "audit")
+
+            admin = ModelEventAdmin(ModelEvent, site)
+            request = RequestFactory().get("/")
+            self.assertEqual(admin.get_queryset(request).db, "replica")
+
+        admin = ModelEventAdmin(ModelEvent, site)
+        self.assertEqual(admin.get_queryset(RequestFactory().get("/")).db, "default")
+
+    def test_user_deletion(self):
+        """test if users can be deleted, while events are stored in another database"""
+        from copy import deepcopy
+        from django.conf import settings
+        from django.test import override_settings
+        from automated_logging.models import ModelEvent
+        from automated_logging.tests.models import OrdinaryTest
+
+        config = deepcopy(settings.AUTOMATED_LOGGING)
+        config["database"] = {"alias": "audit"}
+
+        with override_settings(
+            AUTOMATED_LOGGING=config,
+            DATABASE_ROUTERS=["automated_logging.routers.DatabaseRouter"],
+        ):
+            OrdinaryTest(random="Execute order 66").save()
+            ModelEvent.objects.update(user_id=self.user.pk)
+            events = ModelEvent.objects.using("audit").filter(user_id=self.user.pk)
+            self.assertEqual(events.count(), 1)
+
+            self.user.delete()
+            self.assertEqual(events.count(), 0)
+
+    def test_unique(self):
+        from django.db import IntegrityError, transaction
+        from automated_logging.models import Application, ModelEntry, ModelMirror
+
+        application = Application.objects.create(name="galaxy")
+        mirror = ModelMirror.objects.create(name="Clone", application=application)
+        ModelEntry.objects.create(mirror=mirror, primary_key="66", value="Cody")
+
+        with transaction.atomic(), self.assertRaises(IntegrityError):
+            ModelMirror.objects.create(name="Clone", application=application)
+
+        with transaction.atomic(), self.assertRaises(IntegrityError):
+            ModelEntry.objects.create(mirror=mirror, primary_key="66", value="Rex")
+
+        # primary keys have no maximum length, the constraint uses their digest
+        entry = ModelEntry.objects.create(mirror=mirror, primary_key="6" * 1000)
+        self.assertEqual(entry.digest, ModelEntry.make_digest("6" * 1000))
+        self.assertEqual(len(ModelEntry.objects.get(pk=entry.pk).primary_key), 1000)
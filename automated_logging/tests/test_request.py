@@ -4,6 +4,7 @@ import json
 from copy import deepcopy
 
 from django.http import JsonResponse
+from django.test import SimpleTestCase
 
 from automated_logging.models import RequestEvent
 from automated_logging.tests.base import BaseTestCase, USER_CREDENTIALS
@@ -18,7 +19,7 @@ class LoggedOutRequestsTestCase(BaseTestCase):
         super().setUp()
 
         settings.AUTOMATED_LOGGING["request"]["exclude"]["applications"] = []
-        conf.load.cache_clear()
+        conf.load()
 
         RequestEvent.objects.all().delete()
 
@@ -38,6 +39,28 @@ class LoggedOutRequestsTestCase(BaseTestCase):
 
         self.assertEqual(event.user, None)
 
+    def test_application(self):
+        """test if the application is derived from the resolved view"""
+        from automated_logging.signals.request import view_application
+
+        self.bypass_request_restrictions()
+        view_application.cache_clear()
+
+        self.request("GET", self.view)
+        self.request("GET", self.view)
+
+        events = RequestEvent.objects.all()
+        self.assertEqual(events.count(), 2)
+        self.assertEqual({e.application.name for e in events}, {"automated_logging"})
+        self.assertEqual(view_application.cache_info().hits, 1)
+
+        RequestEvent.objects.all().delete()
+        self.client.get("/missing")
+
+        event = RequestEvent.objects.get()
+        self.assertEqual(event.status, 404)
+        self.assertIsNone(event.application.name)
+
 
 class LoggedInRequestsTestCase(BaseTestCase):
     def setUp(self):
@@ -47,7 +70,7 @@ class LoggedInRequestsTestCase(BaseTestCase):
         super().setUp()
 
         settings.AUTOMATED_LOGGING["request"]["exclude"]["applications"] = []
-        conf.load.cache_clear()
+        conf.load()
 
         self.client.login(**USER_CREDENTIALS)
 
@@ -115,7 +138,7 @@ class DataRecordingRequestsTestCase(BaseTestCase):
             "response",
             "request",
         ]
-        conf.load.cache_clear()
+        conf.load()
 
         self.client.login(**USER_CREDENTIALS)
 
@@ -126,7 +149,6 @@ class DataRecordingRequestsTestCase(BaseTestCase):
         return JsonResponse({"test": "example"})
 
     def test_payload(self):
-        # TODO: preliminary until request/response parsing is implemented
         from django.conf import settings
         from automated_logging.settings import settings as conf
 
@@ -136,19 +158,209 @@ class DataRecordingRequestsTestCase(BaseTestCase):
             "request",
             "response",
         ]
-        conf.load.cache_clear()
+        conf.load()
 
-        self.request("GET", self.view, data=json.dumps({"X": "Y"}))
+        self.request(
+            "GET",
+            self.view,
+            data=json.dumps({"X": "Y"}),
+            content_type="application/json",
+        )
 
         events = RequestEvent.objects.all()
         self.assertEqual(events.count(), 1)
 
-        response = json.dumps({"test": "example"})
-        request = json.dumps({"X": "Y"})
         event = events[0]
-        self.assertEqual(event.response.content.decode(), response)
-        self.assertEqual(event.request.content.decode(), request)
+        self.assertEqual(event.response.content, {"test": "example"})
+        self.assertEqual(event.response.type, "application/json")
+        self.assertEqual(event.request.content, {"X": "Y"})
+
+    def test_scrub(self):
+        """test if ignored keys are omitted and masked keys are redacted"""
+        from django.conf import settings
+        from automated_logging.settings import settings as conf
+
+        self.bypass_request_restrictions()
+
+        settings.AUTOMATED_LOGGING["request"]["data"]["ignore"] = ["token"]
+        settings.AUTOMATED_LOGGING["request"]["data"]["mask"] = ["password"]
+        conf.load()
+
+        payload = {
+            "user": "example",
+            "Password": "secret",
+            "nested": [{"password": "secret", "token": "secret", "id": 1}],
+            "token": "secret",
+        }
+        self.request(
+            "POST",
+            self.view,
+            data=json.dumps(payload),
+            content_type="application/json",
+        )
+
+        event = RequestEvent.objects.get()
+        self.assertEqual(
+            event.request.content,
+            {
+                "user": "example",
+                "Password": "<REDACTED>",
+                "nested": [{"password": "<REDACTED>", "id": 1}],
+            },
+        )
+
+    def test_omitted(self):
+        """test if large, streamed or unknown contents are not recorded"""
+        from django.conf import settings
+        from django.http import StreamingHttpResponse
+        from automated_logging.settings import settings as conf
+
+        self.bypass_request_restrictions()
+
+        settings.AUTOMATED_LOGGING["request"]["data"]["max_size"] = 24
+        conf.load()
+
+        self.request(
+            "GET",
+            self.view,
+            data=json.dumps({"X": random_string(32)}),
+            content_type="application/json",
+        )
+        event = RequestEvent.objects.get()
+        self.assertIsNone(event.request.content)
+        self.assertEqual(event.response.content, {"test": "example"})
+
+        RequestEvent.objects.all().delete()
+        self.request("GET", self.view, data="X", content_type="text/plain")
+        event = RequestEvent.objects.get()
+        self.assertIsNone(event.request.content)
+        self.assertEqual(event.request.type, "text/plain")
+
+        def streaming(request):
+            return StreamingHttpResponse(
+                (b"{}" for _ in range(2)), content_type="application/json"
+            )
+
+        RequestEvent.objects.all().delete()
+        response = self.request("GET", streaming)
+
+        # the stream is still intact, request_finished is sent once it is closed
+        self.assertEqual(b"".join(response.streaming_content), b"{}{}")
+        response.close()
+
+        event = RequestEvent.objects.get()
+        self.assertIsNone(event.response.content)
 
     def test_exclusion_by_application(self):
         self.request("GET", self.view)
         self.assertEqual(RequestEvent.objects.count(), 0)
+
+
+class SamplingRequestsTestCase(BaseTestCase):
+    def setUp(self):
+        from django.conf import settings
+        from automated_logging.settings import settings as conf
+
+        super().setUp()
+
+        settings.AUTOMATED_LOGGING["request"]["exclude"]["applications"] = []
+        conf.load()
+
+        self.bypass_request_restrictions()
+        RequestEvent.objects.all().delete()
+
+    @staticmethod
+    def view(request):
+        return JsonResponse({})
+
+    def sample(self, **kwargs):
+        from django.conf import settings
+        from automated_logging.settings import settings as conf
+
+        settings.AUTOMATED_LOGGING["request"]["sample"] = kwargs
+        conf.load()
+
+    def test_rate(self):
+        """test if the most specific rate is used"""
+        from automated_logging.helpers.sampling import sample_rate
+
+        self.sample(rate=0)
+        self.request("GET", self.view)
+        self.assertEqual(RequestEvent.objects.count(), 0)
+
+        self.sample(rate=0, status={"200": 1})
+        self.request("GET", self.view)
+        self.assertEqual(RequestEvent.objects.count(), 1)
+
+        view = "automated_logging.tests.test_request.view"
+        self.sample(rate=1, views={view: 0}, applications={"automated_logging": 1})
+        self.request("GET", self.view)
+        self.assertEqual(RequestEvent.objects.count(), 1)
+
+        self.sample(rate=0, status={"5xx": 1, "503": 0.5})
+        self.assertEqual(sample_rate(None, None, 500), 1)
+        self.assertEqual(sample_rate(None, None, 503), 0.5)
+        self.assertEqual(sample_rate(None, None, 200), 0)
+        self.assertEqual(sample_rate(None, None, None), 0)
+
+        # the status takes precedence over the view and the application
+        self.sample(rate=0, applications={"shop": 0.01}, status={"5xx": 1})
+        self.assertEqual(sample_rate(None, "shop", 500), 1)
+        self.assertEqual(sample_rate(None, "shop", 200), 0.01)
+
+    def test_limit(self):
+        """test if the token bucket of a path limits the recorded requests"""
+        from django.conf import settings
+
+        self.sample(limit=0.001, burst=2)
+
+        for _ in range(3):
+            self.request("GET", self.view)
+
+        self.assertEqual(RequestEvent.objects.count(), 2)
+
+        # buckets are reset when the settings are reloaded
+        self.sample(limit=0.001, burst=1)
+        self.request("GET", self.view)
+        self.assertEqual(RequestEvent.objects.count(), 3)
+
+        # excluded requests do not take a token
+        settings.AUTOMATED_LOGGING["request"]["exclude"]["methods"] = ["GET"]
+        self.sample(limit=0.001, burst=1)
+        self.request("GET", self.view)
+        self.request("POST", self.view)
+        self.assertEqual(RequestEvent.objects.count(), 4)
+
+
+class AsyncRequestsTestCase(SimpleTestCase):
+    def test_context(self):
+        """
+        test if concurrent requests, that are served by the same thread
+        do not share their request information
+        """
+        import asyncio
+        from django.test import AsyncRequestFactory
+        from automated_logging.middleware import AutomatedLoggingMiddleware
+
+        seen = {}
+
+        async def view(request):
+            await asyncio.sleep(0.01)
+            seen[request.path] = AutomatedLoggingMiddleware.get_current_environ()
+            return JsonResponse({})
+
+        middleware = AutomatedLoggingMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+
+        factory = AsyncRequestFactory()
+
+        async def main():
+            await asyncio.gather(
+                middleware(factory.get("/first")), middleware(factory.get("/second"))
+            )
+
+        asyncio.run(main())
+
+        self.assertEqual(seen["/first"].request.path, "/first")
+        self.assertEqual(seen["/second"].request.path, "/second")
+        self.assertIsNone(AutomatedLoggingMiddleware.get_current_environ())
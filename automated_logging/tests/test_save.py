@@ -2,10 +2,13 @@
 
 import datetime
 
+from django.db.models import F, Value
+from django.db.models.functions import Concat
 from django.http import JsonResponse
 
 from automated_logging.helpers import Operation
-from automated_logging.models import ModelEvent
+from automated_logging.managers import LoggingQuerySet
+from automated_logging.models import ModelEvent, ModelValueModification
 from automated_logging.tests.base import BaseTestCase, USER_CREDENTIALS
 from automated_logging.tests.helpers import random_string
 from automated_logging.tests.models import OrdinaryTest
@@ -189,7 +192,7 @@ class LoggedOutSaveModificationsTestCase(BaseTestCase):
         self.bypass_request_restrictions()
 
         settings.AUTOMATED_LOGGING["model"]["performance"] = True
-        conf.load.cache_clear()
+        conf.load()
 
         ModelEvent.objects.all().delete()
         instance = OrdinaryTest()
@@ -212,7 +215,7 @@ class LoggedOutSaveModificationsTestCase(BaseTestCase):
         self.bypass_request_restrictions()
 
         settings.AUTOMATED_LOGGING["model"]["snapshot"] = True
-        conf.load.cache_clear()
+        conf.load()
 
         instance = OrdinaryTest(random=random_string())
         instance.save()
@@ -224,6 +227,312 @@ class LoggedOutSaveModificationsTestCase(BaseTestCase):
         self.assertIsNotNone(event.snapshot)
         self.assertEqual(instance, event.snapshot)
 
+    def test_tracking(self):
+        """
+        test if the values captured on load are used instead of
+        fetching the previous values from the database
+        """
+        from django.conf import settings
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from automated_logging.settings import settings as conf
+
+        settings.AUTOMATED_LOGGING["model"]["tracking"] = True
+        conf.load()
+
+        previous, current = random_string(10), random_string(10)
+        OrdinaryTest(random=previous).save()
+        ModelEvent.objects.all().delete()
+
+        instance = OrdinaryTest.objects.get(random=previous)
+        instance.random = current
+        with CaptureQueriesContext(connection) as queries:
+            instance.save()
+
+        self.assertFalse(
+            [
+                q
+                for q in queries.captured_queries
+                if q["sql"].startswith('SELECT "automated_logging_ordinarytest"')
+            ]
+        )
+
+        modifications = ModelEvent.objects.get().modifications.all()
+        self.assertEqual(modifications.count(), 1)
+        self.assertEqual(modifications[0].previous, previous)
+        self.assertEqual(modifications[0].current, current)
+
+        # the captured values are updated after saving
+        ModelEvent.objects.all().delete()
+        instance.random = previous
+        instance.save()
+
+        modifications = ModelEvent.objects.get().modifications.all()
+        self.assertEqual(modifications.count(), 1)
+        self.assertEqual(modifications[0].previous, current)
+
+        # deferred fields fall back to fetching the previous values
+        ModelEvent.objects.all().delete()
+        instance = OrdinaryTest.objects.only("id").get(pk=instance.pk)
+        instance.random = current
+        instance.save()
+
+        modifications = ModelEvent.objects.get().modifications.all()
+        self.assertEqual(modifications.count(), 1)
+        self.assertEqual(modifications[0].previous, previous)
+
+    def test_tracking_disabled(self):
+        """test if initializing instances is not slowed down without tracking"""
+        from unittest.mock import patch
+
+        with patch("automated_logging.signals.save.lazy_model_exclusion") as exclusion:
+            OrdinaryTest(random=random_string(10))
+            list(OrdinaryTest.objects.all())
+
+        exclusion.assert_not_called()
+
+    def test_descriptor(self):
+        """
+        test if the field metadata is cached per model
+        and invalidated if the settings change
+        """
+        from django.conf import settings
+        from automated_logging.settings import settings as conf
+        from automated_logging.signals.save import model_descriptor
+
+        instance = OrdinaryTest(random=random_string())
+        descriptor = model_descriptor(instance)
+        self.assertIs(model_descriptor(OrdinaryTest()), descriptor)
+        self.assertIn(("random", "CharField"), descriptor.fields)
+
+        settings.AUTOMATED_LOGGING["model"]["exclude"]["fields"] = ["random"]
+        conf.load()
+        conf.load()
+
+        descriptor = model_descriptor(instance)
+        self.assertNotIn("random", [attname for attname, _ in descriptor.fields])
+
+        instance.save()
+        modifications = ModelEvent.objects.get().modifications.all()
+        self.assertEqual({m.field.name for m in modifications}, {"id"})
+
+    def test_on_commit(self):
+        """
+        test if events are only written once the transaction has been committed
+        and discarded if the transaction has been rolled back
+        """
+        from django.conf import settings
+        from django.db import transaction
+        from automated_logging.settings import settings as conf
+
+        settings.AUTOMATED_LOGGING["model"]["on_commit"] = True
+        conf.load()
+
+        # warm up the identity cache, which adds rows once they are committed
+        with self.captureOnCommitCallbacks(execute=True):
+            OrdinaryTest(random=random_string()).save()
+        self.clear()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                OrdinaryTest(random=random_string()).save()
+                OrdinaryTest(random=random_string()).save()
+
+            self.assertEqual(ModelEvent.objects.count(), 0)
+
+        # both events are flushed via a single callback
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(ModelEvent.objects.count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    OrdinaryTest(random=random_string()).save()
+                    raise ValueError
+            except ValueError:
+                pass
+
+            with transaction.atomic():
+                instance = OrdinaryTest(random=random_string())
+                instance.save()
+                pk = instance.pk
+                try:
+                    with transaction.atomic():
+                        instance.delete()
+                        raise ValueError
+                except ValueError:
+                    pass
+
+        self.assertEqual(ModelEvent.objects.count(), 3)
+        event = ModelEvent.objects.get(entry__primary_key=str(pk))
+        self.assertEqual(event.operation, int(Operation.CREATE))
+
+
+class BulkModificationsTestCase(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.bypass_request_restrictions()
+        self.queryset = LoggingQuerySet(model=OrdinaryTest)
+
+    def test_bulk_create(self):
+        """test if bulk_create results in an event per instance"""
+        self.clear()
+
+        instances = self.queryset.bulk_create(
+            [OrdinaryTest(random=random_string()) for _ in range(5)]
+        )
+
+        events = ModelEvent.objects.all()
+        self.assertEqual(events.count(), 5)
+        self.assertEqual(
+            {e.entry.primary_key for e in events}, {str(i.pk) for i in instances}
+        )
+        self.assertEqual({e.operation for e in events}, {int(Operation.CREATE)})
+
+        # a single mirror for every entry
+        self.assertEqual(len({e.entry.mirror_id for e in events}), 1)
+
+        modification = events[0].modifications.get(field__name="random")
+        self.assertEqual(modification.operation, int(Operation.CREATE))
+
+    def test_bulk_create_without_pk(self):
+        """test if objects without a primary key are not recorded"""
+        from unittest.mock import patch
+        from django.contrib.auth.models import User
+        from django.db import connection
+
+        self.clear()
+        queryset = LoggingQuerySet(model=User)
+        # might be a property, that depends on the version of the database
+        features = connection.features.__class__
+
+        with patch.object(features, "can_return_rows_from_bulk_insert", False):
+            with self.assertLogs("automated_logging.managers", "WARNING"):
+                users = queryset.bulk_create(
+                    [User(username=random_string()) for _ in range(2)]
+                )
+
+        self.assertEqual([u.pk for u in users], [None, None])
+        self.assertEqual(ModelEvent.objects.count(), 0)
+
+    def test_update(self):
+        """test if update() records the previous and current values"""
+        instances = [OrdinaryTest(random=random_string()) for _ in range(3)]
+        for instance in instances:
+            instance.save()
+
+        self.clear()
+        value = random_string()
+        self.assertEqual(self.queryset.update(random=value), 3)
+
+        events = ModelEvent.objects.all()
+        self.assertEqual(events.count(), 3)
+        for instance in instances:
+            event = events.get(entry__primary_key=str(instance.pk))
+            self.assertEqual(event.operation, int(Operation.MODIFY))
+
+            modification = event.modifications.get()
+            self.assertEqual(modification.field.name, "random")
+            self.assertEqual(modification.previous, instance.random)
+            self.assertEqual(modification.current, value)
+
+        # values computed by the database are fetched after the update
+        self.clear()
+        self.queryset.update(random=Concat(F("random"), Value("!")))
+
+        modifications = ModelValueModification.objects.all()
+        self.assertEqual(modifications.count(), 3)
+        self.assertEqual({m.current for m in modifications}, {value + "!"})
+
+        # nothing changed, nothing is recorded
+        self.clear()
+        self.queryset.update(random=value + "!")
+        self.assertEqual(ModelEvent.objects.count(), 0)
+
+    def test_update_chunks(self):
+        """test if update() fetches and records the rows in chunks"""
+        from unittest.mock import patch
+
+        instances = [OrdinaryTest(random=random_string()) for _ in range(3)]
+        for instance in instances:
+            instance.save()
+
+        self.clear()
+        value = random_string()
+        with patch("automated_logging.managers.CHUNK", 2):
+            with self.assertLogs("automated_logging.managers") as logs:
+                rows = self.queryset.filter(pk__in=[i.pk for i in instances]).update(
+                    random=value
+                )
+
+        self.assertEqual(rows, 3)
+        self.assertEqual([len(r.events) for r in logs.records], [2, 1])
+        self.assertEqual(
+            {str(e.entry.primary_key) for r in logs.records for e, _ in r.events},
+            {str(i.pk) for i in instances},
+        )
+        self.assertEqual(OrdinaryTest.objects.filter(random=value).count(), 3)
+
+    def test_update_unlockable(self):
+        """test if rows of distinct and aggregated querysets are not locked"""
+        from unittest.mock import patch
+        from django.db import connection
+        from django.db.models import Count
+
+        instances = [OrdinaryTest(random=random_string()) for _ in range(2)]
+        for instance in instances:
+            instance.save()
+
+        features = connection.features
+        querysets = [
+            self.queryset.distinct(),
+            self.queryset.annotate(count=Count("id")),
+            self.queryset.values("random").annotate(count=Count("id")),
+        ]
+        for queryset in querysets:
+            self.clear()
+            value = random_string()
+
+            with patch.object(features, "has_select_for_update", True), patch.object(
+                LoggingQuerySet, "select_for_update", side_effect=AssertionError
+            ):
+                self.assertEqual(queryset.update(random=value), 2)
+
+            self.assertEqual(ModelEvent.objects.count(), 2)
+
+    def test_bulk_update(self):
+        """test if only modified instances are recorded by bulk_update"""
+        instances = [OrdinaryTest(random=random_string()) for _ in range(3)]
+        for instance in instances:
+            instance.save()
+
+        self.clear()
+        previous = instances[0].random
+        instances[0].random = random_string()
+        self.queryset.bulk_update(instances, ["random"])
+
+        event = ModelEvent.objects.get()
+        self.assertEqual(event.entry.primary_key, str(instances[0].pk))
+
+        modification = event.modifications.get()
+        self.assertEqual(modification.previous, previous)
+        self.assertEqual(modification.current, instances[0].random)
+
+    def test_excluded(self):
+        """test if bulk operations honor the model exclusion"""
+        from django.conf import settings
+        from automated_logging.settings import settings as conf
+
+        settings.AUTOMATED_LOGGING["model"]["exclude"]["models"] = ["OrdinaryTest"]
+        conf.load()
+
+        self.clear()
+        self.queryset.bulk_create([OrdinaryTest(random=random_string())])
+        self.queryset.update(random=random_string())
+
+        self.assertEqual(ModelEvent.objects.count(), 0)
+
 
 class LoggedInSaveModificationsTestCase(BaseTestCase):
     def setUp(self):
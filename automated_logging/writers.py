@@ -0,0 +1,428 @@
+"""
+Writers are used by the DatabaseHandler to decouple the thread that
+emits the log record from the thread that writes to the database.
+"""
+
+import asyncio
+import sys
+import traceback
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue, Full, Empty
+from threading import Thread, Lock
+from time import monotonic
+from typing import Any, Callable, List, Optional
+
+BACKPRESSURE = ("block", "drop-oldest", "drop-newest", "spill")
+
+# sentinel that is used to signal the worker threads to stop
+_STOP = object()
+# sentinel that is used to signal the consumer task to process the current batch
+_FLUSH = object()
+
+
+class BackgroundWriter:
+    """
+    Bounded queue, that is drained by one or more long-lived worker threads.
+
+    Every item put into the queue is an OrderedDict of instances, that
+    belong together (e.g. an event and its modifications). The worker
+    threads merge these into their own batch and write the batch as soon
+    as either the batch size or the maximum latency has been reached.
+
+    When the queue is full the backpressure policy decides what happens:
+    block       -> wait until there is space in the queue
+    drop-oldest -> discard the oldest item in the queue
+    drop-newest -> discard the item that is about to be added
+    spill       -> write the item in the calling thread
+
+    Dropped items are passed to drop, if it is supplied.
+    tick is called by every worker thread every latency seconds,
+    the instances it returns are added to the batch of the worker.
+    """
+
+    def __init__(
+        self,
+        write: Callable[[OrderedDict], None],
+        workers: int = 1,
+        size: int = 1000,
+        batch: int = 1,
+        latency: float = 1.0,
+        backpressure: str = "block",
+        spill: Optional[Callable[[OrderedDict], None]] = None,
+        drop: Optional[Callable[[OrderedDict], None]] = None,
+        tick: Optional[Callable[[], Optional[OrderedDict]]] = None,
+    ):
+        if backpressure not in BACKPRESSURE:
+            raise ValueError(
+                f"backpressure must be one of {', '.join(BACKPRESSURE)}, "
+                f"not {backpressure}"
+            )
+
+        self.write = write
+        self.spill = spill or write
+        self.drop = drop
+        self.tick = tick
+        self.batch = batch or 1
+        self.latency = latency
+        self.backpressure = backpressure
+
+        self.dropped = 0
+        self.queue = Queue(maxsize=size or 0)
+
+        self.lock = Lock()
+        self.threads: List[Thread] = []
+        for idx in range(workers or 1):
+            thread = Thread(
+                target=self._run, name=f"automated_logging-writer-{idx}", daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def put(self, instances: OrderedDict) -> None:
+        """
+        Hand the instances over to the worker threads,
+        applies the backpressure policy if the queue is full.
+
+        :param instances: instances that should be written
+        :return: None
+        """
+        if self.backpressure == "block":
+            return self.queue.put(instances)
+
+        try:
+            return self.queue.put_nowait(instances)
+        except Full:
+            pass
+
+        if self.backpressure == "spill":
+            self.spill(instances)
+        elif self.backpressure == "drop-newest":
+            with self.lock:
+                self._dropped(instances)
+        elif self.backpressure == "drop-oldest":
+            with self.lock:
+                while True:
+                    try:
+                        self._dropped(self.queue.get_nowait())
+                        self.queue.task_done()
+                    except Empty:
+                        pass
+
+                    try:
+                        self.queue.put_nowait(instances)
+                        break
+                    except Full:
+                        continue
+
+    def _dropped(self, instances: OrderedDict) -> None:
+        """count the dropped instances and notify the owner"""
+        self.dropped += 1
+        if self.drop:
+            self.drop(instances)
+
+    def join(self) -> None:
+        """
+        Wait until every item that was put into the queue has been written.
+
+        :return: None
+        """
+        if any(t.is_alive() for t in self.threads):
+            self.queue.join()
+
+    def stop(self) -> None:
+        """
+        Write everything that is still queued and stop the worker threads.
+
+        :return: None
+        """
+        for thread in self.threads:
+            if thread.is_alive():
+                self.queue.put(_STOP)
+
+        for thread in self.threads:
+            thread.join()
+
+    def _flush(self, batch: OrderedDict, items: int) -> None:
+        """write the batch of the worker and mark the items as done"""
+        from django.db import close_old_connections
+
+        try:
+            if batch:
+                close_old_connections()
+                self.write(batch)
+        except Exception:
+            # we cannot use logging here, as that might end up in this writer
+            traceback.print_exc(file=sys.stderr)
+        finally:
+            batch.clear()
+            for _ in range(items):
+                self.queue.task_done()
+
+    def _tick(self) -> Optional[OrderedDict]:
+        """call tick, the worker thread must not die if it fails"""
+        try:
+            return self.tick()
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+            return None
+
+    def _run(self) -> None:
+        """worker thread loop"""
+        from django.db import connections
+
+        batch = OrderedDict()
+        items = 0
+        deadline = None
+        ticked = monotonic()
+
+        while True:
+            timeout = None if deadline is None else max(deadline - monotonic(), 0)
+            if self.tick:
+                timeout = max(ticked + self.latency - monotonic(), 0)
+                if deadline is not None:
+                    timeout = min(timeout, max(deadline - monotonic(), 0))
+            try:
+                instances = self.queue.get(timeout=timeout)
+            except Empty:
+                instances = None
+
+            if instances is _STOP:
+                self._flush(batch, items)
+                self.queue.task_done()
+                break
+
+            if instances is not None:
+                batch.update(instances)
+                items += 1
+                if deadline is None:
+                    deadline = monotonic() + self.latency
+
+            if self.tick and monotonic() >= ticked + self.latency:
+                ticked = monotonic()
+                released = self._tick()
+                if released:
+                    batch.update(released)
+                    if deadline is None:
+                        deadline = monotonic() + self.latency
+
+            if (items or batch) and (
+                len(batch) >= self.batch or monotonic() >= deadline
+            ):
+                self._flush(batch, items)
+                items = 0
+                deadline = None
+
+        connections.close_all()
+
+
+# every AsyncWriter that has been created, used by the lifespan application
+sinks = weakref.WeakSet()
+
+
+class AsyncWriter:
+    """
+    asyncio based sink, that is bound to the event loop of the ASGI server.
+
+    Items are put into an asyncio.Queue without blocking the event loop,
+    are batched on the loop and then processed by a single thread executor,
+    as the ORM is synchronous. Items put from other threads (e.g. sync_to_async)
+    are handed over to the loop thread-safe.
+
+    If the writer isn't bound to a running event loop (e.g. WSGI,
+    management commands), items are processed immediately in the calling thread.
+    Items that do not fit into the queue are dropped.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[List[Any]], None],
+        size: int = 1000,
+        batch: int = 1,
+        latency: float = 1.0,
+    ):
+        self.process = process
+        self.size = size or 0
+        self.batch = batch or 1
+        self.latency = latency
+
+        self.dropped = 0
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+
+        self.lock = Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="automated_logging-async"
+        )
+        sinks.add(self)
+
+    def start(self) -> None:
+        """
+        Bind the writer to the running event loop and start consuming the queue,
+        needs to be called from within the event loop.
+
+        :return: None
+        """
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            if self.loop is loop and self.task and not self.task.done():
+                return
+
+            self.loop = loop
+            self.queue = asyncio.Queue(maxsize=self.size)
+            self.task = loop.create_task(self._run())
+
+    def put(self, item: Any) -> None:
+        """
+        Hand the item over to the event loop, binds the writer
+        to the running loop of the calling thread if there is one.
+
+        :param item: item that should be processed
+        :return: None
+        """
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        loop = self.loop
+        if running is not None and (loop is None or not loop.is_running()):
+            self.start()
+            loop = self.loop
+
+        if running is not None and running is loop:
+            return self._enqueue(item)
+
+        if loop is not None and loop.is_running():
+            try:
+                return loop.call_soon_threadsafe(self._enqueue, item)
+            except RuntimeError:
+                # the loop has been closed in the meantime
+                pass
+
+        self._process([item])
+
+    def _enqueue(self, item: Any) -> None:
+        """put the item into the queue, must be called from the loop"""
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def _process(self, items: List[Any]) -> None:
+        """process the items, runs in the executor"""
+        from django.db import close_old_connections
+
+        try:
+            close_old_connections()
+            self.process(items)
+        except Exception:
+            # we cannot use logging here, as that might end up in this writer
+            traceback.print_exc(file=sys.stderr)
+
+    async def _run(self) -> None:
+        """consumer task, batches the items on the loop"""
+        loop = asyncio.get_running_loop()
+        queue = self.queue
+
+        while True:
+            item = await queue.get()
+            if item is _FLUSH:
+                queue.task_done()
+                continue
+
+            items = [item]
+            deadline = loop.time() + self.latency
+
+            while len(items) < self.batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+
+                if item is _FLUSH:
+                    # drain() has been called, don't wait for the latency
+                    queue.task_done()
+                    break
+                items.append(item)
+
+            try:
+                await loop.run_in_executor(self.executor, self._process, items)
+            finally:
+                for _ in items:
+                    queue.task_done()
+
+    async def drain(self) -> None:
+        """
+        Wait until every queued item has been processed,
+        needs to be called from within the event loop.
+
+        :return: None
+        """
+        if self.queue is not None and self.loop is asyncio.get_running_loop():
+            await self.queue.put(_FLUSH)
+            await self.queue.join()
+
+    async def aclose(self) -> None:
+        """
+        Drain the queue and stop consuming, used on lifespan shutdown.
+        Items put afterwards are processed in the calling thread.
+
+        :return: None
+        """
+        await self.drain()
+
+        with self.lock:
+            task, self.task, self.loop, self.queue = self.task, None, None, None
+
+        if task is not None:
+            task.cancel()
+
+    def join(self) -> None:
+        """
+        Wait until every queued item has been processed,
+        this is a no-op when called from within the event loop.
+
+        :return: None
+        """
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is loop:
+            return
+
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.drain(), loop).result()
+            return
+
+        # the loop is not running anymore, process what is left
+        items = []
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            self.queue.task_done()
+            if item is not _FLUSH:
+                items.append(item)
+
+        if items:
+            self._process(items)
+
+    def stop(self) -> None:
+        """
+        Process everything that is still queued and shutdown the executor.
+
+        :return: None
+        """
+        self.join()
+        self.executor.shutdown(wait=True)
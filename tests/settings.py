@@ -53,7 +53,12 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
-    }
+    },
+    # used to test database.alias together with the DatabaseRouter
+    "audit": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.path.join(BASE_DIR, "audit.sqlite3"),
+    },
 }
 
 AUTOMATED_LOGGING_DEV = True